@@ -9,5 +9,8 @@ class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     item = models.ForeignKey("items.Item", on_delete=models.CASCADE)
 
+    class Meta:
+        index_together = [("user", "date"), ("item", "date")]
+
     def __str__(self):
         return self.content
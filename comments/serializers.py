@@ -1,13 +1,19 @@
 from rest_framework import serializers
 
 from comments.models import Comment
+from swapp.images import derivative_urls
 
 
 class CommentSerializer(serializers.ModelSerializer):
+    """
+    Serializes a comment with its author, whose user and profile should be loaded with the comments
+    (select_related("user__userprofile")).
+    """
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     username = serializers.SerializerMethodField()
     user_fullname = serializers.SerializerMethodField()
     user_profile_picture = serializers.SerializerMethodField()
+    user_profile_picture_sizes = serializers.SerializerMethodField()
     date = serializers.DateTimeField(read_only=True)
 
     def get_user_fullname(self, obj):
@@ -19,6 +25,10 @@ class CommentSerializer(serializers.ModelSerializer):
     def get_user_profile_picture(self, obj):
         return None if obj.user.userprofile.image.name == "" else obj.user.userprofile.image.url
 
+    def get_user_profile_picture_sizes(self, obj):
+        return derivative_urls(obj.user.userprofile.image)
+
     class Meta:
         model = Comment
-        fields = ("id", "content", "date", "user", "username", "item", "user_fullname", "user_profile_picture")
+        fields = ("id", "content", "date", "user", "username", "item", "user_fullname", "user_profile_picture",
+                  "user_profile_picture_sizes")
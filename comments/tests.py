@@ -47,10 +47,11 @@ class CommentsTests(TestCase):
         self.create_comment(self.user, self.item1)
         self.create_comment(self.user, self.item1, "other test")
 
+        # comments of a same date are ordered by id, the most recent first
         r = self.client.get(self.comments_url)
         self.assertEqual(r.status_code, status.HTTP_200_OK)
-        self.check_get_comment_data_complete(r.data[0])
-        self.check_get_comment_data_complete(r.data[1], 2, "other test")
+        self.check_get_comment_data_complete(r.data["results"][0], 2, "other test")
+        self.check_get_comment_data_complete(r.data["results"][1])
 
     def test_get_comment(self):
         self.create_comment(self.user, self.item1)
@@ -66,8 +67,8 @@ class CommentsTests(TestCase):
         self.create_comment(other_user, self.item1, "comment user2")
 
         r = self.client.get(self.comments_url)
-        self.assertEqual(len(r.data), 1)
-        self.assertEqual(r.data[0]["content"], "comment user1")
+        self.assertEqual(len(r.data["results"]), 1)
+        self.assertEqual(r.data["results"][0]["content"], "comment user1")
 
     def test_get_comments_order_by_date(self):
         now = timezone.now()
@@ -77,9 +78,9 @@ class CommentsTests(TestCase):
         self.create_comment(self.user, self.item1, "test3", now + timezone.timedelta(seconds=3))
 
         r = self.client.get(self.comments_url)
-        self.assertEquals(r.data[0]["content"], "test1")
-        self.assertEquals(r.data[1]["content"], "test3")
-        self.assertEquals(r.data[2]["content"], "test2")
+        self.assertEquals(r.data["results"][0]["content"], "test1")
+        self.assertEquals(r.data["results"][1]["content"], "test3")
+        self.assertEquals(r.data["results"][2]["content"], "test2")
 
     def test_put_comment(self):
         self.item2 = Item.objects.create(name="test2", description="test", price_min=50, price_max=60,
@@ -115,4 +116,4 @@ class CommentsTests(TestCase):
         self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
 
         r = self.client.get(self.comments_url)
-        self.assertEqual(len(r.data), 0)
+        self.assertEqual(len(r.data["results"]), 0)
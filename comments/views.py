@@ -1,16 +1,20 @@
+from django.db import transaction
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 
 from comments.models import Comment
 from comments.serializers import CommentSerializer
+from swapp.pagination import DateCursorPagination
 
 
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = DateCursorPagination
 
     def get_queryset(self):
-        return Comment.objects.filter(user=self.request.user).order_by("-date")
+        return Comment.objects.filter(user=self.request.user).select_related("user__userprofile")
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -0,0 +1,250 @@
+import codecs
+import csv
+import json
+import os
+from io import BytesIO
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from PIL import Image as PILImage
+
+from items.models import Category, DeliveryMethod, Image, Item, KeyInfo, is_stored, lock_stored_images, release_image
+from items.serializers import ImportItemSerializer
+from swapp.db_utils import bulk_create_with_pks
+from swapp.images import create_derivatives, delete_derivatives, derivatives_exist
+from users.account import invalidate_accounts
+
+FORMATS = ("ndjson", "csv")
+DEFAULT_CHUNK_SIZE = 200
+
+
+def guess_format(filename):
+    """
+    Guesses the format of an import file from its extension, defaulting to NDJSON.
+    """
+    return "csv" if filename is not None and filename.lower().endswith(".csv") else "ndjson"
+
+
+def split_list(value):
+    return [v.strip() for v in value.split(";") if v.strip() != ""] if value else []
+
+
+def csv_row_to_item(row):
+    """
+    Converts a CSV row to the structure expected by the import serializer. The list columns (delivery_methods, images
+    and keyinfo) are separated by ";", and each key info is written as "key:info".
+    """
+    data = {k: v for k, v in row.items() if k is not None and v not in (None, "")}
+
+    for field in ("delivery_methods", "images"):
+        if field in data:
+            data[field] = split_list(data[field])
+
+    if "keyinfo" in data:
+        key_infos = []
+        for key_info in split_list(data.pop("keyinfo")):
+            key, _, info = key_info.partition(":")
+            key_infos.append({"key": key.strip(), "info": info.strip()})
+        data["keyinfo_set"] = key_infos
+
+    return data
+
+
+def is_valid_text(value):
+    """
+    Tells if a decoded string is valid UTF-8, the invalid bytes being kept as surrogates by iter_rows.
+    """
+    try:
+        value.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def iter_rows(stream, fmt):
+    """
+    Lazily parses the rows of an import file. The rows which aren't valid UTF-8 are reported as malformed.
+
+    :param stream: an iterable of (bytes) lines, such as a file opened in binary mode or an uploaded file.
+    :param fmt: the format of the file, either "ndjson" or "csv".
+    :return: a generator of (row number, data) tuples. data is None if the row couldn't be parsed.
+    """
+    lines = codecs.iterdecode(stream, "utf-8-sig", errors="surrogateescape")
+
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            valid = all(is_valid_text(v) for v in list(row.keys()) + list(row.values()) if isinstance(v, str))
+            yield number, csv_row_to_item(row) if valid else None
+    else:
+        for number, line in enumerate(lines, start=1):
+            if line.strip() == "":
+                continue
+
+            try:
+                data = json.loads(line) if is_valid_text(line) else None
+            except ValueError:
+                data = None
+
+            yield number, data if isinstance(data, dict) else None
+
+
+def save_archive_image(archive, name):
+    """
+    Verifies an image of the archive and saves it to the storage.
+
+    :return: the name of the stored file, or None if the file is not a valid image.
+    """
+    content = archive.read(name)
+
+    try:
+        PILImage.open(BytesIO(content)).verify()
+    except Exception:
+        return None
+
+    content = File(BytesIO(content))
+    name = os.path.basename(name)
+
+    # an identical image may already be stored, and shared (see swapp.storage)
+    existing = default_storage.exists(default_storage.content_name(name, content))
+    stored_name = default_storage.save(name, content)
+    if existing and derivatives_exist(stored_name):
+        return stored_name
+
+    try:
+        create_derivatives(stored_name)
+    except Exception:
+        if not existing:
+            default_storage.delete(stored_name)
+            delete_derivatives(stored_name)
+        return None
+
+    return stored_name
+
+
+def release_stored_images(names, pending=()):
+    """
+    Deletes the images saved by save_archive_image for rows which weren't inserted, unless they are shared with other
+    images or with the pending rows, whose images aren't referenced in the database yet.
+    """
+    for name in set(names) - set(pending):
+        release_image(name)
+
+
+def import_items(owner, stream, fmt="ndjson", archive=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Imports items for the given owner. The rows are validated one by one as they are read, and the valid ones are
+    inserted by chunks, each chunk in its own transaction.
+
+    :param owner: the user owning the imported items.
+    :param stream: an iterable of (bytes) lines.
+    :param fmt: the format of the file, either "ndjson" or "csv".
+    :param archive: an optional zip file containing the images referenced by the rows.
+    :param chunk_size: the number of rows inserted per transaction.
+    :return: a report with the number of items created and the errors of the rejected rows.
+    """
+    context = {
+        "categories": set(Category.objects.values_list("pk", flat=True)),
+        "delivery_methods": set(DeliveryMethod.objects.values_list("pk", flat=True)),
+        "images": set(archive.namelist()) if archive is not None else set()
+    }
+    report = {"created": 0, "errors": []}
+    chunk = []
+
+    for number, data in iter_rows(stream, fmt):
+        if data is None:
+            report["errors"].append({"row": number, "errors": {"non_field_errors": ["Malformed row"]}})
+            continue
+
+        serializer = ImportItemSerializer(data=data, context=context)
+        if not serializer.is_valid():
+            report["errors"].append({"row": number, "errors": serializer.errors})
+            continue
+
+        chunk.append((number, serializer.validated_data))
+
+        if len(chunk) >= chunk_size:
+            insert_chunk(owner, chunk, archive, report)
+            chunk = []
+
+    if len(chunk) > 0:
+        insert_chunk(owner, chunk, archive, report)
+
+    report["errors"].sort(key=lambda e: e["row"])
+    return report
+
+
+def insert_chunk(owner, chunk, archive, report):
+    """
+    Saves the images of the rows of a chunk, then inserts the chunk's items with their key infos, delivery methods
+    and images in one transaction.
+    """
+    rows = []
+    rejected_images = []
+
+    for number, data in chunk:
+        images = []
+
+        for name in data.get("images", []):
+            stored_name = save_archive_image(archive, name)
+            if stored_name is None:
+                break
+            images.append(stored_name)
+
+        if len(images) < len(data.get("images", [])):
+            # released once the chunk is inserted, as the other rows of the chunk may share them
+            rejected_images += images
+            report["errors"].append({"row": number, "errors": {"images": ["Invalid image \"%s\"" % name]}})
+        else:
+            rows.append((data, images))
+
+    stored_images = [image for _, images in rows for image in images]
+
+    try:
+        with transaction.atomic():
+            # the images shared with other images may have been deleted with them since they were saved
+            lock_stored_images(stored_images)
+            for data, images in rows:
+                for name, stored_name in zip(data.get("images", []), images):
+                    if not is_stored(stored_name):
+                        save_archive_image(archive, name)
+
+            items = bulk_create_with_pks(Item, [
+                Item(owner=owner, name=data["name"], description=data["description"], price_min=data["price_min"],
+                     price_max=data["price_max"], category_id=data["category"])
+                for data, _ in rows
+            ])
+
+            KeyInfo.objects.bulk_create([
+                KeyInfo(key=key_info["key"], info=key_info["info"], item_id=item.id)
+                for item, (data, _) in zip(items, rows) for key_info in data.get("keyinfo_set", [])
+            ])
+
+            delivery_methods_model = Item.delivery_methods.through
+            delivery_methods_model.objects.bulk_create([
+                delivery_methods_model(item_id=item.id, deliverymethod_id=delivery_method)
+                for item, (data, _) in zip(items, rows) for delivery_method in set(data["delivery_methods"])
+            ])
+
+            created_images = bulk_create_with_pks(Image, [
+                Image(image=image, item_id=item.id) for item, (_, images) in zip(items, rows) for image in images
+            ])
+
+            # the bulk insert doesn't send the signals setting the primary images, which are set in one statement
+            primary_images = {}
+            for image in created_images:
+                primary_images.setdefault(image.item_id, image.id)
+            if len(primary_images) > 0:
+                Item.objects.filter(pk__in=primary_images.keys()).update(primary_image=Case(
+                    *[When(pk=item_id, then=Value(image_id)) for item_id, image_id in primary_images.items()],
+                    output_field=IntegerField()
+                ))
+
+            invalidate_accounts([owner.id])
+    except Exception:
+        release_stored_images(rejected_images + stored_images)
+        raise
+
+    release_stored_images(rejected_images, pending=stored_images)
+    report["created"] += len(items)
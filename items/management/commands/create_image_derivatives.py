@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from items.models import Image
+from swapp.images import create_derivatives, derivatives_exist
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Creates the resized derivatives of the items images and profile pictures uploaded before they existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Recreates the derivatives of all the images, instead of the missing ones.")
+
+    def handle(self, *args, **options):
+        names = list(Image.objects.exclude(image="").exclude(image=None).values_list("image", flat=True))
+        names += list(UserProfile.objects.exclude(image="").exclude(image=None).values_list("image", flat=True))
+
+        created = 0
+        for name in names:
+            if options["all"] or not derivatives_exist(name):
+                try:
+                    create_derivatives(name)
+                    created += 1
+                except Exception as e:
+                    self.stderr.write("%s: %s" % (name, e))
+
+        self.stdout.write("Derivatives created for %d images" % created)
+
@@ -0,0 +1,46 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from items.models import Image
+from swapp.images import create_derivatives, delete_derivatives, derivatives_exist
+from swapp.storage import is_content_addressed
+from users.account import invalidate_accounts
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Moves the items images and profile pictures stored before the content-addressed storage to their content " \
+           "address, the identical images sharing the same file."
+
+    def handle(self, *args, **options):
+        names = set(Image.objects.exclude(image="").exclude(image=None).values_list("image", flat=True))
+        names |= set(UserProfile.objects.exclude(image="").exclude(image=None).values_list("image", flat=True))
+
+        moved = 0
+        for name in sorted(names):
+            if is_content_addressed(name):
+                continue
+
+            try:
+                with default_storage.open(name, "rb") as f:
+                    address = default_storage.save(name, f)
+                if not derivatives_exist(address):
+                    create_derivatives(address)
+            except Exception as e:
+                self.stderr.write("%s: %s" % (name, e))
+                continue
+
+            with transaction.atomic():
+                user_ids = set(Image.objects.filter(image=name).values_list("item__owner_id", flat=True))
+                user_ids |= set(UserProfile.objects.filter(image=name).values_list("user_id", flat=True))
+
+                Image.objects.filter(image=name).update(image=address)
+                UserProfile.objects.filter(image=name).update(image=address)
+            invalidate_accounts(user_ids)
+
+            default_storage.delete(name)
+            delete_derivatives(name)
+            moved += 1
+
+        self.stdout.write("%d images moved to their content address" % moved)
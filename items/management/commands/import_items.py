@@ -0,0 +1,40 @@
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from items.importer import DEFAULT_CHUNK_SIZE, FORMATS, guess_format, import_items
+
+
+class Command(BaseCommand):
+    help = "Imports the items of a NDJSON or CSV file for the given user."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="The owner of the imported items.")
+        parser.add_argument("file", help="The NDJSON or CSV file to import.")
+        parser.add_argument("--format", choices=FORMATS, default=None,
+                            help="The format of the file. Guessed from its extension if not given.")
+        parser.add_argument("--images", default=None, help="A zip archive containing the images of the items.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="The number of items inserted per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError("User \"%s\" does not exist" % options["username"])
+
+        fmt = options["format"] or guess_format(options["file"])
+        archive = zipfile.ZipFile(options["images"]) if options["images"] is not None else None
+
+        try:
+            with open(options["file"], "rb") as stream:
+                report = import_items(owner, stream, fmt=fmt, archive=archive, chunk_size=options["chunk_size"])
+        finally:
+            if archive is not None:
+                archive.close()
+
+        for error in report["errors"]:
+            self.stderr.write("Row %d: %s" % (error["row"], error["errors"]))
+
+        self.stdout.write("%d items imported, %d rows rejected" % (report["created"], len(report["errors"])))
@@ -0,0 +1,42 @@
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from items.uploads import DEFAULT_BATCH_SIZE, process_image_uploads
+
+
+class Command(BaseCommand):
+    help = "Processes the uploaded images waiting in the staging area."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep processing the new uploads until interrupted.")
+        parser.add_argument("--interval", type=float, default=1,
+                            help="The number of seconds to wait between two checks for uploads when looping.")
+        parser.add_argument("--workers", type=int, default=settings.IMAGE_UPLOAD_WORKERS,
+                            help="The number of worker processes processing the images. With 0, the images are "
+                                 "processed by the command's process.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="The number of uploads processed at once.")
+
+    def handle(self, *args, **options):
+        pool = None
+        if options["workers"] > 0:
+            # the workers don't use the database: the connection isn't shared with them
+            connections.close_all()
+            pool = Pool(options["workers"])
+
+        try:
+            while True:
+                count = process_image_uploads(pool=pool, batch_size=options["batch_size"])
+                if not options["loop"]:
+                    self.stdout.write("%d uploads processed" % count)
+                    return
+
+                if count == 0:
+                    time.sleep(options["interval"])
+        finally:
+            if pool is not None:
+                pool.terminate()
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 04:03
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('items', '0003_auto_20170106_2259'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='item',
+            index_together=set([('owner', 'price_min', 'price_max'), ('price_min', 'price_max')]),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 04:27
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('items', '0004_auto_20261019_0603'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='item',
+            index_together=set([('owner', 'creation_date'), ('price_min', 'price_max'), ('owner', 'price_min', 'price_max')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='like',
+            index_together=set([('user', 'date')]),
+        ),
+    ]
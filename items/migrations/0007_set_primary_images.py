@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Min
+
+
+def set_primary_images(apps, schema_editor):
+    """
+    Sets the primary image of the items having images to their first image.
+    """
+    Image = apps.get_model("items", "Image")
+    Item = apps.get_model("items", "Item")
+
+    for first_image in list(Image.objects.values("item_id").annotate(first_id=Min("id"))):
+        Item.objects.filter(pk=first_image["item_id"]).update(primary_image=first_image["first_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0006_item_primary_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_primary_images, migrations.RunPython.noop),
+    ]
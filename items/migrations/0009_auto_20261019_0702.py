@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 05:02
+from __future__ import unicode_literals
+
+import django.core.files.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0008_auto_20261019_0655'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, upload_to='', verbose_name='Uploaded image'),
+        ),
+        migrations.AlterField(
+            model_name='imageupload',
+            name='file',
+            field=models.FileField(storage=django.core.files.storage.FileSystemStorage(), upload_to='staging/'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 06:23
+from __future__ import unicode_literals
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+import swapp.storage
+
+
+def move_staged_uploads(apps, schema_editor):
+    """
+    Moves the files of the pending uploads from the staging directory of MEDIA_ROOT to STAGING_ROOT, under the same
+    names.
+    """
+    ImageUpload = apps.get_model("items", "ImageUpload")
+
+    for name in ImageUpload.objects.filter(status="pending").values_list("file", flat=True):
+        source = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(source):
+            destination = os.path.join(settings.STAGING_ROOT, name)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(source, destination)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0010_storedimage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imageupload',
+            name='file',
+            field=models.FileField(storage=swapp.storage.StagingStorage(), upload_to=''),
+        ),
+        migrations.RunPython(move_staged_uploads, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,16 @@
+from functools import partial
+
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models.signals import pre_delete
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import Min
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
+from swapp.images import delete_derivatives, derivatives_exist
+from swapp.storage import staging_storage
+
 
 class Item(models.Model):
     name = models.CharField(max_length=50)
@@ -19,6 +26,13 @@ class Item(models.Model):
     category = models.ForeignKey("items.Category", on_delete=models.CASCADE)
     delivery_methods = models.ManyToManyField("items.DeliveryMethod")
 
+    # first image of the item, maintained when images are added or deleted (see update_primary_image)
+    primary_image = models.ForeignKey("items.Image", null=True, blank=True, on_delete=models.SET_NULL,
+                                      related_name="+")
+
+    class Meta:
+        index_together = [("owner", "price_min", "price_max"), ("price_min", "price_max"), ("owner", "creation_date")]
+
     def __str__(self):
         return self.name
 
@@ -38,7 +52,7 @@ class KeyInfo(models.Model):
 
 
 class Image(models.Model):
-    image = models.ImageField("Uploaded image", null=True)
+    image = models.ImageField("Uploaded image", null=True, db_index=True)
 
     item = models.ForeignKey("items.Item", on_delete=models.CASCADE)
 
@@ -46,14 +60,111 @@ class Image(models.Model):
         return self.image.name
 
 
-@receiver(pre_delete, sender=Image)
+class ImageUpload(models.Model):
+    """
+    An uploaded image waiting in the staging area to be processed by the workers (see items.uploads), for an item or
+    as the profile picture of its user when item is null.
+    """
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, null=True, blank=True, on_delete=models.CASCADE)
+    file = models.FileField(storage=staging_storage)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.CharField(max_length=200, blank=True, default="")
+    image = models.ForeignKey(Image, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        index_together = [("status", "id")]
+
+
+class StoredImage(models.Model):
+    """
+    The lock of a stored image, taken to check whether the image is referenced before deleting it, and to create
+    references to it (see lock_stored_images).
+    """
+    name = models.CharField(max_length=100, unique=True)
+    lock_date = models.DateTimeField(default=timezone.now)
+
+
+def lock_stored_images(names):
+    """
+    Locks the given stored images until the end of the current transaction, so that they aren't deleted while
+    references to them are created: the images are saved before their references, and may have been deleted as
+    unreferenced in the meantime, which the caller checks with is_stored once they are locked. The lock is taken by
+    updating a row, which waits for the other transactions holding it on every database backend.
+    """
+    for name in sorted(set(names)):
+        while StoredImage.objects.filter(name=name).update(lock_date=timezone.now()) == 0:
+            try:
+                with transaction.atomic():
+                    StoredImage.objects.create(name=name)
+            except IntegrityError:
+                # created concurrently, locked by the update
+                pass
+
+
+def is_stored(name):
+    """
+    Returns whether a stored image exists with all its derivatives.
+    """
+    return default_storage.exists(name) and derivatives_exist(name)
+
+
+def delete_unreferenced_image(name):
+    """
+    Deletes a stored image with its derivatives, unless it is still referenced by an image or a profile picture: the
+    identical images share the same file (see swapp.storage). The image is locked during the check, so that it isn't
+    deleted while a reference to it is created.
+    """
+    if not name:
+        return
+
+    with transaction.atomic():
+        lock_stored_images([name])
+        if Image.objects.filter(image=name).exists() or User.objects.filter(userprofile__image=name).exists():
+            return
+
+        default_storage.delete(name)
+        delete_derivatives(name)
+        StoredImage.objects.filter(name=name).delete()
+
+
+def release_image(name):
+    """
+    Deletes a stored image unless it is still referenced (see delete_unreferenced_image), once the current transaction
+    is committed: the file is kept when the transaction is rolled back, and the references created by the transaction
+    are visible to the check.
+    """
+    if name:
+        transaction.on_commit(partial(delete_unreferenced_image, name))
+
+
+@receiver(post_delete, sender=Image)
 def image_delete(sender, instance, **kwargs):
     """
-    Delete the file associated with the image field.
+    Delete the file associated with the image field, once the image is its last reference.
     """
+    release_image(instance.image.name)
+
 
-    # Pass false so ImageField doesn't save the model
-    instance.image.delete(False)
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def update_primary_image(sender, instance, **kwargs):
+    """
+    Sets the primary image of an item without one, to its first image. The primary image of an item is set to null
+    when it is deleted, and is then replaced by the next image.
+    """
+    first_image = Image.objects.filter(item_id=instance.item_id).aggregate(Min("id"))["id__min"]
+    Item.objects.filter(pk=instance.item_id, primary_image=None).update(primary_image=first_image)
 
 
 class Category(models.Model):
@@ -68,5 +179,16 @@ class Like(models.Model):
     item = models.ForeignKey("items.Item", on_delete=models.CASCADE)
     date = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        index_together = [("user", "date")]
+
     def __str__(self):
         return self.user.username
+
+
+@receiver(pre_delete, sender=ImageUpload)
+def image_upload_delete(sender, instance, **kwargs):
+    """
+    Delete the staged file of an upload deleted before being processed.
+    """
+    instance.file.delete(False)
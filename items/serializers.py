@@ -1,12 +1,25 @@
+from django.conf import settings
 from django.db.models import Q
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from items.models import Category, Item, Image, Like, KeyInfo, DeliveryMethod
+from items.models import Category, Item, Image, ImageUpload, Like, KeyInfo, DeliveryMethod
 from swapp.gmaps_api_utils import MAX_RADIUS
+from swapp.images import derivative_urls
 from users.serializers import CoordinatesSerializer
 
 
+def check_prices(price_min, price_max):
+    if price_min is not None and price_min < 0:
+        raise ValidationError("Price min is negative")
+
+    if price_max is not None and price_max < 0:
+        raise ValidationError("Price max is negative")
+
+    if price_min is not None and price_max is not None and price_min > price_max:
+        raise ValidationError("Price min is higher than price max")
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -24,12 +37,30 @@ class InterestedByCategorySerializer(serializers.Serializer):
         child=serializers.IntegerField()
     )
 
+    def validate_interested_by(self, value):
+        """
+        Loads the categories of the given ids in one query.
+        """
+        categories = list(Category.objects.filter(pk__in=set(value)))
+
+        missing = set(value) - set(c.id for c in categories)
+        if len(missing) > 0:
+            raise ValidationError("Invalid category \"%d\"" % min(missing))
+
+        return categories
+
     class Meta:
         fields = ("interested_by",)
 
 
 class CreateImageSerializer(serializers.Serializer):
-    image = serializers.ImageField()
+    # the image is decoded and validated by the upload workers (see items.uploads)
+    image = serializers.FileField()
+
+    def validate_image(self, value):
+        if value.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise ValidationError("The image is larger than %d bytes" % settings.IMAGE_UPLOAD_MAX_SIZE)
+        return value
 
     class Meta:
         fields = ("image",)
@@ -37,13 +68,17 @@ class CreateImageSerializer(serializers.Serializer):
 
 class ImageSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    sizes = serializers.SerializerMethodField()
 
     def get_url(self, obj):
         return obj.image.url
 
+    def get_sizes(self, obj):
+        return derivative_urls(obj.image)
+
     class Meta:
         model = Image
-        fields = ("id", "url")
+        fields = ("id", "url", "sizes")
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -109,19 +144,99 @@ class ItemSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "description", "price_min", "price_max", "category", "keyinfo_set", "delivery_methods")
 
 
+class ImportItemSerializer(serializers.Serializer):
+    """
+    Validates a single row of an item import. The ids of the existing categories and delivery methods are expected in
+    the context so that rows can be validated without querying the database.
+    """
+    name = serializers.CharField(max_length=50)
+    description = serializers.CharField(max_length=2000)
+    price_min = serializers.IntegerField(default=0)
+    price_max = serializers.IntegerField(default=0)
+    category = serializers.IntegerField()
+    keyinfo_set = KeyInfoSerializer(many=True, required=False)
+    delivery_methods = serializers.ListField(child=serializers.IntegerField())
+    images = serializers.ListField(child=serializers.CharField(), required=False)
+
+    def validate_category(self, value):
+        if value not in self.context["categories"]:
+            raise ValidationError("Invalid category \"%d\"" % value)
+        return value
+
+    def validate_delivery_methods(self, value):
+        if len(value) == 0:
+            raise ValidationError("A least one delivery method should be specified")
+
+        for delivery_method in value:
+            if delivery_method not in self.context["delivery_methods"]:
+                raise ValidationError("Invalid delivery method \"%d\"" % delivery_method)
+
+        return value
+
+    def validate_images(self, value):
+        for image in value:
+            if image not in self.context["images"]:
+                raise ValidationError("Image \"%s\" not found in the images archive" % image)
+        return value
+
+    def validate(self, data):
+        check_prices(data["price_min"], data["price_max"])
+        return data
+
+
+class ImportItemsSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=("ndjson", "csv"), default=None)
+    images = serializers.FileField(default=None)
+
+    class Meta:
+        fields = ("file", "format", "images")
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """
+    Serializes the status of an upload, with the URLs of its image once processed.
+    """
+    url = serializers.SerializerMethodField()
+    sizes = serializers.SerializerMethodField()
+
+    def get_image_file(self, obj):
+        if obj.image_id is not None:
+            return obj.image.image
+        if obj.status == ImageUpload.DONE and obj.item_id is None:
+            return obj.user.userprofile.image
+        return None
+
+    def get_url(self, obj):
+        image = self.get_image_file(obj)
+        return image.url if image else None
+
+    def get_sizes(self, obj):
+        return derivative_urls(self.get_image_file(obj))
+
+    class Meta:
+        model = ImageUpload
+        fields = ("id", "status", "error", "item", "image", "url", "sizes")
+
+
 class InventoryItemSerializer(serializers.ModelSerializer):
     image_id = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_sizes = serializers.SerializerMethodField()
 
     def get_image_id(self, obj):
-        return obj.image_set.first().id if obj.image_set.count() > 0 else None
+        return obj.primary_image_id
 
     def get_image_url(self, obj):
-        return obj.image_set.first().image.url if obj.image_set.count() > 0 else None
+        # the items should be loaded with select_related("primary_image")
+        return obj.primary_image.image.url if obj.primary_image_id is not None else None
+
+    def get_image_sizes(self, obj):
+        return derivative_urls(obj.primary_image.image) if obj.primary_image_id is not None else None
 
     class Meta:
         model = Item
-        fields = ("id", "name", "image_id", "image_url", "archived")
+        fields = ("id", "name", "image_id", "image_url", "image_sizes", "archived")
 
 
 class DetailedItemSerializer(serializers.ModelSerializer):
@@ -136,6 +251,7 @@ class DetailedItemSerializer(serializers.ModelSerializer):
     owner_username = serializers.SerializerMethodField()
     similar = serializers.SerializerMethodField()
     owner_picture_url = serializers.SerializerMethodField()
+    owner_picture_sizes = serializers.SerializerMethodField()
     owner_location = serializers.SerializerMethodField()
     owner_coordinates = serializers.SerializerMethodField()
 
@@ -159,11 +275,15 @@ class DetailedItemSerializer(serializers.ModelSerializer):
         return obj.owner.username
 
     def get_similar(self, obj):
-        return InventoryItemSerializer(Item.objects.filter(~Q(pk=obj.id), category=obj.category), many=True).data
+        return InventoryItemSerializer(Item.objects.filter(~Q(pk=obj.id), category=obj.category)
+                                       .select_related("primary_image"), many=True).data
 
     def get_owner_picture_url(self, obj):
         return obj.owner.userprofile.image.url if obj.owner.userprofile.image.name != "" else None
 
+    def get_owner_picture_sizes(self, obj):
+        return derivative_urls(obj.owner.userprofile.image)
+
     def get_owner_location(self, obj):
         location = obj.owner.location
         return "%s, %s" % (location.city, location.country)
@@ -175,7 +295,13 @@ class DetailedItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = ("id", "name", "description", "price_min", "price_max", "creation_date", "owner_username", "category",
                   "views", "images", "liked", "likes", "comments", "offers_received", "keyinfo_set", "delivery_methods",
-                  "similar", "owner_picture_url", "owner_location", "owner_coordinates", "traded", "archived")
+                  "similar", "owner_picture_url", "owner_picture_sizes", "owner_location", "owner_coordinates", "traded",
+                  "archived")
+
+
+class TradeableForSerializer(serializers.Serializer):
+    radius = serializers.FloatField(default=None, min_value=0)
+    limit = serializers.IntegerField(default=20, min_value=1, max_value=100)
 
 
 class SearchItemsSerializer(serializers.Serializer):
@@ -5,6 +5,7 @@ from rest_framework import status
 
 from comments.models import *
 from items.models import *
+from items.uploads import process_image_uploads
 from swapp import settings
 from users.models import *
 
@@ -84,7 +85,9 @@ class ItemBaseTest(TestCase):
 
     def post_image(self, image_name="test.png"):
         with open("%s/%s" % (settings.MEDIA_TEST, image_name), "rb") as data:
-            return self.client.post("/api/account/image/", {"image": data}, format="multipart")
+            r = self.client.post("/api/account/image/", {"image": data}, format="multipart")
+        process_image_uploads()
+        return r
 
 
 class ItemPostTests(ItemBaseTest):
@@ -160,6 +163,7 @@ class ItemGetTests(ItemBaseTest):
         self.assertEqual(r.data["owner_location"], "city, country")
         self.assertEqual(r.data["owner_coordinates"], {"latitude": 4, "longitude": 4})
         self.assertNotEqual(r.data["owner_picture_url"], None)
+        self.assertEqual(set(r.data["owner_picture_sizes"]), {"thumbnail", "medium", "large"})
         self.assertIn("images", r.data)
         self.assertEqual(r.data["traded"], False)
         self.assertEqual(r.data["archived"], False)
@@ -381,10 +385,20 @@ class ItemCommentTests(ItemBaseTest):
 
         r = self.client.get("%s%d/comments/" % (self.url, self.item.id))
         self.assertEqual(r.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(r.data), 3)
-        self.check_get_comment_data_complete(r.data[0], c3)
-        self.check_get_comment_data_complete(r.data[1], c2)
-        self.check_get_comment_data_complete(r.data[2], c1)
+        self.assertEqual(len(r.data["results"]), 3)
+        self.check_get_comment_data_complete(r.data["results"][0], c3)
+        self.check_get_comment_data_complete(r.data["results"][1], c2)
+        self.check_get_comment_data_complete(r.data["results"][2], c1)
+
+    def test_get_item_comments_loads_authors_with_comments(self):
+        for i in range(30):
+            user = self.another_user if i % 2 == 0 else self.current_user
+            Comment.objects.create(user=user, item=self.item, content="comment%d" % i)
+
+        # the item, then the comments with their authors
+        with self.assertNumQueries(2):
+            r = self.client.get("%s%d/comments/" % (self.url, self.item.id), {"page_size": 30})
+        self.assertEqual(len(r.data["results"]), 30)
 
 
 class ArchiveRestoreItemTests(ItemBaseTest):
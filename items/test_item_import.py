@@ -0,0 +1,166 @@
+import json
+import os
+import zipfile
+from io import BytesIO, StringIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from rest_framework import status
+
+from items.models import *
+from swapp import settings
+from swapp.images import derivatives_exist
+
+
+class ItemImportTests(TransactionTestCase):
+    # the images of the rejected rows are deleted once their chunk is committed
+    import_url = "/api/items/import/"
+
+    def setUp(self):
+        self.current_user = User.objects.create_user(username="username", email="test@test.com", password="password")
+
+        self.c1 = Category.objects.create(name="test")
+        self.dm1 = DeliveryMethod.objects.create(name="At my place")
+        self.dm2 = DeliveryMethod.objects.create(name="By mail")
+
+        self.client.login(username="username", password="password")
+
+    def build_row(self, name="name", price_min=1, price_max=2, category=None, delivery_methods=None, **kwargs):
+        row = {
+            "name": name,
+            "description": "description",
+            "price_min": price_min,
+            "price_max": price_max,
+            "category": self.c1.id if category is None else category,
+            "delivery_methods": [self.dm1.id] if delivery_methods is None else delivery_methods
+        }
+        row.update(kwargs)
+        return row
+
+    def post_import(self, content, filename="items.ndjson", images=None):
+        if not isinstance(content, bytes):
+            content = content.encode("utf-8")
+        data = {"file": SimpleUploadedFile(filename, content)}
+        if images is not None:
+            data["images"] = SimpleUploadedFile("images.zip", images)
+        return self.client.post(self.import_url, data, format="multipart")
+
+    def build_ndjson(self, rows):
+        return "\n".join(json.dumps(row) for row in rows) + "\n"
+
+    def build_archive(self, *names):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as z:
+            for name in names:
+                z.write("%s/%s" % (settings.MEDIA_TEST, "test.png"), name)
+        return archive.getvalue()
+
+    def test_import_ndjson(self):
+        rows = [self.build_row(name="item%d" % i, keyinfo_set=[{"key": "color", "info": "red"}]) for i in range(5)]
+        r = self.post_import(self.build_ndjson(rows))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["created"], 5)
+        self.assertEqual(r.data["errors"], [])
+
+        self.assertEqual(Item.objects.filter(owner=self.current_user).count(), 5)
+        item = Item.objects.get(name="item3")
+        self.assertEqual(item.keyinfo_set.first().info, "red")
+        self.assertEqual(list(item.delivery_methods.all()), [self.dm1])
+
+    def test_import_csv(self):
+        content = "name,description,price_min,price_max,category,delivery_methods,keyinfo\n" \
+                  "Flute,Old flute,10,20,%d,%d;%d,color:silver;brand:Yamaha\n" % (self.c1.id, self.dm1.id, self.dm2.id)
+        r = self.post_import(content, filename="items.csv")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["created"], 1)
+
+        item = Item.objects.get(name="Flute")
+        self.assertEqual(item.price_max, 20)
+        self.assertEqual(item.delivery_methods.count(), 2)
+        self.assertEqual(item.keyinfo_set.get(key="brand").info, "Yamaha")
+
+    def test_import_reports_invalid_rows(self):
+        content = self.build_ndjson([
+            self.build_row(name="valid"),
+            self.build_row(price_min=3, price_max=2),
+            self.build_row(category=100),
+            self.build_row(delivery_methods=[])
+        ]) + "not json\n"
+        r = self.post_import(content)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["created"], 1)
+        self.assertEqual([e["row"] for e in r.data["errors"]], [2, 3, 4, 5])
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_import_reports_invalid_utf8_rows(self):
+        content = self.build_ndjson([self.build_row(name="valid")]).encode("utf-8") + b"\xff\n"
+        r = self.post_import(content)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["created"], 1)
+        self.assertEqual([e["row"] for e in r.data["errors"]], [2])
+
+        content = "name,description,price_min,price_max,category,delivery_methods\n" \
+                  "Flute,Old flute,10,20,%d,%d\n" % (self.c1.id, self.dm1.id)
+        r = self.post_import(content.encode("utf-8") + b"Dr\xffm,Drum,1,2,1,1\n", filename="items.csv")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["created"], 1)
+        self.assertEqual([e["row"] for e in r.data["errors"]], [2])
+        self.assertEqual(Item.objects.count(), 2)
+
+    def test_import_in_several_chunks(self):
+        rows = [self.build_row(name="item%d" % i) for i in range(450)]
+        r = self.post_import(self.build_ndjson(rows))
+        self.assertEqual(r.data["created"], 450)
+        self.assertEqual(Item.objects.count(), 450)
+        self.assertEqual(Item.delivery_methods.through.objects.count(), 450)
+        self.assertEqual(Item.objects.get(name="item449").delivery_methods.first(), self.dm1)
+
+    def test_import_with_images(self):
+        rows = [self.build_row(images=["a.png", "b.png"]), self.build_row(images=["missing.png"])]
+        r = self.post_import(self.build_ndjson(rows), images=self.build_archive("a.png", "b.png"))
+        self.assertEqual(r.data["created"], 1)
+        self.assertEqual(r.data["errors"][0]["row"], 2)
+        self.assertEqual(Image.objects.count(), 2)
+        self.assertEqual(Item.objects.get().primary_image_id, Image.objects.order_by("id").first().id)
+
+        for image in Image.objects.all():
+            image.delete()
+
+    def test_import_keeps_images_shared_with_rejected_rows(self):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as z:
+            z.write("%s/%s" % (settings.MEDIA_TEST, "test.png"), "a.png")
+            z.writestr("bad.png", b"not an image")
+
+        rows = [self.build_row(images=["a.png"]), self.build_row(images=["a.png", "bad.png"])]
+        r = self.post_import(self.build_ndjson(rows), images=archive.getvalue())
+        self.assertEqual(r.data["created"], 1)
+        self.assertEqual(r.data["errors"][0]["row"], 2)
+
+        image = Image.objects.get()
+        self.assertTrue(default_storage.exists(image.image.name))
+        self.assertTrue(derivatives_exist(image.image.name))
+
+        image.delete()
+        self.assertFalse(default_storage.exists(image.image.name))
+
+    def test_import_not_logged_in(self):
+        self.client.logout()
+        r = self.post_import(self.build_ndjson([self.build_row()]))
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_import_command(self):
+        path = "%s/%s" % (settings.MEDIA_TEST, "import_test.ndjson")
+        with open(path, "w") as f:
+            f.write(self.build_ndjson([self.build_row(), self.build_row(category=100)]))
+
+        out = StringIO()
+        try:
+            call_command("import_items", "username", path, stdout=out, stderr=StringIO())
+        finally:
+            os.remove(path)
+
+        self.assertIn("1 items imported, 1 rows rejected", out.getvalue())
+        self.assertEqual(Item.objects.count(), 1)
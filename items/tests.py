@@ -1,11 +1,23 @@
+import hashlib
 import json
-
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
 from django.db.utils import IntegrityError
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from PIL import Image as PILImage
 from rest_framework import status
 
 from items.models import *
+from items.uploads import process_image_uploads, process_staged_file
 from swapp import settings
+from swapp.images import delete_derivatives, derivative_name, derivative_names, derivatives_exist
+from swapp.storage import IMMUTABLE_MAX_AGE, ContentAddressedStorage, is_content_addressed, serve_media, staging_storage
 from users.models import *
 
 
@@ -33,10 +45,10 @@ class ItemTests(TestCase):
         self.assertEqual(Item.objects.count(), 1)
 
 
-class ImageAPITests(TestCase):
+class ImageAPITests(TransactionTestCase):
+    # the files of the images are deleted once the deletions are committed
     images_url = "/api/images/"
     items_url = "/api/items/"
-    image_file_delete_path = "%s/%s" % (settings.MEDIA_ROOT, "delete_image.png")
 
     def setUp(self):
         self.current_user = User.objects.create_user(username="username", email="test@test.com", password="password")
@@ -50,12 +62,19 @@ class ImageAPITests(TestCase):
     def login(self):
         self.client.login(username="username", password="password")
 
-    def post_image(self, image_name="test.png", item_id=1):
+    def post_image(self, image_name="test.png", item_id=None):
+        item_id = self.item.id if item_id is None else item_id
         with open("%s/%s" % (settings.MEDIA_TEST, image_name), "rb") as data:
-            return self.client.post("%s%d/%s/" % (self.items_url, item_id, "images"), {"image": data},
-                                    format="multipart")
+            r = self.client.post("%s%d/%s/" % (self.items_url, item_id, "images"), {"image": data},
+                                 format="multipart")
+        process_image_uploads()
+        return r
+
+    def post_image_id(self, image_name="test.png", item_id=None):
+        return self.client.get(self.post_image(image_name, item_id)["Location"]).data["image"]
 
-    def delete_image(self, image_id=1):
+    def delete_image(self, image_id=None):
+        image_id = Image.objects.get().id if image_id is None else image_id
         return self.client.delete("%s%d/" % (self.images_url, image_id), content_type="application/json")
 
     def test_post_image(self):
@@ -63,7 +82,7 @@ class ImageAPITests(TestCase):
 
         self.login()
         r = self.post_image()
-        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
 
         self.assertEqual(Image.objects.count(), 1)
         self.assertEqual(self.item.image_set.count(), 1)
@@ -71,7 +90,7 @@ class ImageAPITests(TestCase):
         self.assertNotEqual(self.item.image_set.first().image.url, "")
 
         r = self.client.get("%s%d/" % (self.items_url, self.item.id))
-        self.assertEqual(r.data["images"][0]["id"], 1)
+        self.assertEqual(r.data["images"][0]["id"], Image.objects.get().id)
         self.assertNotEqual(r.data["images"][0]["url"], None)
 
     def test_post_images(self):
@@ -84,10 +103,11 @@ class ImageAPITests(TestCase):
         self.assertEqual(Image.objects.count(), 2)
         self.assertEqual(self.item.image_set.count(), 2)
 
+        first, second = Image.objects.order_by("id").values_list("id", flat=True)
         r = self.client.get("%s%d/" % (self.items_url, self.item.id))
-        self.assertEqual(r.data["images"][0]["id"], 1)
+        self.assertEqual(r.data["images"][0]["id"], first)
         self.assertNotEqual(r.data["images"][0]["url"], None)
-        self.assertEqual(r.data["images"][1]["id"], 2)
+        self.assertEqual(r.data["images"][1]["id"], second)
         self.assertNotEqual(r.data["images"][1]["url"], None)
 
     def test_delete_image(self):
@@ -95,16 +115,323 @@ class ImageAPITests(TestCase):
         self.post_image(image_name="delete_image.png")
 
         self.assertEqual(Image.objects.count(), 1)
+        image = Image.objects.get()
+        name = image.image.name
+        self.assertTrue(default_storage.exists(name))
 
         r = self.delete_image()
         self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
 
         self.assertEqual(Image.objects.count(), 0)
-        self.assertRaises(FileNotFoundError, open, self.image_file_delete_path, "rb")
+        self.assertFalse(default_storage.exists(name))
 
-        r = self.delete_image(image_id=10)
+        r = self.delete_image(image_id=image.id)
         self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_delete_image_rolled_back(self):
+        image_id = self.post_image_id()
+        name = Image.objects.get(pk=image_id).image.name
+
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Image.objects.get(pk=image_id).delete()
+                raise IntegrityError()
+
+        self.assertTrue(Image.objects.filter(pk=image_id).exists())
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(derivatives_exist(name))
+
+        self.delete_image(image_id=image_id)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_image_derivatives(self):
+        image = Image.objects.get(pk=self.post_image_id())
+        names = derivative_names(image.image.name)
+
+        self.assertEqual(len(names), 6)
+        for name in names:
+            self.assertTrue(default_storage.exists(name))
+        with default_storage.open(derivative_name(image.image.name, "thumbnail", "webp")) as f:
+            self.assertEqual(PILImage.open(f).format, "WEBP")
+
+        r = self.client.get("%s%d/" % (self.items_url, self.item.id))
+        self.assertEqual(r.data["images"][0]["sizes"]["thumbnail"]["jpg"],
+                         default_storage.url(derivative_name(image.image.name, "thumbnail", "jpg")))
+
+        self.delete_image(image_id=image.id)
+        for name in names:
+            self.assertFalse(default_storage.exists(name))
+
+    def test_create_image_derivatives_command(self):
+        image_id = self.post_image_id()
+        name = Image.objects.get(pk=image_id).image.name
+        delete_derivatives(name)
+
+        out = StringIO()
+        call_command("create_image_derivatives", stdout=out)
+        self.assertIn("Derivatives created for 1 images", out.getvalue())
+        self.assertTrue(derivatives_exist(name))
+
+        self.delete_image(image_id=image_id)
+
+    def test_primary_image(self):
+        first = self.post_image_id()
+        second = self.post_image_id()
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.primary_image_id, first)
+
+        # the current user, the user of the inventory and the items joined with their primary image
+        with self.assertNumQueries(3):
+            r = self.client.get("/api/users/%s/items/" % self.current_user.username)
+        self.assertEqual(r.data["results"][0]["image_id"], first)
+        self.assertEqual(r.data["results"][0]["image_url"], Image.objects.get(pk=first).image.url)
+
+        self.delete_image(image_id=first)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.primary_image_id, second)
+
+        self.delete_image(image_id=second)
+        self.item.refresh_from_db()
+        self.assertIsNone(self.item.primary_image_id)
+
+
+    def test_image_upload_status(self):
+        with open("%s/%s" % (settings.MEDIA_TEST, "test.png"), "rb") as data:
+            r = self.client.post("%s%d/%s/" % (self.items_url, self.item.id, "images"), {"image": data},
+                                 format="multipart")
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(r.data["status"], ImageUpload.PENDING)
+        location = r["Location"]
+        staged_name = ImageUpload.objects.get().file.name
+        self.assertNotIn("test", staged_name)
+        self.assertTrue(staging_storage.exists(staged_name))
+        self.assertFalse(staging_storage.path(staged_name).startswith(settings.MEDIA_ROOT))
+
+        r = self.client.get(location)
+        self.assertEqual(r.data["status"], ImageUpload.PENDING)
+        self.assertIsNone(r.data["image"])
+        self.assertEqual(Image.objects.count(), 0)
+
+        self.assertEqual(process_image_uploads(), 1)
+
+        r = self.client.get(location)
+        image = Image.objects.get()
+        self.assertEqual(r.data["status"], ImageUpload.DONE)
+        self.assertEqual(r.data["image"], image.id)
+        self.assertEqual(r.data["url"], image.image.url)
+        self.assertEqual(r.data["sizes"]["large"]["webp"],
+                         default_storage.url(derivative_name(image.image.name, "large", "webp")))
+        self.assertFalse(staging_storage.exists(staged_name))
+
+        self.delete_image(image_id=image.id)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=100)
+    def test_image_upload_too_large(self):
+        r = self.client.post("%s%d/%s/" % (self.items_url, self.item.id, "images"),
+                             {"image": SimpleUploadedFile("test.png", b"0" * 101)}, format="multipart")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImageUpload.objects.count(), 0)
+
+    def test_invalid_image_upload(self):
+        self.client.post("%s%d/%s/" % (self.items_url, self.item.id, "images"),
+                         {"image": SimpleUploadedFile("test.png", b"not an image")}, format="multipart")
+        process_image_uploads()
+
+        upload = ImageUpload.objects.get()
+        self.assertEqual(upload.status, ImageUpload.FAILED)
+        self.assertEqual(upload.error, "The file is not a valid image")
+        self.assertEqual(Image.objects.count(), 0)
+
+        r = self.client.get("/api/uploads/%d/" % upload.id)
+        self.assertEqual(r.data["status"], ImageUpload.FAILED)
+        self.assertIsNone(r.data["url"])
+
+    def test_image_upload_of_other_user(self):
+        r = self.post_image()
+        User.objects.create_user(username="other", email="other@test.com", password="password")
+        self.client.login(username="other", password="password")
+
+        r = self.client.get(r["Location"])
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.login()
+        self.delete_image(image_id=Image.objects.get().id)
+
+    def test_process_image_uploads_command(self):
+        with open("%s/%s" % (settings.MEDIA_TEST, "test.png"), "rb") as data:
+            self.client.post("%s%d/%s/" % (self.items_url, self.item.id, "images"), {"image": data},
+                             format="multipart")
+
+        out = StringIO()
+        call_command("process_image_uploads", workers=0, stdout=out)
+        self.assertIn("1 uploads processed", out.getvalue())
+        self.assertEqual(ImageUpload.objects.get().status, ImageUpload.DONE)
+
+        self.delete_image(image_id=Image.objects.get().id)
+
+
+    def test_identical_images_share_file(self):
+        first = Image.objects.get(pk=self.post_image_id())
+        second = Image.objects.get(pk=self.post_image_id())
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_addressed(first.image.name))
+
+        self.delete_image(image_id=first.id)
+        self.assertTrue(default_storage.exists(second.image.name))
+        self.assertTrue(derivatives_exist(second.image.name))
+
+        self.delete_image(image_id=second.id)
+        self.assertFalse(default_storage.exists(second.image.name))
+        for name in derivative_names(second.image.name):
+            self.assertFalse(default_storage.exists(name))
+
+    def test_upload_of_deleted_item_sharing_image(self):
+        other_item = Item.objects.create(name="Other", description="Other", price_min=1, price_max=2,
+                                         archived=False, category=self.item.category, owner=self.current_user)
+        for item in (other_item, self.item):
+            with open("%s/%s" % (settings.MEDIA_TEST, "test.png"), "rb") as data:
+                self.client.post("%s%d/%s/" % (self.items_url, item.id, "images"), {"image": data},
+                                 format="multipart")
+
+        def process_and_delete_other_item(name):
+            # the other item is deleted while its image is processed, after the staged file is read
+            result = process_staged_file(name)
+            Item.objects.filter(pk=other_item.id).delete()
+            return result
+
+        with patch("items.uploads.process_staged_file", process_and_delete_other_item):
+            process_image_uploads()
+
+        image = Image.objects.get()
+        self.assertEqual(image.item_id, self.item.id)
+        self.assertTrue(default_storage.exists(image.image.name))
+        self.assertTrue(derivatives_exist(image.image.name))
+
+        self.delete_image(image_id=image.id)
+
+    def test_upload_sharing_image_deleted_while_processed(self):
+        image = Image.objects.get(pk=self.post_image_id())
+        with open("%s/%s" % (settings.MEDIA_TEST, "test.png"), "rb") as data:
+            self.client.post("%s%d/%s/" % (self.items_url, self.item.id, "images"), {"image": data},
+                             format="multipart")
+
+        def process_and_delete_image(name):
+            # the identical image is deleted once the upload is stored, before the upload is saved
+            result = process_staged_file(name)
+            self.delete_image(image_id=image.id)
+            return result
+
+        with patch("items.uploads.process_staged_file", process_and_delete_image):
+            process_image_uploads()
+
+        uploaded = Image.objects.get()
+        self.assertEqual(uploaded.image.name, image.image.name)
+        self.assertTrue(default_storage.exists(uploaded.image.name))
+        self.assertTrue(derivatives_exist(uploaded.image.name))
+
+        self.delete_image(image_id=uploaded.id)
+        self.assertFalse(default_storage.exists(uploaded.image.name))
+        self.assertFalse(StoredImage.objects.filter(name=uploaded.image.name).exists())
+
+    def test_image_shared_with_profile_picture(self):
+        image = Image.objects.get(pk=self.post_image_id())
+        with open("%s/%s" % (settings.MEDIA_TEST, "test.png"), "rb") as data:
+            self.client.post("/api/account/image/", {"image": data}, format="multipart")
+        process_image_uploads()
+        self.assertEqual(UserProfile.objects.get(user=self.current_user).image.name, image.image.name)
+
+        self.delete_image(image_id=image.id)
+        self.assertTrue(default_storage.exists(image.image.name))
+
+        # the replaced profile picture is deleted with its last reference
+        content = BytesIO()
+        PILImage.new("RGB", (10, 10), (255, 0, 0)).save(content, "PNG")
+        self.client.post("/api/account/image/", {"image": SimpleUploadedFile("red.png", content.getvalue())},
+                         format="multipart")
+        process_image_uploads()
+        self.assertFalse(default_storage.exists(image.image.name))
+
+        name = UserProfile.objects.get(user=self.current_user).image.name
+        UserProfile.objects.filter(user=self.current_user).update(image="")
+        delete_unreferenced_image(name)
+
+    def test_deduplicate_images_command(self):
+        names = []
+        for name in ("legacy_1.png", "legacy_2.png"):
+            with open("%s/%s" % (settings.MEDIA_TEST, "test.png"), "rb") as data:
+                names.append(FileSystemStorage().save(name, data))
+            Image.objects.create(image=names[-1], item=self.item)
+
+        out = StringIO()
+        call_command("deduplicate_images", stdout=out)
+        self.assertIn("2 images moved to their content address", out.getvalue())
+
+        addresses = set(Image.objects.values_list("image", flat=True))
+        self.assertEqual(len(addresses), 1)
+        address = addresses.pop()
+        self.assertTrue(is_content_addressed(address))
+        self.assertTrue(derivatives_exist(address))
+        for name in names:
+            self.assertFalse(default_storage.exists(name))
+
+        for image in Image.objects.all():
+            self.delete_image(image_id=image.id)
+        self.assertFalse(default_storage.exists(address))
+
+
+class ContentAddressedStorageTests(TestCase):
+    def test_save(self):
+        storage = ContentAddressedStorage()
+        name = storage.save("first.TXT", ContentFile(b"content"))
+        self.assertEqual(name, "%s/%s.txt" % (hashlib.sha256(b"content").hexdigest()[:2],
+                                              hashlib.sha256(b"content").hexdigest()))
+        self.assertTrue(is_content_addressed(name))
+        self.assertTrue(is_content_addressed(derivative_name(name, "thumbnail", "webp")))
+        self.assertNotEqual(derivative_name("photo.png", "thumbnail", "webp"),
+                            derivative_name("photo.jpg", "thumbnail", "webp"))
+        self.assertFalse(is_content_addressed("staging/photo.jpg"))
+
+        self.assertEqual(storage.save("second.txt", ContentFile(b"content")), name)
+        self.assertNotEqual(storage.save("third.txt", ContentFile(b"other")), name)
+
+        storage.delete(name)
+        storage.delete(storage.content_name("third.txt", ContentFile(b"other")))
+
+    def test_save_concurrently(self):
+        storage = ContentAddressedStorage()
+        name = storage.save("first.txt", ContentFile(b"content"))
+
+        # saved by another process after the existence check
+        with patch.object(ContentAddressedStorage, "exists", return_value=False):
+            self.assertEqual(storage.save("second.txt", ContentFile(b"content")), name)
+        directory, file_name = name.split("/")
+        self.assertEqual([f for f in storage.listdir(directory)[1] if f.startswith(file_name)], [file_name])
+
+        storage.save_as(derivative_name(name, "thumbnail", "webp"), ContentFile(b"first"))
+        storage.save_as(derivative_name(name, "thumbnail", "webp"), ContentFile(b"second"))
+        with storage.open(derivative_name(name, "thumbnail", "webp")) as f:
+            self.assertEqual(f.read(), b"second")
+
+        storage.delete(name)
+        delete_derivatives(name, storage)
+
+    def test_serve_media(self):
+        name = default_storage.save("served.txt", ContentFile(b"served"))
+        with open("%s/%s" % (settings.MEDIA_ROOT, "staging_test.txt"), "wb") as f:
+            f.write(b"staged")
+
+        request = RequestFactory().get("/media/%s" % name)
+        r = serve_media(request, name, document_root=settings.MEDIA_ROOT)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertIn("immutable", r["Cache-Control"])
+        self.assertIn("max-age=%d" % IMMUTABLE_MAX_AGE, r["Cache-Control"])
+
+        r = serve_media(request, "staging_test.txt", document_root=settings.MEDIA_ROOT)
+        self.assertFalse(r.has_header("Cache-Control"))
+
+        default_storage.delete(name)
+        FileSystemStorage().delete("staging_test.txt")
+
 
 class DeliveryMethodAPITests(TestCase):
     delivery_methods_url = "/api/deliverymethods/"
@@ -274,18 +601,18 @@ class LikeAPITests(TestCase):
     def test_get_likes_no_likes(self):
         r = self.get_likes()
         self.assertEqual(r.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(r.data), 0)
+        self.assertEqual(len(r.data["results"]), 0)
 
     def test_get_likes_1_like(self):
         self.post_like(1)
 
         r = self.get_likes()
         self.assertEqual(r.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(r.data), 1)
-        self.assertEqual(r.data[0]["id"], 1)
-        self.assertEqual(r.data[0]["user"], "username")
-        self.assertEqual(r.data[0]["item"], 1)
-        self.assertIn("date", r.data[0])
+        self.assertEqual(len(r.data["results"]), 1)
+        self.assertEqual(r.data["results"][0]["id"], 1)
+        self.assertEqual(r.data["results"][0]["user"], "username")
+        self.assertEqual(r.data["results"][0]["item"], 1)
+        self.assertIn("date", r.data["results"][0])
 
     def test_get_like(self):
         r = self.post_like(1)
@@ -319,3 +646,60 @@ class LikeAPITests(TestCase):
             "name": "test"
         }), content_type="application/json")
         self.assertEqual(r.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class TradeableForTests(TestCase):
+    items_url = "/api/items/"
+
+    def setUp(self):
+        self.current_user = User.objects.create_user(username="user1", password="password")
+        self.other_user = User.objects.create_user(username="user2", password="password")
+        self.near_user = User.objects.create_user(username="user3", password="password")
+        self.far_user = User.objects.create_user(username="user4", password="password")
+
+        for user, (lat, lon) in ((self.current_user, (46.78, 6.64)), (self.near_user, (46.52, 6.63)),
+                                 (self.far_user, (47.37, 8.54))):
+            user.coordinates.latitude = lat
+            user.coordinates.longitude = lon
+            user.coordinates.save()
+
+        c = Category.objects.create(name="Test")
+        self.item = Item.objects.create(name="Wanted", description="Test", price_min=20, price_max=50, category=c,
+                                        owner=self.other_user)
+
+        self.below = Item.objects.create(name="Below", price_min=5, price_max=10, category=c, owner=self.current_user)
+        self.overlap_low = Item.objects.create(name="Low", price_min=10, price_max=20, category=c,
+                                               owner=self.current_user)
+        self.overlap_high = Item.objects.create(name="High", price_min=40, price_max=80, category=c,
+                                                owner=self.current_user)
+        self.above = Item.objects.create(name="Above", price_min=60, price_max=80, category=c,
+                                         owner=self.current_user)
+        Item.objects.create(name="Traded", price_min=20, price_max=30, category=c, owner=self.current_user,
+                            traded=True)
+
+        self.near = Item.objects.create(name="Near", price_min=30, price_max=40, category=c, owner=self.near_user)
+        Item.objects.create(name="Far", price_min=30, price_max=40, category=c, owner=self.far_user)
+
+        self.client.login(username="user1", password="password")
+
+    def get_tradeable_for(self, item_id, **params):
+        return self.client.get("%s%d/tradeable_for/" % (self.items_url, item_id), params)
+
+    def test_get_tradeable_for(self):
+        r = self.get_tradeable_for(self.item.id)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([i["id"] for i in r.data["items"]], [self.overlap_low.id, self.overlap_high.id])
+        self.assertEqual(r.data["nearby"], [])
+
+    def test_get_tradeable_for_with_nearby_items(self):
+        r = self.get_tradeable_for(self.item.id, radius=50)
+        self.assertEqual([i["id"] for i in r.data["nearby"]], [self.near.id])
+
+    def test_get_tradeable_for_not_logged_in(self):
+        self.client.logout()
+        r = self.get_tradeable_for(self.item.id)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_get_tradeable_for_not_existing(self):
+        r = self.get_tradeable_for(100)
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,114 @@
+"""
+Background processing of the uploaded images.
+
+The upload endpoints only save the uploaded file in the staging area and create a pending ImageUpload, which the
+client polls. The process_image_uploads command then processes the pending uploads in batches: decoding, EXIF
+orientation, encoding and derivatives (see swapp.images.process_upload) run in a pool of worker processes, while the
+images are saved to the database by the command's process. Only one command should run at a time.
+"""
+from django.db import transaction
+
+from items.models import Image, ImageUpload, is_stored, lock_stored_images, release_image
+from swapp.images import process_upload
+from users.models import UserProfile
+
+DEFAULT_BATCH_SIZE = 20
+
+
+def stage_upload(user, file, item=None):
+    """
+    Saves an uploaded file in the staging area.
+
+    :param user: the user uploading the file.
+    :param file: the uploaded file.
+    :param item: the item of the image, or None for a profile picture.
+    :return: the pending upload.
+    """
+    return ImageUpload.objects.create(user=user, item=item, file=file)
+
+
+def process_staged_file(name):
+    """
+    Processes a staged file, in a worker process.
+
+    :return: the name of the stored image and None, or None and the error.
+    """
+    try:
+        return process_upload(name), None
+    except IOError:
+        return None, "The file is not a valid image"
+    except Exception:
+        return None, "The image could not be processed"
+
+
+def complete_upload(upload, image_name, error):
+    """
+    Saves the image of a processed upload to its item or as the profile picture of its user, or its error, then
+    deletes the staged file.
+
+    :return: the name of the profile picture replaced by the upload, to release, or None.
+    """
+    replaced_image = None
+
+    with transaction.atomic():
+        if error is None:
+            # an identical image may have been deleted with its last reference since the upload was processed
+            lock_stored_images([image_name])
+            if not is_stored(image_name):
+                image_name, error = process_staged_file(upload.file.name)
+
+        if error is None:
+            if upload.item_id is not None:
+                upload.image = Image.objects.create(image=image_name, item_id=upload.item_id)
+            else:
+                user_profile = UserProfile.objects.get(user_id=upload.user_id)
+                replaced_image = user_profile.image.name
+                user_profile.image = image_name
+                user_profile.save(update_fields=["image", "last_modification_date"])
+            upload.status = ImageUpload.DONE
+        else:
+            upload.status = ImageUpload.FAILED
+            upload.error = error
+
+        upload.file.delete(False)
+        upload.save()
+
+    return replaced_image
+
+
+def process_image_uploads(pool=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Processes the pending uploads, in batches.
+
+    :param pool: the multiprocessing pool processing the images, or None to process them in the current process.
+    :param batch_size: the number of uploads processed at once.
+    :return: the number of uploads processed.
+    """
+    processed = 0
+
+    while True:
+        uploads = list(ImageUpload.objects.filter(status=ImageUpload.PENDING).order_by("id")[:batch_size])
+        if len(uploads) == 0:
+            return processed
+
+        names = [upload.file.name for upload in uploads]
+        if pool is not None:
+            results = pool.map(process_staged_file, names)
+        else:
+            results = [process_staged_file(name) for name in names]
+
+        # the uploads of the items deleted in the meantime have been deleted with them
+        remaining = set(ImageUpload.objects.filter(pk__in=[u.id for u in uploads]).values_list("id", flat=True))
+
+        # the unused images are released once all the uploads of the batch are saved, as they may share their files
+        released = []
+        for upload, (image_name, error) in zip(uploads, results):
+            if upload.id in remaining:
+                released.append(complete_upload(upload, image_name, error))
+            else:
+                released.append(image_name)
+
+        for name in set(released):
+            release_image(name)
+
+        processed += len(uploads)
@@ -7,5 +7,6 @@ router.register(r"items", views.ItemViewSet, base_name="items")
 router.register(r"categories", views.CategoryViewSet, base_name="categories")
 router.register(r"likes", views.LikeViewSet, base_name="likes")
 router.register(r"images", views.ImageViewSet, base_name="images")
+router.register(r"uploads", views.ImageUploadViewSet, base_name="uploads")
 router.register(r"deliverymethods", views.DeliveryMethodViewSet, base_name="delivery_methods")
 urlpatterns = router.urls
@@ -1,28 +1,22 @@
+import zipfile
+
 from django.contrib.auth.models import User
 from django.db.models import F, FloatField, IntegerField
 from django.db.models import Func
 from rest_framework import mixins
 from rest_framework import status
 from rest_framework import viewsets
-from rest_framework.decorators import detail_route
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.response import Response
 
 from comments.serializers import CommentSerializer
+from items.importer import guess_format, import_items
 from items.serializers import *
-from users.models import Consultation
-
-
-def check_prices(price_min, price_max):
-    if price_min is not None and price_min < 0:
-        raise ValidationError("Price min is negative")
-
-    if price_max is not None and price_max < 0:
-        raise ValidationError("Price max is negative")
-
-    if price_min is not None and price_max is not None and price_min > price_max:
-        raise ValidationError("Price min is higher than price max")
+from items.uploads import stage_upload
+from swapp.pagination import DateCursorPagination
+from users.history import record_consultation
 
 
 def filter_items(data, user):
@@ -63,7 +57,7 @@ def filter_items(data, user):
         queryset = queryset.filter(distance__lte=radius)
 
     if order_by is None:
-        queryset = queryset.order_by("creation_date")
+        queryset = queryset.order_by("creation_date", "id")
     else:
         strings_order_by = {
             "name": "name",
@@ -73,11 +67,19 @@ def filter_items(data, user):
             "range": "distance",
             "date": "creation_date"
         }
-        queryset = queryset.order_by(strings_order_by[order_by])
+        queryset = queryset.order_by(strings_order_by[order_by], "id")
 
     return queryset
 
 
+def price_compatible_items(item):
+    """
+    Returns the available items whose price range overlaps the one of the given item, excluding the item itself.
+    """
+    return Item.objects.filter(~Q(pk=item.id), price_min__lte=item.price_max, price_max__gte=item.price_min,
+                               traded=False, archived=False)
+
+
 def last_similar_points(item, items):
     n_cat_similar = 0
     for i in items:
@@ -165,7 +167,8 @@ def build_item_suggestions(user):
 
     if user.is_authenticated:
         recent_items_liked = [like.item for like in user.like_set.order_by("date")[:10]]
-        recent_items_visited = [consultation.item for consultation in user.consultation_set.order_by("date")[:10]]
+        recent_items_visited = [consultation.item for consultation in
+                                user.consultation_set.select_related("item").order_by("-date")[:10]]
 
     for item in queryset:
         item.points *= 20
@@ -206,17 +209,47 @@ class ItemViewSet(mixins.CreateModelMixin,
         item = get_object_or_404(queryset, pk=pk)
 
         if request.user.is_authenticated:
-            Consultation.objects.create(user=self.request.user, item=item)
+            record_consultation(request.user, item)
 
+        # counted with an update, which doesn't send the signals invalidating the cached account of the owner
+        Item.objects.filter(pk=item.pk).update(views=F("views") + 1)
         item.views += 1
-        item.save()
 
         serializer = DetailedItemSerializer(item, context={"request": self.request})
         return Response(serializer.data)
 
     @detail_route(methods=["GET"])
     def comments(self, request, pk=None):
-        return Response(CommentSerializer(Item.objects.get(pk=pk).comment_set.order_by("-date"), many=True).data)
+        item = get_object_or_404(Item, pk=pk)
+
+        paginator = DateCursorPagination()
+        page = paginator.paginate_queryset(item.comment_set.select_related("user__userprofile"), request, view=self)
+        return paginator.get_paginated_response(CommentSerializer(page, many=True).data)
+
+    @detail_route(methods=["GET"], permission_classes=(IsAuthenticated,))
+    def tradeable_for(self, request, pk=None):
+        serializer = TradeableForSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        item = get_object_or_404(Item, pk=pk)
+        user = request.user
+        compatible_items = price_compatible_items(item).select_related("primary_image")
+
+        items = compatible_items.filter(owner=user).order_by("price_min")
+        nearby = []
+
+        radius = serializer.validated_data["radius"]
+        if radius is not None:
+            nearby = compatible_items.filter(~Q(owner=user), ~Q(owner=item.owner_id)).annotate(
+                distance=Func(user.coordinates.latitude, user.coordinates.longitude,
+                              F("owner__coordinates__latitude"), F("owner__coordinates__longitude"),
+                              function="compute_distance", output_field=FloatField())
+            ).filter(distance__lte=radius).order_by("distance")[:serializer.validated_data["limit"]]
+
+        return Response({
+            "items": InventoryItemSerializer(items, many=True).data,
+            "nearby": InventoryItemSerializer(nearby, many=True).data
+        })
 
     @detail_route(methods=["POST"])
     def archive(self, request, pk=None):
@@ -244,9 +277,31 @@ class ItemViewSet(mixins.CreateModelMixin,
         serializer.is_valid(raise_exception=True)
 
         item = get_object_or_404(Item, pk=pk)
-        i = Image.objects.create(image=serializer.validated_data["image"], item=item)
+        upload = stage_upload(request.user, serializer.validated_data["image"], item=item)
+
+        return Response(status=status.HTTP_202_ACCEPTED, data=ImageUploadSerializer(upload).data,
+                        headers={"Location": "/api/uploads/%d/" % upload.id})
+
+    @list_route(methods=["POST"], url_path="import")
+    def import_items(self, request):
+        serializer = ImportItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        file = serializer.validated_data["file"]
+        fmt = serializer.validated_data["format"] or guess_format(file.name)
+        images = serializer.validated_data["images"]
 
-        return Response(status=status.HTTP_201_CREATED, data=ImageSerializer(i).data, headers={"Location": i.image.url})
+        if images is None:
+            return Response(import_items(request.user, file, fmt=fmt))
+
+        try:
+            archive = zipfile.ZipFile(images)
+        except zipfile.BadZipFile:
+            raise ValidationError("The images archive is not a valid zip file")
+
+        with archive:
+            report = import_items(request.user, file, fmt=fmt, archive=archive)
+        return Response(report)
 
     def list(self, request, *args, **kwargs):
         serializer = SearchItemsSerializer(data=request.query_params)
@@ -306,6 +361,18 @@ class ImageViewSet(mixins.DestroyModelMixin,
     permission_classes = (IsAuthenticated,)
 
 
+class ImageUploadViewSet(mixins.RetrieveModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    Allows to poll the status of the images uploaded by the current user.
+    """
+    serializer_class = ImageUploadSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return ImageUpload.objects.filter(user=self.request.user).select_related("image", "user__userprofile")
+
+
 class LikeViewSet(mixins.ListModelMixin,
                   mixins.CreateModelMixin,
                   mixins.RetrieveModelMixin,
@@ -314,9 +381,10 @@ class LikeViewSet(mixins.ListModelMixin,
 
     serializer_class = LikeSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = DateCursorPagination
 
     def get_queryset(self):
-        return Like.objects.filter(user=self.request.user).order_by("-date")
+        return Like.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         item = serializer.validated_data["item"]
@@ -0,0 +1,174 @@
+from collections import OrderedDict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from comments.models import Comment
+from notifications.models import Notification, NotificationEvent
+from notifications.pubsub import publish_notifications
+from offers.models import Offer
+from private_messages.models import Message
+from users.models import Note
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def message_notification(message):
+    return Notification(content="New private message", user_id=message.user_to_id, message=message)
+
+
+def note_notification(note):
+    return Notification(content="New note %d with text: %s" % (note.note, note.text),
+                        user_id=note.offer.item_received.owner_id, note=note)
+
+
+def comment_notification(comment):
+    return Notification(content="%s has commented your item: %s" % (comment.user.username, comment.item.name),
+                        user_id=comment.item.owner_id, comment=comment)
+
+
+def new_offer_notification(offer):
+    return Notification(content="New offer for item: %s" % offer.item_received.name,
+                        user_id=offer.item_received.owner_id, offer=offer)
+
+
+def accepted_offer_notification(offer):
+    return Notification(content="Offer accepted for item: %s" % offer.item_received.name,
+                        user_id=offer.item_received.owner_id, offer=offer)
+
+
+def refused_offer_notification(offer):
+    return Notification(content="Offer refused for item: %s" % offer.item_received.name,
+                        user_id=offer.item_received.owner_id, offer=offer)
+
+
+# for each kind of event: the queryset of its targets and the function building its notification
+NOTIFICATION_BUILDERS = {
+    Notification.MESSAGE: (Message.objects.select_related("user_from"), message_notification),
+    Notification.NOTE: (Note.objects.select_related("offer__item_received"), note_notification),
+    Notification.COMMENT: (Comment.objects.select_related("user", "item"), comment_notification),
+    Notification.NEW_OFFER: (Offer.objects.select_related("item_received"), new_offer_notification),
+    Notification.ACCEPTED_OFFER: (Offer.objects.select_related("item_received"), accepted_offer_notification),
+    Notification.REFUSED_OFFER: (Offer.objects.select_related("item_received"), refused_offer_notification),
+}
+
+
+# for each kind of event whose notifications are coalesced: the group of a target, and the content of the
+# notification of several targets of a group
+COALESCED_KINDS = {
+    Notification.MESSAGE: (lambda message: "message:%d" % message.user_from_id,
+                           lambda message, count: "%d new private messages from %s" %
+                                                  (count, message.user_from.username)),
+    Notification.COMMENT: (lambda comment: "comment:%d" % comment.item_id,
+                           lambda comment, count: "%d new comments on your item: %s" % (count, comment.item.name)),
+}
+
+
+def build_notifications(events, date):
+    """
+    Builds the notifications of the given events, loading their targets with one query per kind of event. Events
+    whose target has been deleted in the meantime are skipped.
+
+    :param date: the date of the notifications, the date of their dispatch rather than of their events: the streams
+    are ordered by date, and an event committed late would be older than the position of the streams.
+    """
+    targets = {}
+    for kind in set(e.kind for e in events):
+        queryset, _ = NOTIFICATION_BUILDERS[kind]
+        targets[kind] = queryset.in_bulk([e.target_id for e in events if e.kind == kind])
+
+    notifications = []
+    for event in events:
+        target = targets[event.kind].get(event.target_id)
+
+        if target is not None:
+            notification = NOTIFICATION_BUILDERS[event.kind][1](target)
+            notification.kind = event.kind
+            notification.date = date
+            if event.kind in COALESCED_KINDS:
+                notification.group = COALESCED_KINDS[event.kind][0](target)
+            notifications.append(notification)
+
+    return notifications
+
+
+def coalesce_notifications(notifications):
+    """
+    Merges the notifications of a same group and user: in the given notifications, then with the unread notification
+    of the group updated in the last settings.NOTIFICATIONS_COALESCING_WINDOW seconds, which is updated in place with
+    the date of the new notifications. A merged notification targets the last object of its group.
+
+    :param notifications: the unsaved notifications, in chronological order.
+    :return: the notifications to create, and the existing notifications to update.
+    """
+    created = []
+    merged = OrderedDict()
+    for notification in notifications:
+        if notification.group:
+            key = (notification.user_id, notification.group)
+            if key in merged:
+                notification.count += merged[key].count
+            merged[key] = notification
+        else:
+            created.append(notification)
+
+    if len(merged) == 0:
+        return created, []
+
+    window_start = timezone.now() - timedelta(seconds=settings.NOTIFICATIONS_COALESCING_WINDOW)
+    existing = {
+        (n.user_id, n.group): n
+        for n in Notification.objects.filter(user_id__in=set(user_id for user_id, _ in merged),
+                                             group__in=set(group for _, group in merged),
+                                             read=False, date__gte=window_start).order_by("date")
+    }
+
+    updated = []
+    for key, notification in merged.items():
+        # the target of a coalesced notification is stored in the field named after its kind
+        target = getattr(notification, notification.kind)
+
+        if key in existing:
+            previous = existing[key]
+            previous.count += notification.count
+            previous.date = notification.date
+            setattr(previous, notification.kind, target)
+            notification = previous
+            updated.append(notification)
+        else:
+            created.append(notification)
+
+        if notification.count > 1:
+            notification.content = COALESCED_KINDS[notification.kind][1](target, notification.count)
+
+    created.sort(key=lambda n: n.date)
+    return created, updated
+
+
+def dispatch_notification_events(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Turns the pending notification events into notifications, in batches. Each batch is processed in one
+    transaction, so that an event is either pending or notified. Only one dispatcher should run at a time.
+
+    :return: the number of events processed.
+    """
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            events = list(NotificationEvent.objects.order_by("id")[:batch_size])
+            if len(events) == 0:
+                return processed
+
+            created, updated = coalesce_notifications(build_notifications(events, timezone.now()))
+            Notification.objects.bulk_create(created)
+            for notification in updated:
+                notification.save(update_fields=["content", "count", "date", notification.kind])
+            NotificationEvent.objects.filter(pk__in=[e.id for e in events]).delete()
+
+            transaction.on_commit(partial(publish_notifications, [n.user_id for n in created + updated]))
+
+        processed += len(events)
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.dispatcher import DEFAULT_BATCH_SIZE, dispatch_notification_events
+
+
+class Command(BaseCommand):
+    help = "Turns the pending notification events into notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep dispatching the new events until interrupted.")
+        parser.add_argument("--interval", type=float, default=1,
+                            help="The number of seconds to wait between two dispatches when looping.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="The number of events processed per transaction.")
+
+    def handle(self, *args, **options):
+        while True:
+            count = dispatch_notification_events(batch_size=options["batch_size"])
+            if not options["loop"]:
+                self.stdout.write("%d notification events dispatched" % count)
+                return
+
+            if count == 0:
+                time.sleep(options["interval"])
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 04:04
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0001_initial'),
+        ('comments', '0001_initial'),
+        ('private_messages', '0001_initial'),
+        ('offers', '0002_auto_20261019_0601'),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='comment',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='comments.Comment'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(blank=True, choices=[('message', 'New private message'), ('note', 'New note'), ('comment', 'New comment'), ('new_offer', 'New offer'), ('accepted_offer', 'Offer accepted'), ('refused_offer', 'Offer refused')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='message',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='private_messages.Message'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='note',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='users.Note'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='offer',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='offers.Offer'),
+        ),
+        migrations.AlterIndexTogether(
+            name='notification',
+            index_together=set([('user', 'date')]),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def copy_notification_targets(apps, schema_editor):
+    """
+    Copies the targets of the typed notification tables to the notification rows.
+    """
+    Notification = apps.get_model("notifications", "Notification")
+
+    for model_name, kind, target in (("MessageNotification", "message", "message"),
+                                     ("NoteNotification", "note", "note"),
+                                     ("CommentNotification", "comment", "comment")):
+        model = apps.get_model("notifications", model_name)
+        for notification_id, target_id in model.objects.values_list("notification_id", "%s_id" % target).iterator():
+            Notification.objects.filter(pk=notification_id).update(**{"kind": kind, "%s_id" % target: target_id})
+
+    for model_name, kind in (("NewOfferNotification", "new_offer"),
+                             ("AcceptedOfferNotification", "accepted_offer"),
+                             ("RefusedOfferNotification", "refused_offer")):
+        model = apps.get_model("notifications", model_name)
+        for notification_id, offer_id in model.objects.values_list("offer_notification__notification_id",
+                                                                   "offer_notification__offer_id").iterator():
+            Notification.objects.filter(pk=notification_id).update(kind=kind, offer_id=offer_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_auto_20261019_0604'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_notification_targets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 04:04
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_targets'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='acceptedoffernotification',
+            name='offer_notification',
+        ),
+        migrations.RemoveField(
+            model_name='commentnotification',
+            name='comment',
+        ),
+        migrations.RemoveField(
+            model_name='commentnotification',
+            name='notification',
+        ),
+        migrations.RemoveField(
+            model_name='messagenotification',
+            name='message',
+        ),
+        migrations.RemoveField(
+            model_name='messagenotification',
+            name='notification',
+        ),
+        migrations.RemoveField(
+            model_name='newoffernotification',
+            name='offer_notification',
+        ),
+        migrations.RemoveField(
+            model_name='notenotification',
+            name='note',
+        ),
+        migrations.RemoveField(
+            model_name='notenotification',
+            name='notification',
+        ),
+        migrations.RemoveField(
+            model_name='offernotification',
+            name='notification',
+        ),
+        migrations.RemoveField(
+            model_name='offernotification',
+            name='offer',
+        ),
+        migrations.RemoveField(
+            model_name='refusedoffernotification',
+            name='offer_notification',
+        ),
+        migrations.DeleteModel(
+            name='AcceptedOfferNotification',
+        ),
+        migrations.DeleteModel(
+            name='CommentNotification',
+        ),
+        migrations.DeleteModel(
+            name='MessageNotification',
+        ),
+        migrations.DeleteModel(
+            name='NewOfferNotification',
+        ),
+        migrations.DeleteModel(
+            name='NoteNotification',
+        ),
+        migrations.DeleteModel(
+            name='OfferNotification',
+        ),
+        migrations.DeleteModel(
+            name='RefusedOfferNotification',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 06:26
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_auto_20261019_0616'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notificationevent',
+            name='date',
+        ),
+    ]
@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+
 from django.contrib.auth.models import User
 from django.db import models
 from django.db.models.signals import post_save
@@ -10,104 +12,134 @@ from private_messages.models import Message
 from users.models import Note
 
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def format_position(date, notification_id):
+    """
+    Formats the position of a notification in the stream of its user (see notifications.stream), its date being
+    counted in microseconds without going through a float, which could round it.
+    """
+    return "%d-%d" % ((date - EPOCH) // timedelta(microseconds=1), notification_id)
+
+
+def parse_position(position):
+    """
+    Parses a position in the stream, as formatted by format_position.
+
+    :return: the date and the id of the notification, or None if the position is invalid.
+    """
+    try:
+        timestamp, notification_id = position.split("-")
+        date = EPOCH + timedelta(microseconds=int(timestamp))
+        return date, int(notification_id)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
 class Notification(models.Model):
+    MESSAGE = "message"
+    NOTE = "note"
+    COMMENT = "comment"
+    NEW_OFFER = "new_offer"
+    ACCEPTED_OFFER = "accepted_offer"
+    REFUSED_OFFER = "refused_offer"
+    KIND_CHOICES = (
+        (MESSAGE, "New private message"),
+        (NOTE, "New note"),
+        (COMMENT, "New comment"),
+        (NEW_OFFER, "New offer"),
+        (ACCEPTED_OFFER, "Offer accepted"),
+        (REFUSED_OFFER, "Offer refused"),
+    )
+
     content = models.CharField(max_length=100)
     read = models.BooleanField(default=False)
+
+    # date of the last dispatch creating or updating the notification, which orders the streams
     date = models.DateTimeField("date published", default=timezone.now)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, blank=True, default="")
+
+    # notifications of a same group are coalesced into one, counting them (see notifications.dispatcher)
+    group = models.CharField(max_length=50, blank=True, default="")
+    count = models.PositiveIntegerField(default=1)
+
+    # target of the notification, depending on its kind
+    message = models.ForeignKey(Message, null=True, on_delete=models.SET_NULL)
+    note = models.ForeignKey(Note, null=True, on_delete=models.SET_NULL)
+    comment = models.ForeignKey(Comment, null=True, on_delete=models.SET_NULL)
+    offer = models.ForeignKey(Offer, null=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        index_together = [("user", "date"), ("user", "read")]
 
     def __str__(self):
         return self.content
 
+    @property
+    def position(self):
+        return format_position(self.date, self.id)
 
-class MessageNotification(models.Model):
-    notification = models.OneToOneField(Notification, on_delete=models.CASCADE)
-    message = models.OneToOneField(Message, on_delete=models.CASCADE)
+
+class NotificationEvent(models.Model):
+    """
+    Outbox of the events to notify. Events are written in the transaction of the object they are about, and turned
+    into notifications in batches by the dispatcher (see notifications.dispatcher). They aren't dated, as the
+    notifications are dated at their dispatch.
+    """
+    kind = models.CharField(max_length=20, choices=Notification.KIND_CHOICES)
+    target_id = models.IntegerField()
+
+    def __str__(self):
+        return "%s %d" % (self.kind, self.target_id)
 
 
 @receiver(post_save, sender=Message)
 def new_message_notification(sender, instance, signal, created, **kwargs):
     """
-    Handler to create a notification when a message is created.
+    Handler to create a notification event when a message is created.
     """
     if created:
-        notification = Notification.objects.create(content="New private message", user=instance.user_to)
-        MessageNotification.objects.create(notification=notification, message=instance)
-
-
-class NoteNotification(models.Model):
-    notification = models.OneToOneField(Notification, on_delete=models.CASCADE)
-    note = models.OneToOneField(Note, on_delete=models.CASCADE)
+        NotificationEvent.objects.create(kind=Notification.MESSAGE, target_id=instance.id)
 
 
 @receiver(post_save, sender=Note)
 def new_note_notification(sender, instance, signal, created, **kwargs):
     """
-    Handler to create a notification when a note is given (created).
+    Handler to create a notification event when a note is given (created).
     """
     if created:
-        notification = Notification.objects.create(content="New note %d with text: %s" % (instance.note, instance.text),
-                                                   user=instance.offer.item_received.owner)
-        NoteNotification.objects.create(notification=notification, note=instance)
-
-
-class CommentNotification(models.Model):
-    notification = models.OneToOneField(Notification, on_delete=models.CASCADE)
-    comment = models.OneToOneField(Comment, on_delete=models.CASCADE)
+        NotificationEvent.objects.create(kind=Notification.NOTE, target_id=instance.id)
 
 
 @receiver(post_save, sender=Comment)
 def new_comment_notification(sender, instance, signal, created, **kwargs):
     """
-    Handler to create a notification when a comment is created.
+    Handler to create a notification event when a comment is created.
     """
     if created:
-        notification = Notification.objects.create(content="%s has commented your item: %s" %
-                                                           (instance.user.username, instance.item.name),
-                                                   user=instance.item.owner)
-        CommentNotification.objects.create(notification=notification, comment=instance)
-
-
-class OfferNotification(models.Model):
-    notification = models.OneToOneField(Notification, on_delete=models.CASCADE)
-    offer = models.ForeignKey(Offer, on_delete=models.CASCADE)
-
-
-class NewOfferNotification(models.Model):
-    offer_notification = models.OneToOneField(OfferNotification, on_delete=models.CASCADE)
+        NotificationEvent.objects.create(kind=Notification.COMMENT, target_id=instance.id)
 
 
 @receiver(post_save, sender=Offer)
 def new_offer_notification(sender, instance, signal, created, **kwargs):
     """
-    Handler to create a notification when an offer is created.
+    Handler to create a notification event when an offer is created, accepted or refused.
     """
     if created:
-        notification = Notification.objects.create(content="New offer for item: %s" % instance.item_received.name,
-                                                   user=instance.item_received.owner)
-        offer_notification = OfferNotification.objects.create(notification=notification, offer=instance)
-        NewOfferNotification.objects.create(offer_notification=offer_notification)
-    else:
-        if instance.answered:
-            if instance.accepted:
-                # create notification for accepted offer
-                notification = Notification.objects.create(content="Offer accepted for item: %s" %
-                                                                   instance.item_received.name,
-                                                           user=instance.item_received.owner)
-                offer_notification = OfferNotification.objects.create(notification=notification, offer=instance)
-                AcceptedOfferNotification.objects.create(offer_notification=offer_notification)
-            else:
-                # create notification for refused offer
-                notification = Notification.objects.create(content="Offer refused for item: %s" %
-                                                                   instance.item_received.name,
-                                                           user=instance.item_received.owner)
-                offer_notification = OfferNotification.objects.create(notification=notification, offer=instance)
-                RefusedOfferNotification.objects.create(offer_notification=offer_notification)
-
-
-class AcceptedOfferNotification(models.Model):
-    offer_notification = models.OneToOneField(OfferNotification, on_delete=models.CASCADE)
-
-
-class RefusedOfferNotification(models.Model):
-    offer_notification = models.OneToOneField(OfferNotification, on_delete=models.CASCADE)
+        NotificationEvent.objects.create(kind=Notification.NEW_OFFER, target_id=instance.id)
+    elif instance.answered:
+        kind = Notification.ACCEPTED_OFFER if instance.accepted else Notification.REFUSED_OFFER
+        NotificationEvent.objects.create(kind=kind, target_id=instance.id)
+
+
+def create_refused_offer_events(offer_ids):
+    """
+    Creates the notification events of offers refused in bulk, for offers updated without being saved one by one.
+
+    :param offer_ids: the ids of the refused offers.
+    """
+    NotificationEvent.objects.bulk_create([
+        NotificationEvent(kind=Notification.REFUSED_OFFER, target_id=offer_id) for offer_id in offer_ids
+    ])
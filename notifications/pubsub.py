@@ -0,0 +1,93 @@
+"""
+Publish/subscribe of the new notifications, to wake up the notification streams of their users.
+
+Only the fact that a user has new notifications is published: each user has a version, changed on publish, and the
+streams wait for the version of their user to change before looking for new notifications in the database.
+
+Two brokers are available, selected by settings.NOTIFICATIONS_BROKER:
+
+- LocalBroker keeps the versions in memory and wakes up the waiting streams at once, but only sees the notifications
+  published by its own process.
+- CacheBroker keeps the versions in the Django cache and is checked every NOTIFICATIONS_BROKER_POLL_INTERVAL seconds.
+  It works across processes (server workers and dispatcher) when the cache is shared between them. Its versions are
+  random rather than increased, as a version culled from the cache and published again would start over.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+class LocalBroker:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = {}
+
+    def version(self, user_id):
+        with self._condition:
+            return self._versions.get(user_id, 0)
+
+    def publish(self, user_ids):
+        with self._condition:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._condition.notify_all()
+
+    def wait(self, user_id, version, timeout):
+        """
+        Waits for the version of the user to be different from the given one.
+
+        :return: the version of the user, which is the given one if the timeout expired.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(user_id, 0) != version, timeout)
+            return self._versions.get(user_id, 0)
+
+
+class CacheBroker:
+    key_prefix = "notifications:version:"
+
+    def version(self, user_id):
+        return cache.get(self.key_prefix + str(user_id), 0)
+
+    def publish(self, user_ids):
+        cache.set_many({self.key_prefix + str(user_id): uuid.uuid4().hex for user_id in user_ids}, timeout=None)
+
+    def wait(self, user_id, version, timeout):
+        interval = getattr(settings, "NOTIFICATIONS_BROKER_POLL_INTERVAL", 1)
+        deadline = time.time() + timeout
+
+        while True:
+            current = self.version(user_id)
+            remaining = deadline - time.time()
+            if current != version or remaining <= 0:
+                return current
+            time.sleep(min(interval, remaining))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, "NOTIFICATIONS_BROKER", "notifications.pubsub.LocalBroker"))()
+        return _broker
+
+
+def reset_broker():
+    global _broker
+    _broker = None
+
+
+def publish_notifications(user_ids):
+    """
+    Wakes up the notification streams of the given users.
+    """
+    get_broker().publish(set(user_ids))
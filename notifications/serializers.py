@@ -1,12 +1,29 @@
 from rest_framework import serializers
 
-from notifications.models import Notification
+from notifications.models import Notification, parse_position
 
 
 class NotificationSerializer(serializers.ModelSerializer):
     content = serializers.CharField(read_only=True)
     date = serializers.DateTimeField(read_only=True)
+    kind = serializers.CharField(read_only=True)
+    count = serializers.IntegerField(read_only=True)
+    position = serializers.CharField(read_only=True)
 
     class Meta:
         model = Notification
-        fields = ("id", "content", "read", "date")
+        fields = ("id", "content", "kind", "count", "read", "date", "position")
+
+
+class MarkReadSerializer(serializers.Serializer):
+    # position of the last notification seen by the client, as a coalesced notification may have been updated since
+    up_to = serializers.CharField(required=False, default=None)
+
+    def validate_up_to(self, value):
+        if value is None:
+            return None
+
+        position = parse_position(value)
+        if position is None:
+            raise serializers.ValidationError("Invalid position")
+        return position
@@ -0,0 +1,73 @@
+import json
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from notifications.pubsub import get_broker
+from notifications.serializers import NotificationSerializer
+
+STREAM_BATCH_SIZE = 100
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Renderer of the responses of the streams which are not streamed, as errors, as a single "error" event.
+    """
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return "event: error\ndata: %s\n\n" % json.dumps(data)
+
+
+def format_event(notification):
+    """
+    Formats a notification as an event, whose id is the position of the notification in the stream.
+    """
+    data = JSONRenderer().render(NotificationSerializer(notification).data).decode("utf-8")
+    return "id: %s\nevent: notification\ndata: %s\n\n" % (notification.position, data)
+
+
+def notification_events(user, last_date, last_id):
+    """
+    Generates the server-sent events of the notifications of the user following the given position, as they are
+    created or updated. Notifications are streamed by date, so coalesced notifications are sent again when their date
+    is updated. The dates are stamped by the dispatcher, the only writer, so they increase in the order the
+    notifications are committed and a stream never skips a notification committed after its position.
+
+    The stream waits on the broker for the notifications of the user to be published, and only then queries the
+    database. It also queries it after each keepalive, in case the broker missed notifications published by another
+    process, and ends after settings.NOTIFICATIONS_STREAM_MAX_DURATION seconds.
+
+    :param user: the user whose notifications are streamed.
+    :param last_date: the date of the last notification already received by the client.
+    :param last_id: the id of the last notification already received by the client.
+    """
+    broker = get_broker()
+    deadline = time.time() + settings.NOTIFICATIONS_STREAM_MAX_DURATION
+
+    version = broker.version(user.id)
+    yield "retry: 3000\n\n"
+
+    while True:
+        notifications = list(user.notification_set
+                             .filter(Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id))
+                             .order_by("date", "id")[:STREAM_BATCH_SIZE])
+        for notification in notifications:
+            last_date, last_id = notification.date, notification.id
+            yield format_event(notification)
+
+        if len(notifications) == STREAM_BATCH_SIZE:
+            continue
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return
+
+        new_version = broker.wait(user.id, version, min(settings.NOTIFICATIONS_STREAM_KEEPALIVE, remaining))
+        if new_version == version:
+            yield ": keepalive\n\n"
+        version = new_version
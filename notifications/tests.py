@@ -1,13 +1,16 @@
 import json
+import threading
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework import status
 
 from items.models import Category, Item
-from notifications.models import Notification, OfferNotification, NewOfferNotification, AcceptedOfferNotification, \
-    RefusedOfferNotification, CommentNotification, MessageNotification, NoteNotification
+from notifications.dispatcher import dispatch_notification_events
+from notifications.models import Notification, NotificationEvent
+from notifications.pubsub import CacheBroker, LocalBroker
 
 
 class NotificationAPITest(TestCase):
@@ -94,18 +97,20 @@ class NotificationAPITest(TestCase):
         self.login1()
 
         r = self.get_notifications()
-        self.assertEqual(len(r.data), 0)
+        self.assertEqual(len(r.data["results"]), 0)
 
         self.post_offer(self.item1, self.item7)
+        dispatch_notification_events()
 
         self.login2()
         r = self.get_notifications()
         self.assertEqual(r.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(r.data), 1)
-        self.assertIn("id", r.data[0])
-        self.assertIn("content", r.data[0])
-        self.assertIn("read", r.data[0])
-        self.assertIn("date", r.data[0])
+        self.assertEqual(len(r.data["results"]), 1)
+        self.assertIn("id", r.data["results"][0])
+        self.assertIn("content", r.data["results"][0])
+        self.assertIn("read", r.data["results"][0])
+        self.assertIn("date", r.data["results"][0])
+        self.assertEqual(r.data["results"][0]["kind"], Notification.NEW_OFFER)
 
     def test_get_notification_order_by_date(self):
         now = timezone.now()
@@ -120,9 +125,9 @@ class NotificationAPITest(TestCase):
         self.login1()
 
         r = self.get_notifications()
-        self.assertEquals(r.data[0]["content"], "test1")
-        self.assertEquals(r.data[1]["content"], "test3")
-        self.assertEquals(r.data[2]["content"], "test2")
+        self.assertEquals(r.data["results"][0]["content"], "test1")
+        self.assertEquals(r.data["results"][1]["content"], "test3")
+        self.assertEquals(r.data["results"][2]["content"], "test2")
 
     def test_patch_notification(self):
         self.login1()
@@ -136,22 +141,22 @@ class NotificationAPITest(TestCase):
         self.login1()
         self.post_offer(self.item1, self.item7)
         self.post_offer(self.item2, self.item6)
+        dispatch_notification_events()
 
         self.assertEqual(Notification.objects.count(), 2)
         self.assertEqual(Notification.objects.get(pk=1).user.username, "user2")
-        self.assertEqual(OfferNotification.objects.count(), 2)
-        self.assertEqual(OfferNotification.objects.get(pk=1).offer.id, 1)
-        self.assertEqual(OfferNotification.objects.get(pk=2).offer.id, 2)
-        self.assertEqual(NewOfferNotification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(pk=1).offer.id, 1)
+        self.assertEqual(Notification.objects.get(pk=2).offer.id, 2)
+        self.assertEqual(Notification.objects.filter(kind=Notification.NEW_OFFER).count(), 2)
 
         self.login2()
         self.post_offer(self.item5, self.item3)
+        dispatch_notification_events()
 
         self.assertEqual(Notification.objects.count(), 3)
         self.assertEqual(Notification.objects.get(pk=3).user.username, "user1")
-        self.assertEqual(OfferNotification.objects.count(), 3)
-        self.assertEqual(OfferNotification.objects.get(pk=3).offer.id, 3)
-        self.assertEqual(NewOfferNotification.objects.count(), 3)
+        self.assertEqual(Notification.objects.get(pk=3).offer.id, 3)
+        self.assertEqual(Notification.objects.filter(kind=Notification.NEW_OFFER).count(), 3)
 
     def test_offer_accepted_notification(self):
         self.login1()
@@ -161,13 +166,13 @@ class NotificationAPITest(TestCase):
         self.login2()
         self.patch_offer(1, accepted=True)
         self.patch_offer(2, accepted=True)
+        dispatch_notification_events()
 
         self.assertEqual(Notification.objects.count(), 4)
         self.assertEqual(Notification.objects.get(pk=1).user.username, "user2")
-        self.assertEqual(OfferNotification.objects.count(), 4)
-        self.assertEqual(OfferNotification.objects.get(pk=1).offer.id, 1)
-        self.assertEqual(OfferNotification.objects.get(pk=2).offer.id, 2)
-        self.assertEqual(AcceptedOfferNotification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(pk=1).offer.id, 1)
+        self.assertEqual(Notification.objects.get(pk=2).offer.id, 2)
+        self.assertEqual(Notification.objects.filter(kind=Notification.ACCEPTED_OFFER).count(), 2)
 
     def test_offer_refused_notification(self):
         self.login1()
@@ -177,15 +182,30 @@ class NotificationAPITest(TestCase):
         self.login2()
         self.patch_offer(1, accepted=False)
         self.patch_offer(2, accepted=False)
+        dispatch_notification_events()
 
         self.assertEqual(Notification.objects.count(), 4)
         self.assertEqual(Notification.objects.get(pk=1).user.username, "user2")
-        self.assertEqual(OfferNotification.objects.count(), 4)
-        self.assertEqual(OfferNotification.objects.get(pk=1).offer.id, 1)
-        self.assertEqual(OfferNotification.objects.get(pk=2).offer.id, 2)
-        self.assertEqual(OfferNotification.objects.get(pk=3).offer.id, 1)
-        self.assertEqual(OfferNotification.objects.get(pk=4).offer.id, 2)
-        self.assertEqual(RefusedOfferNotification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(pk=1).offer.id, 1)
+        self.assertEqual(Notification.objects.get(pk=2).offer.id, 2)
+        self.assertEqual(Notification.objects.get(pk=3).offer.id, 1)
+        self.assertEqual(Notification.objects.get(pk=4).offer.id, 2)
+        self.assertEqual(Notification.objects.filter(kind=Notification.REFUSED_OFFER).count(), 2)
+
+    def test_pending_offers_refused_notification_when_offer_accepted(self):
+        self.login1()
+        self.post_offer(self.item1, self.item7)
+        self.post_offer(self.item2, self.item7)
+        self.post_offer(self.item3, self.item7)
+
+        self.login2()
+        self.patch_offer(1, accepted=True)
+        dispatch_notification_events()
+
+        self.assertEqual(Notification.objects.filter(kind=Notification.ACCEPTED_OFFER).count(), 1)
+        self.assertEqual(set(n.offer_id for n in Notification.objects.filter(kind=Notification.REFUSED_OFFER)),
+                         {2, 3})
+        self.assertEqual(Notification.objects.filter(content="Offer refused for item: Phone").count(), 2)
 
     def test_new_comment_notification(self):
         self.login1()
@@ -194,10 +214,11 @@ class NotificationAPITest(TestCase):
         self.post_comment(self.current_user, self.item6)
         self.post_comment(self.current_user, self.item7)
         self.post_comment(self.current_user, self.item8)
+        dispatch_notification_events()
 
         self.assertEqual(Notification.objects.count(), 4)
         self.assertEqual(Notification.objects.get(pk=1).user.username, "user2")
-        self.assertEqual(CommentNotification.objects.count(), 4)
+        self.assertEqual(Notification.objects.filter(kind=Notification.COMMENT, comment__isnull=False).count(), 4)
 
     def test_new_note_notification(self):
         self.login1()
@@ -209,19 +230,260 @@ class NotificationAPITest(TestCase):
         self.patch_offer(2, accepted=True)
         self.post_note(self.current_user, 1)
         self.post_note(self.current_user, 2)
+        dispatch_notification_events()
 
         self.assertEqual(Notification.objects.count(), 6)
         self.assertEqual(Notification.objects.get(pk=5).user.username, "user2")
-        self.assertEqual(NoteNotification.objects.count(), 2)
+        self.assertEqual(Notification.objects.filter(kind=Notification.NOTE, note__isnull=False).count(), 2)
 
     def test_new_message_notification(self):
         self.login1()
 
         self.post_message(self.current_user, self.other_user)
         self.post_message(self.current_user, self.other_user)
+        self.login2()
         self.post_message(self.other_user, self.current_user)
-        self.post_message(self.other_user, self.current_user)
+        dispatch_notification_events()
 
-        self.assertEqual(Notification.objects.count(), 4)
+        # the messages of a same user are coalesced
+        self.assertEqual(Notification.objects.count(), 2)
         self.assertEqual(Notification.objects.get(pk=1).user.username, "user2")
-        self.assertEqual(MessageNotification.objects.count(), 4)
+        self.assertEqual(Notification.objects.get(pk=1).count, 2)
+        self.assertEqual(Notification.objects.get(pk=1).content, "2 new private messages from user1")
+        self.assertEqual(Notification.objects.filter(kind=Notification.MESSAGE, message__isnull=False).count(), 2)
+
+    def test_notifications_dispatched_from_events(self):
+        self.login1()
+        self.post_offer(self.item1, self.item7)
+        self.post_comment(self.current_user, self.item5)
+
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(NotificationEvent.objects.count(), 2)
+
+        self.assertEqual(dispatch_notification_events(batch_size=1), 2)
+        self.assertEqual(NotificationEvent.objects.count(), 0)
+        self.assertEqual(list(Notification.objects.order_by("id").values_list("kind", flat=True)),
+                         [Notification.NEW_OFFER, Notification.COMMENT])
+        self.assertEqual(dispatch_notification_events(), 0)
+
+    def test_event_of_deleted_target_not_dispatched(self):
+        self.login1()
+        self.post_comment(self.current_user, self.item5)
+        self.item5.comment_set.all().delete()
+
+        self.assertEqual(dispatch_notification_events(), 1)
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(NotificationEvent.objects.count(), 0)
+
+    def create_notifications(self, count, user=None):
+        now = timezone.now()
+        for i in range(count):
+            Notification.objects.create(content="test%d" % i, date=now + timezone.timedelta(seconds=i),
+                                        user=user or self.current_user)
+
+    def test_notifications_paginated_with_cursor(self):
+        self.create_notifications(25)
+        self.login1()
+
+        r = self.get_notifications()
+        self.assertEqual(len(r.data["results"]), 20)
+        self.assertEqual(r.data["results"][0]["content"], "test24")
+        self.assertIsNone(r.data["previous"])
+
+        Notification.objects.create(content="newest", date=timezone.now() + timezone.timedelta(hours=1),
+                                    user=self.current_user)
+
+        r = self.client.get(r.data["next"])
+        self.assertEqual([n["content"] for n in r.data["results"]], ["test%d" % i for i in range(4, -1, -1)])
+        self.assertIsNone(r.data["next"])
+
+    def test_unread_count(self):
+        self.create_notifications(3)
+        self.create_notifications(2, user=self.other_user)
+        Notification.objects.filter(content="test0").update(read=True)
+        self.login1()
+
+        r = self.client.get("%sunread_count/" % self.notifications_url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["count"], 2)
+
+    def test_mark_all_read(self):
+        self.create_notifications(3)
+        self.create_notifications(2, user=self.other_user)
+        self.login1()
+
+        r = self.client.post("%smark_read/" % self.notifications_url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["count"], 3)
+        self.assertEqual(Notification.objects.filter(user=self.current_user, read=False).count(), 0)
+        self.assertEqual(Notification.objects.filter(user=self.other_user, read=False).count(), 2)
+
+    def mark_read_up_to(self, position):
+        return self.client.post("%smark_read/" % self.notifications_url, data=json.dumps({"up_to": position}),
+                                content_type="application/json")
+
+    def test_mark_read_up_to_position(self):
+        self.create_notifications(3)
+        self.login1()
+
+        r = self.mark_read_up_to(Notification.objects.get(content="test1").position)
+        self.assertEqual(r.data["count"], 2)
+        self.assertEqual(list(Notification.objects.filter(read=False).values_list("content", flat=True)), ["test2"])
+
+        r = self.mark_read_up_to("invalid")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_mark_read_leaves_notifications_coalesced_since_unread(self):
+        self.login1()
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+        self.login2()
+        seen = self.client.get(self.notifications_url).data["results"][0]["position"]
+
+        # the notification seen by the client is coalesced with a new comment before it is marked as read
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+
+        r = self.mark_read_up_to(seen)
+        self.assertEqual(r.data["count"], 0)
+        self.assertEqual(Notification.objects.get().read, False)
+
+    def test_unread_count_not_logged_in(self):
+        r = self.client.get("%sunread_count/" % self.notifications_url)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def get_stream(self, data=None, **headers):
+        r = self.client.get("%sstream/" % self.notifications_url, data, HTTP_ACCEPT="text/event-stream", **headers)
+        return r, b"".join(r.streaming_content).decode("utf-8") if r.streaming else r.content.decode("utf-8")
+
+    @override_settings(NOTIFICATIONS_STREAM_MAX_DURATION=0)
+    def test_stream_notifications_after_last_id(self):
+        self.create_notifications(3)
+        self.login1()
+
+        r, content = self.get_stream({"last_id": Notification.objects.get(content="test0").id})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r["Content-Type"], "text/event-stream")
+        self.assertEqual(content.count("event: notification"), 2)
+        self.assertIn("-%d\n" % Notification.objects.get(content="test2").id, content)
+        self.assertNotIn("test0", content)
+
+    @override_settings(NOTIFICATIONS_STREAM_MAX_DURATION=0)
+    def test_stream_notifications_after_last_event_id(self):
+        self.create_notifications(3)
+        self.login1()
+
+        r, content = self.get_stream({"last_id": Notification.objects.get(content="test1").id})
+        last_event_id = content.split("id: ")[1].split("\n")[0]
+
+        # a notification coalesced after the last event is sent again
+        Notification.objects.filter(content="test0").update(date=timezone.now() + timezone.timedelta(hours=1))
+
+        r, content = self.get_stream(HTTP_LAST_EVENT_ID=last_event_id)
+        self.assertEqual(content.count("event: notification"), 1)
+        self.assertIn("test0", content)
+
+    @override_settings(NOTIFICATIONS_STREAM_MAX_DURATION=0)
+    def test_stream_notifications_of_events_committed_late(self):
+        self.login1()
+        self.post_comment(self.current_user, self.item5)
+        self.post_comment(self.current_user, self.item6)
+        # the events are older than the notification delivered to the client
+        self.create_notifications(1, user=self.other_user)
+
+        # the notifications are dated at dispatch, after the position of the client
+        dispatch_notification_events()
+        self.login2()
+        r, content = self.get_stream(HTTP_LAST_EVENT_ID=Notification.objects.get(content="test0").position)
+        self.assertEqual(content.count("event: notification"), 2)
+
+        # a coalesced notification is dated at its update, and sent again
+        last_event_id = content.split("id: ")[-1].split("\n")[0]
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+        r, content = self.get_stream(HTTP_LAST_EVENT_ID=last_event_id)
+        self.assertEqual(content.count("event: notification"), 1)
+        self.assertIn("2 new comments on your item: Shoes", content)
+
+    def test_stream_invalid_last_event_id(self):
+        self.login1()
+
+        r, content = self.get_stream(HTTP_LAST_EVENT_ID="invalid")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(NOTIFICATIONS_STREAM_MAX_DURATION=0)
+    def test_stream_starts_after_last_notification(self):
+        self.create_notifications(2)
+        self.login1()
+
+        r, content = self.get_stream()
+        self.assertNotIn("event: notification", content)
+
+    @override_settings(NOTIFICATIONS_STREAM_MAX_DURATION=0.2, NOTIFICATIONS_STREAM_KEEPALIVE=0.1)
+    def test_stream_keepalive(self):
+        self.login1()
+
+        r, content = self.get_stream()
+        self.assertIn(": keepalive", content)
+
+    def test_stream_not_logged_in(self):
+        r, content = self.get_stream()
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_local_broker_wakes_up_waiting_streams(self):
+        broker = LocalBroker()
+        version = broker.version(self.current_user.id)
+
+        threading.Timer(0.05, broker.publish, args=([self.current_user.id],)).start()
+        self.assertNotEqual(broker.wait(self.current_user.id, version, timeout=5), version)
+        self.assertEqual(broker.wait(self.other_user.id, 0, timeout=0.01), 0)
+
+    def test_cache_broker_versions_culled(self):
+        broker = CacheBroker()
+        broker.publish([self.current_user.id])
+        version = broker.version(self.current_user.id)
+
+        cache.delete(CacheBroker.key_prefix + str(self.current_user.id))
+        broker.publish([self.current_user.id])
+        self.assertNotEqual(broker.wait(self.current_user.id, version, timeout=0), version)
+
+    def test_comments_coalesced_by_item(self):
+        self.login1()
+        for i in range(3):
+            self.post_comment(self.current_user, self.item5)
+        self.post_comment(self.current_user, self.item6)
+        dispatch_notification_events()
+
+        self.assertEqual(Notification.objects.count(), 2)
+        n = Notification.objects.get(comment__item=self.item5)
+        self.assertEqual(n.count, 3)
+        self.assertEqual(n.content, "3 new comments on your item: Shoes")
+        self.assertEqual(n.comment, self.item5.comment_set.order_by("id").last())
+
+        # the unread notification is updated in place by the next dispatches
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(pk=n.id).count, 4)
+
+    def test_read_notification_not_coalesced(self):
+        self.login1()
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+        Notification.objects.update(read=True)
+
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(read=False).content, "user1 has commented your item: Shoes")
+
+    @override_settings(NOTIFICATIONS_COALESCING_WINDOW=60)
+    def test_notification_not_coalesced_after_window(self):
+        self.login1()
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+        Notification.objects.update(date=timezone.now() - timezone.timedelta(minutes=2))
+
+        self.post_comment(self.current_user, self.item5)
+        dispatch_notification_events()
+        self.assertEqual(Notification.objects.count(), 2)
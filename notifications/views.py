@@ -1,10 +1,20 @@
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import mixins
 from rest_framework import permissions
 from rest_framework import viewsets
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from notifications.models import Notification
-from notifications.serializers import NotificationSerializer
+from notifications.models import Notification, parse_position
+from notifications.serializers import MarkReadSerializer, NotificationSerializer
+from notifications.stream import EventStreamRenderer, notification_events
+from swapp.pagination import DateCursorPagination
 
 
 class NotificationViewSet(mixins.ListModelMixin,
@@ -13,6 +23,57 @@ class NotificationViewSet(mixins.ListModelMixin,
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = DateCursorPagination
 
     def list(self, request, *args, **kwargs):
-        return Response(self.serializer_class(request.user.notification_set.order_by("-date"), many=True).data)
+        page = self.paginate_queryset(request.user.notification_set.all())
+        return self.get_paginated_response(self.serializer_class(page, many=True).data)
+
+    @list_route(methods=["GET"])
+    def unread_count(self, request):
+        return Response({"count": request.user.notification_set.filter(read=False).count()})
+
+    @list_route(methods=["POST"])
+    def mark_read(self, request):
+        """
+        Marks as read all the unread notifications of the user, or only the ones up to the given position in the
+        stream: the notifications coalesced after the client saw them are left unread.
+        """
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        notifications = request.user.notification_set.filter(read=False)
+        if serializer.validated_data["up_to"] is not None:
+            date, notification_id = serializer.validated_data["up_to"]
+            notifications = notifications.filter(Q(date__lt=date) | Q(date=date, id__lte=notification_id))
+
+        return Response({"count": notifications.update(read=True)})
+
+    @list_route(methods=["GET"], renderer_classes=(JSONRenderer, EventStreamRenderer))
+    def stream(self, request):
+        """
+        Streams the new notifications of the user as server-sent events. The stream starts after the event given by
+        the Last-Event-ID header (sent by browsers when reconnecting), the notification given by the last_id
+        parameter, or the last notification of the user.
+        """
+        last_event_id = request.META.get("HTTP_LAST_EVENT_ID")
+        last_id = request.query_params.get("last_id")
+
+        if last_event_id:
+            position = parse_position(last_event_id)
+            if position is None:
+                raise ValidationError("Invalid last event id")
+        elif last_id is not None:
+            try:
+                last = request.user.notification_set.get(id=int(last_id))
+            except (ValueError, Notification.DoesNotExist):
+                raise ValidationError("Invalid last notification id")
+            position = (last.date, last.id)
+        else:
+            last = request.user.notification_set.order_by("date", "id").last()
+            position = (last.date, last.id) if last is not None else (datetime.fromtimestamp(0, timezone.utc), 0)
+
+        response = StreamingHttpResponse(notification_events(request.user, *position), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -11,5 +11,8 @@ class Offer(models.Model):
     comment = models.CharField(max_length=1000)
     creation_date = models.DateTimeField("date published", default=timezone.now)
 
+    class Meta:
+        index_together = [("item_given", "item_received", "answered")]
+
     def __str__(self):
         return self.comment
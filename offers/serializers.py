@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from offers.models import Offer
+from offers.trade_cycles import MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH
 
 
 class CreateOfferSerializer(serializers.ModelSerializer):
@@ -19,3 +20,11 @@ class UpdateOfferSerializer(serializers.ModelSerializer):
     class Meta:
         model = Offer
         fields = ("accepted", "comment")
+
+
+class TradeCyclesSerializer(serializers.Serializer):
+    min_length = serializers.IntegerField(min_value=MIN_CYCLE_LENGTH, max_value=MAX_CYCLE_LENGTH,
+                                          default=MIN_CYCLE_LENGTH)
+    max_length = serializers.IntegerField(min_value=MIN_CYCLE_LENGTH, max_value=MAX_CYCLE_LENGTH,
+                                          default=MAX_CYCLE_LENGTH)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
@@ -1,11 +1,12 @@
 import json
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from rest_framework import status
 
-from items.models import Category, Item
+from items.models import Category, Item, Like
 from offers.models import Offer
+from offers.trade_cycles import TradeGraph, reset_trade_graph
 
 
 class OfferAPITests(TestCase):
@@ -85,6 +86,13 @@ class OfferAPITests(TestCase):
         r = self.post_offer(self.item2, self.item1)
         self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_can_create_offer_again_after_answered_offer(self):
+        Offer.objects.create(item_given=self.item1, item_received=self.item2, answered=True)
+        Offer.objects.create(item_given=self.item2, item_received=self.item1, answered=True)
+
+        r = self.post_offer(self.item1, self.item2)
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+
     def test_cannot_create_offer_for_traded_item(self):
         self.item2.traded = True
         self.item2.save()
@@ -245,3 +253,117 @@ class OfferAPITests(TestCase):
     def test_delete_not_found(self):
         r = self.delete_offer(id_offer=1)
         self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TradeGraphTests(TestCase):
+    def setUp(self):
+        self.graph = TradeGraph()
+
+        # users 1, 2 and 3 own items 1, 2 and 3
+        for i in range(1, 4):
+            self.graph.set_item(i, i, 10, 20)
+
+        self.graph.add_want(1, 2)
+        self.graph.add_want(2, 3)
+        self.graph.add_want(3, 1)
+
+    def test_find_cycle(self):
+        self.assertEqual(self.graph.find_cycles(1), [[(1, 1, 2), (2, 2, 3), (3, 3, 1)]])
+        self.assertEqual(self.graph.find_cycles(2), [[(2, 2, 3), (3, 3, 1), (1, 1, 2)]])
+
+    def test_no_pairwise_cycle(self):
+        self.graph.add_want(2, 1)
+        self.assertEqual(len(self.graph.find_cycles(1)), 1)
+
+    def test_no_cycle_if_prices_incompatible(self):
+        self.graph.set_item(3, 3, 30, 40)
+        self.assertEqual(self.graph.find_cycles(1), [])
+
+    def test_no_cycle_with_inactive_item(self):
+        self.graph.deactivate_items([2])
+        self.assertEqual(self.graph.find_cycles(1), [])
+
+    def test_no_cycle_after_want_removed(self):
+        self.graph.remove_want(2, 3)
+        self.assertEqual(self.graph.find_cycles(1), [])
+
+    def test_longer_cycle(self):
+        self.graph.remove_want(3, 1)
+        for i in range(4, 6):
+            self.graph.set_item(i, i, 10, 20)
+        self.graph.add_want(3, 4)
+        self.graph.add_want(4, 5)
+        self.graph.add_want(5, 1)
+
+        self.assertEqual([len(c) for c in self.graph.find_cycles(1)], [5])
+        self.assertEqual(self.graph.find_cycles(1, max_length=4), [])
+
+    def test_offer_edges(self):
+        self.graph.remove_want(3, 1)
+        self.graph.add_offer(1, 3, 1)
+        self.graph.add_offer(1, 3, 1)
+        self.assertEqual(len(self.graph.find_cycles(1)), 1)
+
+        self.graph.remove_offer(1)
+        self.graph.remove_offer(1)
+        self.assertEqual(self.graph.find_cycles(1), [])
+
+
+class TradeCyclesAPITests(TransactionTestCase):
+    trade_cycles_url = "/api/account/trade_cycles/"
+    likes_url = "/api/likes/"
+
+    def setUp(self):
+        reset_trade_graph()
+
+        self.users = [User.objects.create_user(username="user%d" % i, password="password") for i in range(3)]
+        c = Category.objects.create(name="Test")
+        self.items = [Item.objects.create(name="item%d" % i, owner=u, category=c, price_min=10, price_max=30)
+                      for i, u in enumerate(self.users)]
+
+        Like.objects.create(user=self.users[0], item=self.items[1])
+        Like.objects.create(user=self.users[1], item=self.items[2])
+
+    def tearDown(self):
+        reset_trade_graph()
+
+    def login(self, i):
+        self.client.logout()
+        self.client.login(username="user%d" % i, password="password")
+
+    def get_trade_cycles(self):
+        return self.client.get(self.trade_cycles_url)
+
+    def test_get_trade_cycles_not_logged_in(self):
+        r = self.get_trade_cycles()
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_trade_cycles_updated_incrementally(self):
+        self.login(0)
+        r = self.get_trade_cycles()
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data, [])
+
+        self.login(2)
+        self.client.post(self.likes_url, data=json.dumps({"item": self.items[0].id}), content_type="application/json")
+
+        self.login(0)
+        r = self.get_trade_cycles()
+        self.assertEqual(len(r.data), 1)
+        self.assertEqual(r.data[0]["length"], 3)
+        self.assertEqual(r.data[0]["trades"][0]["username"], "user0")
+        self.assertEqual(r.data[0]["trades"][0]["item_given"], self.items[0].id)
+        self.assertEqual(r.data[0]["trades"][0]["item_received_name"], "item1")
+
+    def test_traded_item_removed_from_cycles(self):
+        Offer.objects.create(item_given=self.items[2], item_received=self.items[0])
+
+        self.login(0)
+        r = self.get_trade_cycles()
+        self.assertEqual(len(r.data), 1)
+
+        self.items[1].traded = True
+        self.items[1].save()
+
+        r = self.get_trade_cycles()
+        self.assertEqual(r.data, [])
@@ -0,0 +1,293 @@
+"""
+Multi-party trade cycles.
+
+Users who want each other's items in a ring (A wants an item of B, B an item of C and C an item of A) can all trade at
+once. The "wants" graph is built from the likes and the pending offers, and kept in memory in compact arrays:
+
+- the wanted items of each user, and the users wanting each item, as arrays of ids,
+- the owner, price range and availability of each item, as arrays indexed by item id.
+
+The graph is loaded from the database on first use and then updated incrementally by the signals of the items, likes
+and offers once their transactions are committed. As other processes only update their own graph, it is also reloaded
+when older than settings.TRADE_GRAPH_MAX_AGE seconds.
+"""
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from items.models import Item, Like
+from offers.models import Offer
+
+MIN_CYCLE_LENGTH = 3
+MAX_CYCLE_LENGTH = 5
+MAX_VISITS = 100000
+
+
+class TradeGraph:
+    def __init__(self):
+        self.created = time.time()
+
+        self._lock = threading.RLock()
+        self._wants = defaultdict(lambda: array("l"))
+        self._wanted_by = defaultdict(lambda: array("l"))
+        self._owned = defaultdict(lambda: array("l"))
+        self._offers = {}
+
+        self._owner = array("l")
+        self._price_min = array("l")
+        self._price_max = array("l")
+        self._active = bytearray()
+
+    @classmethod
+    def load(cls):
+        """
+        Builds the graph from the items, the likes and the pending offers of the database.
+        """
+        graph = cls()
+
+        for item in Item.objects.values_list("id", "owner_id", "price_min", "price_max", "traded", "archived") \
+                .iterator():
+            graph.set_item(*item)
+
+        for user_id, item_id in Like.objects.values_list("user_id", "item_id").iterator():
+            graph.add_want(user_id, item_id)
+
+        for offer_id, user_id, item_id in Offer.objects.filter(answered=False) \
+                .values_list("id", "item_given__owner_id", "item_received_id").iterator():
+            graph.add_offer(offer_id, user_id, item_id)
+
+        return graph
+
+    def _grow(self, item_id):
+        missing = item_id + 1 - len(self._active)
+        if missing > 0:
+            self._owner.extend([0] * missing)
+            self._price_min.extend([0] * missing)
+            self._price_max.extend([0] * missing)
+            self._active.extend(bytes(missing))
+
+    def set_item(self, item_id, owner_id, price_min, price_max, traded=False, archived=False):
+        with self._lock:
+            self._grow(item_id)
+
+            previous_owner = self._owner[item_id]
+            if previous_owner != owner_id:
+                if previous_owner != 0:
+                    self._owned[previous_owner].remove(item_id)
+                self._owned[owner_id].append(item_id)
+
+            self._owner[item_id] = owner_id
+            self._price_min[item_id] = price_min
+            self._price_max[item_id] = price_max
+            self._active[item_id] = not (traded or archived)
+
+    def deactivate_items(self, item_ids):
+        with self._lock:
+            for item_id in item_ids:
+                if item_id < len(self._active):
+                    self._active[item_id] = False
+
+    def add_want(self, user_id, item_id):
+        """
+        Adds an edge from an user to an item wanted by the user. An edge added several times must be removed as many times.
+        """
+        with self._lock:
+            self._wants[user_id].append(item_id)
+            self._wanted_by[item_id].append(user_id)
+
+    def remove_want(self, user_id, item_id):
+        with self._lock:
+            try:
+                self._wants[user_id].remove(item_id)
+                self._wanted_by[item_id].remove(user_id)
+            except ValueError:
+                pass
+
+    def add_offer(self, offer_id, user_id, item_id):
+        with self._lock:
+            if offer_id not in self._offers:
+                self._offers[offer_id] = (user_id, item_id)
+                self.add_want(user_id, item_id)
+
+    def remove_offer(self, offer_id):
+        with self._lock:
+            edge = self._offers.pop(offer_id, None)
+            if edge is not None:
+                self.remove_want(*edge)
+
+    def find_cycles(self, user_id, min_length=MIN_CYCLE_LENGTH, max_length=MAX_CYCLE_LENGTH, limit=20):
+        """
+        Finds trade cycles going through the given user. In a cycle, every user gives an item whose price max is at
+        least the price min of the item received.
+
+        The search is a depth-first search from the user, whose last step only goes to users wanting one of the user's items.
+
+        :param user_id: the user for which to find cycles.
+        :param min_length: the minimum number of users in a cycle.
+        :param max_length: the maximum number of users in a cycle.
+        :param limit: the maximum number of cycles to return.
+        :return: a list of cycles, each one being a list of (user id, id of the item given, id of the item received).
+        """
+        min_length = max(min_length, 2)
+
+        with self._lock:
+            owner = self._owner
+            price_min = self._price_min
+            price_max = self._price_max
+            active = self._active
+
+            # users wanting an item of the user, with the items they want
+            closing = defaultdict(set)
+            for item_id in self._owned.get(user_id, ()):
+                if active[item_id]:
+                    for u in self._wanted_by.get(item_id, ()):
+                        if u != user_id:
+                            closing[u].add(item_id)
+
+            cycles = []
+            if len(closing) == 0:
+                return cycles
+
+            users = [user_id]
+            items = []
+            visiting = {user_id}
+            visits = [0]
+
+            def add_cycle(closing_item):
+                given = [closing_item] + items
+                received = items + [closing_item]
+                cycles.append(list(zip(users, given, received)))
+
+            def visit(u, item_received):
+                visits[0] += 1
+                depth = len(users)
+
+                if depth >= min_length and u in closing:
+                    for closing_item in closing[u]:
+                        if price_max[item_received] >= price_min[closing_item] and \
+                                price_max[closing_item] >= price_min[items[0]]:
+                            add_cycle(closing_item)
+                            if len(cycles) >= limit:
+                                return True
+
+                if depth == max_length or visits[0] >= MAX_VISITS:
+                    return False
+
+                for item_id in set(self._wants.get(u, ())):
+                    if item_id >= len(active) or not active[item_id]:
+                        continue
+
+                    v = owner[item_id]
+                    if v in visiting:
+                        continue
+                    if depth == max_length - 1 and v not in closing:
+                        continue
+                    if item_received is not None and price_max[item_received] < price_min[item_id]:
+                        continue
+
+                    users.append(v)
+                    items.append(item_id)
+                    visiting.add(v)
+
+                    found = visit(v, item_id)
+
+                    users.pop()
+                    items.pop()
+                    visiting.remove(v)
+
+                    if found:
+                        return True
+
+                return False
+
+            visit(user_id, None)
+            return cycles
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_trade_graph():
+    """
+    Returns the trade graph of the process, loading it if needed.
+    """
+    global _graph
+
+    with _graph_lock:
+        max_age = getattr(settings, "TRADE_GRAPH_MAX_AGE", 300)
+        if _graph is None or time.time() - _graph.created > max_age:
+            _graph = TradeGraph.load()
+        return _graph
+
+
+def reset_trade_graph():
+    global _graph
+    _graph = None
+
+
+def update_graph_on_commit(method, *args):
+    """
+    Calls the given method of the trade graph once the current transaction is committed, if the graph is loaded.
+    """
+    def update():
+        if _graph is not None:
+            getattr(_graph, method)(*args)
+
+    transaction.on_commit(update)
+
+
+def deactivate_items(item_ids):
+    """
+    Removes items from the cycles, for items traded or archived without being saved one by one.
+    """
+    update_graph_on_commit("deactivate_items", list(item_ids))
+
+
+def remove_offers(offer_ids):
+    """
+    Removes the edges of offers answered without being saved one by one.
+    """
+    for offer_id in offer_ids:
+        update_graph_on_commit("remove_offer", offer_id)
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, **kwargs):
+    update_graph_on_commit("set_item", instance.id, instance.owner_id, instance.price_min, instance.price_max,
+                           instance.traded, instance.archived)
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    deactivate_items([instance.id])
+
+
+@receiver(post_save, sender=Like)
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        update_graph_on_commit("add_want", instance.user_id, instance.item_id)
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    update_graph_on_commit("remove_want", instance.user_id, instance.item_id)
+
+
+@receiver(post_save, sender=Offer)
+def offer_saved(sender, instance, created, **kwargs):
+    if instance.answered:
+        update_graph_on_commit("remove_offer", instance.id)
+    elif created:
+        update_graph_on_commit("add_offer", instance.id, instance.item_given.owner_id, instance.item_received_id)
+
+
+@receiver(post_delete, sender=Offer)
+def offer_deleted(sender, instance, **kwargs):
+    update_graph_on_commit("remove_offer", instance.id)
@@ -1,35 +1,36 @@
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import mixins
 from rest_framework import viewsets
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+from items.models import Item
+from notifications.models import create_refused_offer_events
 from offers.models import Offer
 from offers.serializers import CreateOfferSerializer, RetrieveOfferSerializer, UpdateOfferSerializer
+from offers.trade_cycles import deactivate_items, remove_offers
+from users.account import invalidate_accounts
 
 
-def delete_offer(offer):
-    offer.delete()
-
-
-def refuse_offer(offer):
-    offer.answered = True
-    offer.accepted = False
-    offer.save()
-
-
-def refuse_and_delete_pending_offers(item, offer_id):
+def refuse_and_delete_pending_offers(items, offer_id):
     """
-    Refuses received pending received offers and deletes done pending offers.
+    Refuses pending received offers and deletes pending done offers, with one statement each. Must be called inside
+    a transaction.
 
-    :param item: the item on which to refuse and delete offers.
+    :param items: the items on which to refuse and delete offers.
     :param offer_id: the id of the offer to exclude when refusing and deleting.
     """
-    for o in item.offers_received.filter(~Q(pk=offer_id), answered=False):
-        refuse_offer(o)
+    offers_received = Offer.objects.filter(~Q(pk=offer_id), item_received__in=items, answered=False)
+
+    refused = list(offers_received.values_list("id", "item_given__owner_id"))
+    refused_offers = [offer_id for offer_id, _ in refused]
+    create_refused_offer_events(refused_offers)
+    offers_received.update(answered=True, accepted=False)
+    remove_offers(refused_offers)
+    invalidate_accounts([owner_id for _, owner_id in refused])
 
-    for o in item.offers_done.filter(~Q(pk=offer_id), answered=False):
-        delete_offer(o)
+    Offer.objects.filter(~Q(pk=offer_id), item_given__in=items, answered=False).delete()
 
 
 class OfferViewSet(mixins.CreateModelMixin,
@@ -48,17 +49,16 @@ class OfferViewSet(mixins.CreateModelMixin,
             return UpdateOfferSerializer
         return RetrieveOfferSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         item_given = serializer.validated_data["item_given"]
         item_received = serializer.validated_data["item_received"]
 
-        for o in item_given.offers_done.filter(answered=False):
-            if item_received == o.item_received:
-                raise ValidationError("You have already created an offer with the same item for the wanted item")
+        if Offer.objects.filter(item_given=item_given, item_received=item_received, answered=False).exists():
+            raise ValidationError("You have already created an offer with the same item for the wanted item")
 
-        for o in item_received.offers_done.filter(answered=False):
-            if item_given == o.item_received:
-                raise ValidationError("There is already an offer for your item with the wanted item. Please accept it")
+        if Offer.objects.filter(item_given=item_received, item_received=item_given, answered=False).exists():
+            raise ValidationError("There is already an offer for your item with the wanted item. Please accept it")
 
         if item_given.traded:
             raise ValidationError("You can't create an offer with an item that has been traded")
@@ -72,17 +72,18 @@ class OfferViewSet(mixins.CreateModelMixin,
         if item_received.archived:
             raise ValidationError("The item wanted does not exist")
 
-        if self.request.user != item_given.owner:
+        if self.request.user.id != item_given.owner_id:
             raise ValidationError("You can't trade another person's item")
 
-        if self.request.user == item_received.owner:
+        if self.request.user.id == item_received.owner_id:
             raise ValidationError("You can't trade your own items")
 
         if item_given.price_max < item_received.price_min:
-                raise ValidationError("Price max of your item is smaller than price min of the wanted item")
+            raise ValidationError("Price max of your item is smaller than price min of the wanted item")
 
         serializer.save()
 
+    @transaction.atomic
     def perform_update(self, serializer):
         if serializer.instance.accepted:
             raise ValidationError("You can't update an accepted offer")
@@ -90,26 +91,23 @@ class OfferViewSet(mixins.CreateModelMixin,
         accepted = serializer.validated_data.get("accepted", None)
 
         if accepted is not None:
-            if serializer.instance.item_given.owner == self.request.user:
+            if serializer.instance.item_given.owner_id == self.request.user.id:
                 raise ValidationError("You can't accept or refuse your own offer")
 
             serializer.validated_data["answered"] = True
 
             if accepted:
                 offer = serializer.instance
+                items = [offer.item_given_id, offer.item_received_id]
 
-                offer.item_given.traded = True
-                offer.item_given.save()
-                offer.item_received.traded = True
-                offer.item_received.save()
-
-                refuse_and_delete_pending_offers(offer.item_given, offer.id)
-                refuse_and_delete_pending_offers(offer.item_received, offer.id)
+                Item.objects.filter(pk__in=items).update(traded=True)
+                deactivate_items(items)
+                refuse_and_delete_pending_offers(items, offer.id)
 
         serializer.save()
 
     def perform_destroy(self, instance):
-        if self.request.user != instance.item_given.owner:
+        if self.request.user.id != instance.item_given.owner_id:
             raise ValidationError("You can't delete offer of another user")
 
         if instance.accepted:
@@ -11,7 +11,9 @@ django.setup()
 from users.models import *
 from items.models import *
 from comments.models import Comment
+from notifications.dispatcher import dispatch_notification_events
 from notifications.models import Notification
+from swapp.images import create_derivatives, derivatives_exist
 
 
 def create_item(category, owner, name="Test", description="Test", price_min=1, price_max=2, archived=0, views=0):
@@ -27,15 +29,28 @@ def create_comment(user, item, content="Comment test"):
     return Comment.objects.create(content=content, user=user, item=item)
 
 
+def mark_notification_read(user, kind, **target):
+    notification = Notification.objects.get(user=user, kind=kind, **target)
+    notification.read = True
+    notification.save()
+
+
 def set_image_profile(user, image_name):
     image = open("populate_images/profiles/profile_%s" % image_name, "rb")
     user.userprofile.image = File(image)
     user.userprofile.save()
+    create_missing_derivatives(user.userprofile.image.name)
 
 
 def set_image_item(item, image_name):
     image = open("populate_images/items/item_%s" % image_name, "rb")
-    Image.objects.create(image=File(image), item=item)
+    create_missing_derivatives(Image.objects.create(image=File(image), item=item).image.name)
+
+
+def create_missing_derivatives(name):
+    # the images loaded again share the file and the derivatives of the first load (see swapp.storage)
+    if not derivatives_exist(name):
+        create_derivatives(name)
 
 
 if __name__ == "__main__":
@@ -520,14 +535,10 @@ if __name__ == "__main__":
     o6 = create_offer(i8, i4, "I want your brand new mouse.")
     o7 = create_offer(i7, i3, "Give me the precious against this elfic flute.")
 
-    # Change read to True for new offers notifications 2 and 4
-    n2 = Notification.objects.get(pk=2)
-    n2.read = True
-    n2.save()
-
-    n4 = Notification.objects.get(pk=4)
-    n4.read = True
-    n4.save()
+    dispatch_notification_events()
+    # Change read to True for the new offers notifications of offers 2 and 4
+    mark_notification_read(u3, Notification.NEW_OFFER, offer=o2)
+    mark_notification_read(u4, Notification.NEW_OFFER, offer=o4)
 
     # Change status and accepted values for offers with the creation of corresponding notifications (made
     # automatically)
@@ -547,14 +558,11 @@ if __name__ == "__main__":
     o4.accepted = True
     o4.save()
 
-    # Change read to True for new accepted offer notification 7 and for new refused offer notification 9
-    n7 = Notification.objects.get(pk=7)
-    n7.read = True
-    n7.save()
-
-    n9 = Notification.objects.get(pk=9)
-    n9.read = True
-    n9.save()
+    dispatch_notification_events()
+    # Change read to True for the accepted offer notification of offer 1 and for the refused offer notification of
+    # offer 3
+    mark_notification_read(u2, Notification.ACCEPTED_OFFER, offer=o1)
+    mark_notification_read(u2, Notification.REFUSED_OFFER, offer=o3)
 
     # Create new comments with corresponding notifications (made automatically)
     co1 = create_comment(u2, i1, "Oh, this old shoes are so rare.")
@@ -595,22 +603,11 @@ if __name__ == "__main__":
     co28 = create_comment(u2, i9, "This is a very good trumpet.")
     co29 = create_comment(u3, i9, "I'm looking for a trumpet like this.")
 
-    # Change read to True for new comments notifications 11, 12, 15 and 16
-    n11 = Notification.objects.get(pk=11)
-    n11.read = True
-    n11.save()
-
-    n12 = Notification.objects.get(pk=12)
-    n12.read = True
-    n12.save()
-
-    n15 = Notification.objects.get(pk=15)
-    n15.read = True
-    n15.save()
-
-    n16 = Notification.objects.get(pk=16)
-    n16.read = True
-    n16.save()
+    dispatch_notification_events()
+    # Change read to True for the new comments notifications of items 1 and 2 (the comments of an item are coalesced
+    # in one notification, which targets the last of them)
+    mark_notification_read(u1, Notification.COMMENT, comment__item=i1)
+    mark_notification_read(u1, Notification.COMMENT, comment__item=i2)
 
     # Create new notes with corresponding notifications (made automatically)
     no1 = Note.objects.create(user=u1, offer=o1, text="Very good", note=5)
@@ -622,11 +619,7 @@ if __name__ == "__main__":
     no5 = Note.objects.create(user=u3, offer=o4, text="Not too bad", note=2)
     no6 = Note.objects.create(user=u4, offer=o4, text="Excellent transaction", note=5)
 
-    # Change read to True for new note notification 40 and 42
-    n40 = Notification.objects.get(pk=40)
-    n40.read = True
-    n40.save()
-
-    n42 = Notification.objects.get(pk=42)
-    n42.read = True
-    n42.save()
+    dispatch_notification_events()
+    # Change read to True for the new note notifications of notes 1 and 3
+    mark_notification_read(u2, Notification.NOTE, note=no1)
+    mark_notification_read(u3, Notification.NOTE, note=no3)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Q
+
+
+def create_conversations(apps, schema_editor):
+    """
+    Groups the existing messages in the conversations of their users, their messages being considered as read.
+    """
+    Conversation = apps.get_model("private_messages", "Conversation")
+    Participant = apps.get_model("private_messages", "Participant")
+    Message = apps.get_model("private_messages", "Message")
+
+    pairs = set((min(user_from_id, user_to_id), max(user_from_id, user_to_id))
+                for user_from_id, user_to_id in Message.objects.values_list("user_from_id", "user_to_id").distinct())
+
+    for user1_id, user2_id in pairs:
+        # the messages between the two users in both directions, or the messages of an user to itself
+        messages = Message.objects.filter(Q(user_from_id=user1_id, user_to_id=user2_id) |
+                                          Q(user_from_id=user2_id, user_to_id=user1_id))
+        last_message = messages.order_by("-date", "-id").first()
+
+        conversation = Conversation.objects.create(key="%d-%d" % (user1_id, user2_id), last_message=last_message,
+                                                   last_activity=last_message.date)
+        Participant.objects.bulk_create([
+            Participant(conversation=conversation, user_id=user_id, last_activity=last_message.date)
+            for user_id in {user1_id, user2_id}
+        ])
+        messages.update(conversation=conversation)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private_messages', '0002_auto_20261019_0624'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_conversations, migrations.RunPython.noop),
+    ]
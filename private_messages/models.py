@@ -1,13 +1,81 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 
+class Conversation(models.Model):
+    """
+    Conversation between two users, with its last message denormalized for the inbox.
+    """
+    # the ids of the participants, in increasing order, identifying the conversation
+    key = models.CharField(max_length=50, unique=True)
+    last_message = models.ForeignKey("Message", null=True, on_delete=models.SET_NULL, related_name="+")
+    last_activity = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.key
+
+
+class Participant(models.Model):
+    """
+    Participant of a conversation, with the last activity of the conversation copied to list the inbox of a user with
+    an index, and the number of messages the user hasn't read.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    last_activity = models.DateTimeField(default=timezone.now)
+    unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [("conversation", "user")]
+        index_together = [("user", "last_activity")]
+
+    def __str__(self):
+        return "%s in %s" % (self.user.username, self.conversation)
+
+
 class Message(models.Model):
     text = models.CharField(max_length=1000)
     date = models.DateTimeField('date published', default=timezone.now)
     user_from = models.ForeignKey(User, on_delete=models.CASCADE, related_name='message_from')
     user_to = models.ForeignKey(User, on_delete=models.CASCADE, related_name='message_to')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE)
+
+    class Meta:
+        index_together = [("conversation", "date")]
 
     def __str__(self):
         return self.text
+
+
+def conversation_key(user1_id, user2_id):
+    return "%d-%d" % (min(user1_id, user2_id), max(user1_id, user2_id))
+
+
+def get_or_create_conversation(user1_id, user2_id):
+    """
+    Returns the conversation between the two users, creating it with its participants if needed.
+    """
+    conversation, created = Conversation.objects.get_or_create(key=conversation_key(user1_id, user2_id))
+    if created:
+        Participant.objects.bulk_create([
+            Participant(conversation=conversation, user_id=user_id, last_activity=conversation.last_activity)
+            for user_id in {user1_id, user2_id}
+        ])
+    return conversation
+
+
+@receiver(post_save, sender=Message)
+def update_conversation(sender, instance, created, **kwargs):
+    """
+    Handler to set a new message as the last message of its conversation.
+    """
+    if created:
+        Conversation.objects.filter(pk=instance.conversation_id) \
+            .update(last_message=instance, last_activity=instance.date)
+        Participant.objects.filter(conversation_id=instance.conversation_id).update(last_activity=instance.date)
+        Participant.objects.filter(conversation_id=instance.conversation_id, user_id=instance.user_to_id) \
+            .update(unread=F("unread") + 1)
@@ -1,12 +1,34 @@
 from rest_framework import serializers
 
-from private_messages.models import Message
+from private_messages.models import Message, Participant
 
 
 class MessageSerializer(serializers.ModelSerializer):
     user_from = serializers.PrimaryKeyRelatedField(read_only=True)
     date = serializers.DateTimeField(read_only=True)
+    conversation = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Message
-        fields = ('user_from', 'user_to', 'text', 'date')
+        fields = ('id', 'conversation', 'user_from', 'user_to', 'text', 'date')
+
+    def validate_user_to(self, value):
+        if value == self.context["request"].user:
+            raise serializers.ValidationError("Cannot send a message to yourself")
+        return value
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """
+    Serializes a conversation of the inbox of a user, from the participation of the user.
+    """
+    id = serializers.IntegerField(source="conversation_id", read_only=True)
+    participants = serializers.SerializerMethodField()
+    last_message = MessageSerializer(source="conversation.last_message", read_only=True)
+
+    class Meta:
+        model = Participant
+        fields = ('id', 'participants', 'last_message', 'last_activity', 'unread')
+
+    def get_participants(self, obj):
+        return [participant.user_id for participant in obj.conversation.participant_set.all()]
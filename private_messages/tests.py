@@ -1,3 +1,126 @@
+import json
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework import status
+
+from private_messages.models import Conversation, Message, Participant
+
+
+class ConversationTests(TestCase):
+    messages_url = "/api/messages/"
+    conversations_url = "/api/conversations/"
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username="user1", email="test@test.com", password="password")
+        self.user2 = User.objects.create_user(username="user2", email="test@test.com", password="password")
+        self.user3 = User.objects.create_user(username="user3", email="test@test.com", password="password")
+
+    def login(self, user):
+        self.client.logout()
+        self.client.login(username=user.username, password="password")
+
+    def post_message(self, user_to, text="message test"):
+        return self.client.post(self.messages_url, data=json.dumps({
+            "text": text,
+            "user_to": user_to.id
+        }), content_type="application/json")
+
+    def get_inbox(self):
+        return self.client.get(self.conversations_url)
+
+    def test_message_creates_conversation(self):
+        self.login(self.user1)
+        r = self.post_message(self.user2)
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+
+        self.login(self.user2)
+        self.post_message(self.user1, "answer")
+
+        self.assertEqual(Conversation.objects.count(), 1)
+        conversation = Conversation.objects.get()
+        self.assertEqual(Message.objects.filter(conversation=conversation).count(), 2)
+        self.assertEqual(conversation.last_message.text, "answer")
+        self.assertEqual(Participant.objects.get(user=self.user1).unread, 1)
+        self.assertEqual(Participant.objects.get(user=self.user2).unread, 1)
+
+    def test_inbox_ordered_by_last_activity(self):
+        self.login(self.user1)
+        self.post_message(self.user2, "to user2")
+        self.post_message(self.user3, "to user3")
+
+        self.login(self.user2)
+        self.post_message(self.user1, "from user2")
+
+        self.login(self.user1)
+        r = self.get_inbox()
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([c["last_message"]["text"] for c in r.data["results"]], ["from user2", "to user3"])
+        self.assertEqual(r.data["results"][0]["unread"], 1)
+        self.assertEqual(set(r.data["results"][0]["participants"]), {self.user1.id, self.user2.id})
+
+        self.login(self.user3)
+        r = self.get_inbox()
+        self.assertEqual(len(r.data["results"]), 1)
+
+    def test_thread_paginated(self):
+        self.login(self.user1)
+        for i in range(25):
+            self.post_message(self.user2, "message%d" % i)
+        conversation = Conversation.objects.get()
+
+        r = self.client.get("%s%d/messages/" % (self.conversations_url, conversation.id))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(r.data["results"]), 20)
+        self.assertEqual(r.data["results"][0]["text"], "message24")
+
+        r = self.client.get(r.data["next"])
+        self.assertEqual(len(r.data["results"]), 5)
+        self.assertEqual(r.data["results"][-1]["text"], "message0")
+
+    def test_thread_of_other_users(self):
+        self.login(self.user1)
+        self.post_message(self.user2)
+
+        self.login(self.user3)
+        r = self.client.get("%s%d/messages/" % (self.conversations_url, Conversation.objects.get().id))
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_read_conversation(self):
+        self.login(self.user1)
+        self.post_message(self.user2)
+        self.post_message(self.user2)
+
+        self.login(self.user2)
+        r = self.client.post("%s%d/read/" % (self.conversations_url, Conversation.objects.get().id))
+        self.assertEqual(r.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Participant.objects.get(user=self.user2).unread, 0)
+
+    def test_messages_scoped_to_user(self):
+        self.login(self.user1)
+        self.post_message(self.user2)
+
+        self.login(self.user3)
+        r = self.client.get(self.messages_url)
+        self.assertEqual(r.data["results"], [])
+
+    def test_message_to_self_refused(self):
+        self.login(self.user1)
+        r = self.post_message(self.user1)
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Message.objects.count(), 0)
+
+    def test_message_not_updated_nor_deleted(self):
+        self.login(self.user1)
+        message_url = "%s%d/" % (self.messages_url, self.post_message(self.user2).data["id"])
+
+        r = self.client.patch(message_url, data=json.dumps({"user_to": self.user3.id}),
+                              content_type="application/json")
+        self.assertEqual(r.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        r = self.client.delete(message_url)
+        self.assertEqual(r.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(Message.objects.get().user_to, self.user2)
 
-# Create your tests here.
+    def test_inbox_not_logged_in(self):
+        r = self.get_inbox()
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
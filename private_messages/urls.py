@@ -3,4 +3,5 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'messages', views.MessageViewSet)
+router.register(r'conversations', views.ConversationViewSet, base_name='conversations')
 urlpatterns = router.urls
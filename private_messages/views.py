@@ -1,13 +1,73 @@
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import mixins
+from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.decorators import detail_route
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
-from private_messages.models import Message
-from private_messages.serializers import MessageSerializer
+from rest_framework.response import Response
 
+from private_messages.models import Message, Participant, get_or_create_conversation
+from private_messages.serializers import ConversationSerializer, MessageSerializer
+from swapp.pagination import ActivityCursorPagination, DateCursorPagination
 
-class MessageViewSet(viewsets.ModelViewSet):
+
+class MessageViewSet(mixins.CreateModelMixin,
+                     mixins.ListModelMixin,
+                     mixins.RetrieveModelMixin,
+                     viewsets.GenericViewSet):
+    """
+    Messages of the user. The messages can't be updated or deleted, as their conversations aren't.
+    """
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = DateCursorPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        return Message.objects.filter(Q(user_from=user) | Q(user_to=user))
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user_from=self.request.user)
+        conversation = get_or_create_conversation(self.request.user.id, serializer.validated_data["user_to"].id)
+        serializer.save(user_from=self.request.user, conversation=conversation)
+
+
+class ConversationViewSet(mixins.ListModelMixin,
+                          viewsets.GenericViewSet):
+    """
+    Inbox of the user: the conversations of the user, the most recently active first.
+    """
+    queryset = Participant.objects.all()
+    serializer_class = ConversationSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = ActivityCursorPagination
+
+    def get_queryset(self):
+        return Participant.objects.filter(user=self.request.user) \
+            .select_related("conversation__last_message") \
+            .prefetch_related("conversation__participant_set")
+
+    @detail_route(methods=["GET"])
+    def messages(self, request, pk=None):
+        """
+        Thread of a conversation of the user: its messages, the most recent first.
+        """
+        participant = get_object_or_404(Participant, conversation_id=pk, user=request.user)
+
+        paginator = DateCursorPagination()
+        page = paginator.paginate_queryset(Message.objects.filter(conversation_id=participant.conversation_id),
+                                           request, view=self)
+        return paginator.get_paginated_response(MessageSerializer(page, many=True).data)
+
+    @detail_route(methods=["POST"])
+    def read(self, request, pk=None):
+        """
+        Marks the messages of a conversation of the user as read.
+        """
+        participant = get_object_or_404(Participant, conversation_id=pk, user=request.user)
+        participant.unread = 0
+        participant.save(update_fields=["unread"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -12,6 +12,7 @@ import { HomeModule }   from './home/home.module';
 /* Feature Modules */
 import { CoreModule }  from './core/core.module';
 import { ToastModule } from 'ng2-toastr/ng2-toastr';
+import { ImagesModule } from './shared/images/images.module';
 
 /* My modules */
 import { AuthService } from './shared/authentication/authentication.service';
@@ -48,7 +49,8 @@ export class MyXSRFStrategy {
         AppRoutingModule,
         HttpModule,
         JsonpModule,
-        ToastModule
+        ToastModule,
+        ImagesModule
     ],
 
     // Define other components in our module
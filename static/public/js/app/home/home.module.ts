@@ -42,6 +42,7 @@ import { UpdateInventoryDirective } from './inventory/update-inventory.directive
 import {MessagesModalComponent} from "./messages/messages-modal.component";
 import {XSRFStrategy, CookieXSRFStrategy} from "@angular/http";
 import {AuthService} from "../shared/authentication/authentication.service";
+import { ImagesModule } from '../shared/images/images.module';
 
 @NgModule({
     imports: [
@@ -49,7 +50,8 @@ import {AuthService} from "../shared/authentication/authentication.service";
         FormsModule,
         ReactiveFormsModule,
         routing,
-        RatingModule
+        RatingModule,
+        ImagesModule
     ],
     declarations: [
         InventoryComponent,
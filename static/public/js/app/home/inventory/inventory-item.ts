@@ -3,13 +3,16 @@ export class InventoryItem {
     name: string;
     image_id: number;
     image_url: string;
+    image_sizes: any;
     archived: boolean;
 
-    constructor(id: number, name: string, image_id: number, image_url: string, archived: boolean) {
+    constructor(id: number, name: string, image_id: number, image_url: string, archived: boolean,
+                image_sizes: any = null) {
         this.id = id;
         this.name = name;
         this.image_id = image_id;
         this.image_url = image_url;
         this.archived = archived;
+        this.image_sizes = image_sizes;
     }
 }
\ No newline at end of file
@@ -71,21 +71,39 @@ export class InventoryComponent implements OnInit {
             user => {
                 this.owner = user;
                 this.inventory = [];
-                for(let item of this.owner.items) {
-                    let inventoryItem = new InventoryItem(item.id, item.name, item.image_id, item.image_url, item.archived);
-                    this.sanitizer.bypassSecurityTrustUrl(item.image_url);
-                    this.inventory.push(inventoryItem);
-                    this.inventory = this.inventory.slice();
-                }
+                this.addInventoryItems(this.owner.items);
             }
         );
     }
 
+    addInventoryItems(items: Array<any>) {
+        for(let item of items) {
+            let inventoryItem = new InventoryItem(item.id, item.name, item.image_id, item.image_url, item.archived,
+                item.image_sizes);
+            this.sanitizer.bypassSecurityTrustUrl(item.image_url);
+            this.inventory.push(inventoryItem);
+        }
+        this.inventory = this.inventory.slice();
+    }
+
+    // The first page of the items is in the profile, the next ones are loaded when asked for
+    loadMore() {
+        this.itemsService.getNextUserItems(this.owner).then(
+            items => {
+                // the carousel is created again with the new items (see UpdateInventoryDirective)
+                $('.modal-carousel-inventory').flickity('destroy');
+                this.addInventoryItems(items);
+            },
+            error => this.toastr.error("Can't get more items", "Error")
+        );
+    }
+
     // We receive the id of the item to add to the inventory
     addItemEvent($event: number) {
         this.itemsService.getDetailedItem(+$event).then(
             item => {
-                let inventoryItem = new InventoryItem(item.id, item.name, item.images[0].id, item.images[0].url, item.archived);
+                let inventoryItem = new InventoryItem(item.id, item.name, item.images[0].id, item.images[0].url, item.archived,
+                    item.images[0].sizes);
                 this.sanitizer.bypassSecurityTrustUrl(inventoryItem.image_url);
                 this.inventory.push(inventoryItem);
                 this.inventory = this.inventory.slice();
@@ -103,6 +121,7 @@ export class InventoryComponent implements OnInit {
                 inventoryItem.name = item.name;
                 inventoryItem.image_id = item.images[0].id;
                 inventoryItem.image_url = item.images[0].url;
+                inventoryItem.image_sizes = item.images[0].sizes;
                 this.sanitizer.bypassSecurityTrustUrl(inventoryItem.image_url);
             },
             error => this.toastr.error("Can't get item " + $event, "Error")
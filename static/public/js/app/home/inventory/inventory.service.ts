@@ -3,6 +3,7 @@ import { Http, Response, Headers, RequestOptions } from '@angular/http';
 
 import { ItemCreationDTO } from './item-creation-dto';
 import {ProfileService} from "../profile/profile.service";
+import { waitForUpload } from '../../shared/uploads/uploads';
 
 @Injectable()
 export class InventoryService {
@@ -54,14 +55,15 @@ export class InventoryService {
 
             req.onreadystatechange = () => {
                 if(req.readyState === 4) {
-                    if(req.status === 201) {
-                        resolve(req.response);
+                    if(req.status === 202) {
+                        resolve(req.getResponseHeader("Location"));
                     } else {
                         reject(req.response);
                     }
                 }
             }
         })
+            .then((location: string) => waitForUpload(this.http, location))
             .catch(this.handleError);
     }
 
@@ -9,6 +9,7 @@ export class Comment {
     username: string;
     user_fullname: string;
     user_profile_picture: string;
+    user_profile_picture_sizes: any;
 
     constructor() {
         this.id = null;
@@ -19,6 +20,7 @@ export class Comment {
         this.username = "";
         this.user_fullname = "";
         this.user_profile_picture = null;
+        this.user_profile_picture_sizes = null;
     }
 
     fromCreationDTO(commentCreationDTO: CommentCreationDTO) {
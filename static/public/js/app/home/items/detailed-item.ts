@@ -8,6 +8,7 @@ class KeyInfo {
 export class Image {
     id: number;
     url: string;
+    sizes: any;
 }
 
 export class DetailedItem {
@@ -31,6 +32,7 @@ export class DetailedItem {
     similar: Array<InventoryItem>;
     owner_username: string;
     owner_picture_url: string;
+    owner_picture_sizes: any;
     owner_location: string;
     owner_coordinates: Location;
     traded: boolean;
@@ -54,6 +56,7 @@ export class DetailedItem {
         this.similar = [];
         this.owner_username = "";
         this.owner_picture_url = null;
+        this.owner_picture_sizes = null;
         this.owner_location = "";
         this.delivery_methods = [];
         this.traded = false;
@@ -10,6 +10,7 @@ import {Like} from "./like";
 import {ProfileService} from "../profile/profile.service";
 import {InventoryItem} from "../inventory/inventory-item";
 import {Observable} from "rxjs";
+import { fetchPage } from '../../shared/pagination/pagination';
 
 @Injectable()
 export class ItemsService {
@@ -70,10 +71,21 @@ export class ItemsService {
             .catch(this.handleError);
     }
 
+    // The profile holds the first page of the items, the next pages are fetched on demand
+    getNextUserItems(user: User): Promise<Array<InventoryItem>> {
+        return fetchPage(this.http, user.items_next)
+            .then(page => {
+                user.items = user.items.concat(page.results);
+                user.items_next = page.next;
+                return page.results;
+            })
+            .catch(this.handleError);
+    }
+
     getComments (item_id: number): Promise<Comment[]> {
         return this.http.get(this.itemsUrl + item_id + '/comments')
             .toPromise()
-            .then(this.extractData)
+            .then(res => this.extractData(res).results)
             .catch(this.handleError);
     }
 
@@ -108,32 +108,47 @@ export class AcceptPropositionModalComponent implements OnInit {
             account => {
                 this.user = account;
                 this.sanitizer.bypassSecurityTrustUrl(this.user.profile_picture_url);
-
-                let leave = false;
-                this.currentOfferGet = null;
-                // Get the offers and add them to pending offers array
-                for (let pendingOffer of this.user.pending_offers) {
-                    for (let item of this.user.items) {
-                        if (item === pendingOffer.item_received) {
-                            this.currentOfferGet = pendingOffer;
-                            leave = true;
-                            break;
-                        }
-                    }
-                    if (leave) break;
-                }
-
-                if (this.currentOfferGet !== null) {
-                    this.getUserOffer(this.currentOfferGet.item_received);
-                    this.getProposerOffer(this.currentOfferGet.item_given);
-                } else {
-                    this.displayRating = false;
-                }
+                this.showReceivedOffer();
             },
             error => this.toastr.error(error, "Error")
         );
     }
 
+    // Shows the first offer received in the loaded pages of the account, and loads the next pages of the items and
+    // pending offers only when none is found
+    showReceivedOffer() {
+        let leave = false;
+        this.currentOfferGet = null;
+        // Get the offers and add them to pending offers array
+        for (let pendingOffer of this.user.pending_offers) {
+            for (let item of this.user.items) {
+                if (item === pendingOffer.item_received) {
+                    this.currentOfferGet = pendingOffer;
+                    leave = true;
+                    break;
+                }
+            }
+            if (leave) break;
+        }
+
+        if (this.currentOfferGet !== null) {
+            this.getUserOffer(this.currentOfferGet.item_received);
+            this.getProposerOffer(this.currentOfferGet.item_given);
+        } else if (this.user.items_next) {
+            this.authService.getNextAccountItems(this.user).then(
+                () => this.showReceivedOffer(),
+                error => this.toastr.error(error, "Error")
+            );
+        } else if (this.user.pending_offers_next) {
+            this.authService.getNextPendingOffers(this.user).then(
+                () => this.showReceivedOffer(),
+                error => this.toastr.error(error, "Error")
+            );
+        } else {
+            this.displayRating = false;
+        }
+    }
+
     getUserOffer(item_wanted: number) {
         this.itemsService.getDetailedItem(item_wanted).then(
             itemWanted => {
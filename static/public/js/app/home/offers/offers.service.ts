@@ -79,12 +79,14 @@ export class OfferService {
         let u = new User();
         u.id = user.id;
         u.profile_picture_url = user.profile_picture_url;
+        u.profile_picture_sizes = user.profile_picture_sizes;
         u.username = user.username;
         u.first_name = user.first_name;
         u.last_name = user.last_name;
         u.location = user.location;
         for (let item of user.items)
             u.items.push(item);
+        u.items_next = user.items_next;
         u.notes = user.notes;
         u.note_avg = user.note_avg;
 
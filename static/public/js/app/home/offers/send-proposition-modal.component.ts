@@ -5,9 +5,11 @@ import {
 import { FormGroup, FormControl, Validators, FormBuilder }  from '@angular/forms';
 
 import { OfferService } from './offers.service';
+import { ItemsService } from '../items/items.service';
 
 import { User } from '../profile/user';
 import { DetailedItem } from '../items/detailed-item';
+import { InventoryItem } from '../inventory/inventory-item';
 import { Offer } from "./offer";
 import { ToastsManager } from 'ng2-toastr/ng2-toastr';
 
@@ -44,6 +46,7 @@ export class SendPropositionModalComponent implements OnInit {
     private message = new FormControl("", Validators.required);
 
     constructor(private offerService: OfferService,
+                private itemsService: ItemsService,
                 private formBuilder: FormBuilder,
                 public toastr: ToastsManager) {
 
@@ -77,17 +80,38 @@ export class SendPropositionModalComponent implements OnInit {
     initOffer(offerArray: Array<any>) {
         this.owner = this.offerService.cloneUser(offerArray[1]);
         this.item = offerArray[2];
-        this.ownerItems = new Array<any>(this.owner.items.length);
-        let i = 1;
-        for (let ownerItem of this.owner.items)
-            if (ownerItem.id === this.item.id)
-                this.ownerItems[0] = ownerItem;
-            else
-                this.ownerItems[i++] = ownerItem;
+
+        // The item wanted comes first, even when it isn't in the loaded pages of the inventory of the owner
+        let itemWanted = this.owner.items.find(ownerItem => ownerItem.id === this.item.id);
+        if (!itemWanted) {
+            let image = this.item.images.length > 0 ? this.item.images[0] : null;
+            itemWanted = new InventoryItem(this.item.id, this.item.name, image ? image.id : null,
+                image ? image.url : null, this.item.archived, image ? image.sizes : null);
+        }
+        this.ownerItems = [itemWanted].concat(this.owner.items.filter(ownerItem => ownerItem.id !== this.item.id));
 
         this.user = this.offerService.cloneUser(offerArray[0]);
     }
 
+    // The first pages of the inventories are in the profiles, the next ones are loaded when asked for. The carousels
+    // are created again with the new items (see MyInventoryDirective and YourInventoryDirective)
+    loadMoreUserItems() {
+        this.itemsService.getNextUserItems(this.user).then(
+            items => $('.swapp-inventory-mine').flickity('destroy'),
+            error => this.toastr.error("Can't get more items", "Error")
+        );
+    }
+
+    loadMoreOwnerItems() {
+        this.itemsService.getNextUserItems(this.owner).then(
+            items => {
+                $('.swapp-inventory-yours').flickity('destroy');
+                this.ownerItems = this.ownerItems.concat(items.filter(ownerItem => ownerItem.id !== this.item.id));
+            },
+            error => this.toastr.error("Can't get more items", "Error")
+        );
+    }
+
 
     // display a form to fill the private message and a validation button
     validOffer() {
@@ -86,6 +86,7 @@ export class OfferGet {
 export class Account {
     id: number;
     profile_picture_url: string;
+    profile_picture_sizes: any;
     username: string;
     first_name: string;
     last_name: string;
@@ -94,14 +95,17 @@ export class Account {
     last_modification_date: string;
     categories: Array<Category>;
     items: Array<number>;
+    items_next: string;
     notes: number;
     note_avg: number;
     coordinates: Coordinates;
     pending_offers: Array<OfferGet>;
+    pending_offers_next: string;
 
     constructor() {
         this.id = null;
         this.profile_picture_url = null;
+        this.profile_picture_sizes = null;
         this.username = null;
         this.first_name = null;
         this.last_name = null;
@@ -110,9 +114,11 @@ export class Account {
         this.last_modification_date = null;
         this.categories = [];
         this.items = [];
+        this.items_next = null;
         this.notes = null;
         this.note_avg = null;
         this.coordinates = new Coordinates(null, null);
         this.pending_offers = [];
+        this.pending_offers_next = null;
     }
 }
\ No newline at end of file
@@ -133,7 +133,10 @@ export class CreateAccountModalComponent implements OnInit {
             this.profileService.addProfilePicture(formData)
                 .then( // now signal the ProfileComponent that we uploaded picture
                     res => this.updateAccountEvent.emit(),
-                    error => this.updateAccountEvent.emit()
+                    error => {
+                        this.toastr.error(error, "Error");
+                        this.updateAccountEvent.emit();
+                    }
                 ); 
         }
     }
@@ -7,6 +7,8 @@ import {Notification} from "./notification";
 import {Subscription} from "rxjs";
 import {AuthService} from "../../shared/authentication/authentication.service";
 
+declare let $:any;
+
 @Component({
     moduleId: module.id,
     selector: 'notification-modal',
@@ -19,25 +21,62 @@ export class NotificationModalComponent implements OnInit {
     @Output() notificationEvent = new EventEmitter();
 
     notifications: Notification[];
+    unreadCount: number = 0;
     subscription: Subscription;
 
     constructor (private notificationsService: NotificationsService, private authService: AuthService) {}
 
     ngOnInit() {
         this.loggedIn = this.authService.isLoggedIn();
+
+        let that = this;
+        $('#notification-modal').on('shown.bs.modal', function (e: any) {
+            that.markShownRead();
+        });
+    }
+
+    // Marks the notifications shown in the list as read, up to the most recent one: the notifications coalesced after
+    // they were received stay unread on the server
+    markShownRead() {
+        if (!this.notifications || this.notifications.length === 0) {
+            return;
+        }
+
+        this.notificationsService.markRead(this.notifications[0].position).then(count => {
+            this.notifications.forEach(notification => notification.read = true);
+            this.unreadCount = Math.max(this.unreadCount - count, 0);
+            this.notificationEvent.emit(this.unreadCount);
+        });
     }
 
     ngOnChanges() {
         if (this.loggedIn) {
             this.notificationsService.getNotification().then(res => {
                 this.notifications = res;
-                this.notificationEvent.emit(this.notifications.length);
             });
+            this.notificationsService.getUnreadCount().then(count => {
+                this.unreadCount = count;
+                this.notificationEvent.emit(this.unreadCount);
+            });
+
+            if (!this.subscription) {
+                this.subscription = this.notificationsService.streamNotifications().subscribe(notification => {
+                    // a coalesced notification is sent again when updated, and moves to the top
+                    const others = (this.notifications || []).filter(n => n.id !== notification.id);
+                    if (others.length === (this.notifications || []).length) {
+                        this.unreadCount++;
+                        this.notificationEvent.emit(this.unreadCount);
+                    }
+                    this.notifications = [notification].concat(others);
+                });
+            }
         }
     }
 
     ngOnDestroy() {
         // prevent memory leak when component is destroyed
-        this.subscription.unsubscribe();
+        if (this.subscription) {
+            this.subscription.unsubscribe();
+        }
     }
 }
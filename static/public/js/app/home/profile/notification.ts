@@ -1,6 +1,9 @@
 export class Notification {
     id: number;
     content: string;
+    kind: string;
+    count: number;
     read: boolean;
     date: Date;
+    position: string;
 }
\ No newline at end of file
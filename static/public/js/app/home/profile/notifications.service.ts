@@ -1,5 +1,6 @@
 import { Injectable } from '@angular/core';
 import { Http, Response } from '@angular/http';
+import {Observable} from "rxjs/Observable";
 import {Notification} from "./notification";
 
 
@@ -13,10 +14,36 @@ export class NotificationsService {
     getNotification (): Promise<Notification[]> {
         return this.http.get(this.notificationsUrl)
             .toPromise()
-            .then(this.extractData)
+            .then(res => this.extractData(res).results)
             .catch(this.handleError);
     }
 
+    getUnreadCount (): Promise<number> {
+        return this.http.get(this.notificationsUrl + 'unread_count/')
+            .toPromise()
+            .then(res => this.extractData(res).count)
+            .catch(this.handleError);
+    }
+
+    // Marks the notifications as read up to the position of the last notification seen
+    markRead (upTo?: string): Promise<number> {
+        return this.http.post(this.notificationsUrl + 'mark_read/', upTo !== undefined ? {up_to: upTo} : {})
+            .toPromise()
+            .then(res => this.extractData(res).count)
+            .catch(this.handleError);
+    }
+
+    // Emits the new notifications as they are pushed by the server, the browser reconnecting when the stream ends
+    streamNotifications (): Observable<Notification> {
+        return new Observable<Notification>(observer => {
+            const source = new EventSource(this.notificationsUrl + 'stream/');
+            source.addEventListener('notification', (event: MessageEvent) => {
+                observer.next(JSON.parse(event.data));
+            });
+            return () => source.close();
+        });
+    }
+
     private extractData(res: Response) {
         let body = res.json();
         return body || { };
@@ -67,6 +67,8 @@ export class ProfileComponent implements OnInit {
     user: Account = new Account();
     notificationNumber: number;
     pendingOffersNumber: number = 0;
+    // whether pending offers may be in the pages of the items or pending offers which aren't loaded
+    morePendingOffers: boolean = false;
 
     private loginForm: FormGroup;
     private loginName = new FormControl("", Validators.required);
@@ -138,7 +140,8 @@ export class ProfileComponent implements OnInit {
                 this.sanitizer.bypassSecurityTrustUrl(this.user.profile_picture_url);
 
                 this.pendingOffersNumber = 0;
-                // Get the offers and add them to pending offers array
+                this.morePendingOffers = this.user.items_next != null || this.user.pending_offers_next != null;
+                // Get the offers and add them to pending offers array (in the first pages of the account)
                 for (let pendingOffer of this.user.pending_offers) {
                     for (let item of this.user.items) {
                         if (+item === +pendingOffer.item_received) {
@@ -3,6 +3,7 @@ import {Response, Headers, RequestOptions, Http} from '@angular/http';
 import {User} from "./user";
 import {Subject} from "rxjs/Subject";
 import {Account} from "./account";
+import { waitForUpload } from '../../shared/uploads/uploads';
 
 @Injectable()
 export class ProfileService {
@@ -33,14 +34,15 @@ export class ProfileService {
 
             req.onreadystatechange = () => {
                 if(req.readyState === 4) {
-                    if(req.status === 201) {
-                        resolve(req.response);
+                    if(req.status === 202) {
+                        resolve(req.getResponseHeader("Location"));
                     } else {
                         reject(req.response);
                     }
                 }
             }
         })
+        .then((location: string) => waitForUpload(this.http, location))
         .catch(this.handleError);
     }
 
@@ -4,11 +4,13 @@ import { Coordinates } from './account';
 export class User {
     id: number;
     profile_picture_url: string;
+    profile_picture_sizes: any;
     username: string;
     first_name: string;
     last_name: string;
     location: string;
     items: Array<InventoryItem>;
+    items_next: string;
     notes: number;
     note_avg: number;
     interested_by: Array<{id:number,name:string}>;
@@ -17,11 +19,13 @@ export class User {
     constructor() {
         this.id = -1;
         this.profile_picture_url = null;
+        this.profile_picture_sizes = null;
         this.username = "";
         this.first_name = "";
         this.last_name = "";
         this.location = "";
         this.items = [];
+        this.items_next = null;
         this.notes = 0;
         this.note_avg = 0;
         this.interested_by = [];
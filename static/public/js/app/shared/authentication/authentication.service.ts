@@ -6,6 +6,7 @@ import { User } from '../../home/profile/user';
 import { Account } from "../../home/profile/account";
 import {UserCreationDTO} from "../../home/profile/user-creation-dto";
 import {UserLoginDTO} from "../../home/profile/user-login-dto";
+import { fetchPage } from '../pagination/pagination';
 
 @Injectable()
 export class AuthService {
@@ -96,11 +97,33 @@ export class AuthService {
             .catch(this.handleError);
     }
 
+    // The account holds the first pages of the items and pending offers, the next pages are fetched on demand
+    getNextAccountItems(account: Account): Promise<Account> {
+        return fetchPage(this.http, account.items_next)
+            .then(page => {
+                account.items = account.items.concat(page.results.map((item: any) => item.id));
+                account.items_next = page.next;
+                return account;
+            })
+            .catch(this.handleError);
+    }
+
+    getNextPendingOffers(account: Account): Promise<Account> {
+        return fetchPage(this.http, account.pending_offers_next)
+            .then(page => {
+                account.pending_offers = account.pending_offers.concat(page.results);
+                account.pending_offers_next = page.next;
+                return account;
+            })
+            .catch(this.handleError);
+    }
+
     extractUser(res: Response) {
         let body = res.json();
         let user = new Account();
         user.id = body.id;
         user.profile_picture_url = body.profile_picture_url;
+        user.profile_picture_sizes = body.profile_picture_sizes;
         user.username = body.username;
         user.first_name = body.first_name;
         user.last_name = body.last_name;
@@ -114,9 +137,11 @@ export class AuthService {
         user.notes = body.notes;
         user.note_avg = body.note_avg;
         user.items = body.items;
+        user.items_next = body.items_next;
         user.coordinates.longitude = body.coordinates.longitude;
         user.coordinates.latitude = body.coordinates.latitude;
         user.pending_offers = body.pending_offers;
+        user.pending_offers_next = body.pending_offers_next;
         return user;
     }
 
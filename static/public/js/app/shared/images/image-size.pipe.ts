@@ -0,0 +1,15 @@
+import { Pipe, PipeTransform } from '@angular/core';
+
+// Whether the browser decodes WebP images, checked once by encoding a canvas
+const webpSupported: boolean = document.createElement('canvas').toDataURL('image/webp').indexOf('data:image/webp') === 0;
+
+// Returns the URL of a derivative of an image ("thumbnail", "medium" or "large") from its sizes, in WebP when the
+// browser supports it and in JPEG otherwise, or null for an image without derivatives
+@Pipe({ name: 'imageSize' })
+export class ImageSizePipe implements PipeTransform {
+    transform(sizes: any, size: string): string {
+        if (!sizes || !sizes[size])
+            return null;
+        return webpSupported ? sizes[size].webp : sizes[size].jpg;
+    }
+}
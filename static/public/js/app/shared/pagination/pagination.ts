@@ -0,0 +1,14 @@
+import { Http } from '@angular/http';
+
+// Page of a paginated list, with the link to the next page or null on the last page
+export class Page {
+    results: Array<any>;
+    next: string;
+}
+
+// Fetches the page of a paginated list at the given link
+export function fetchPage(http: Http, next: string): Promise<Page> {
+    return http.get(next)
+        .toPromise()
+        .then(res => res.json() as Page);
+}
@@ -0,0 +1,21 @@
+import { Http } from '@angular/http';
+
+// Interval (in milliseconds) between two polls of the status of an upload
+const UPLOAD_POLL_INTERVAL = 1000;
+
+// The uploaded images are processed in the background: polls the status of an upload at the given location until it
+// is processed, and resolves with the upload when it is done or rejects with its error when it failed
+export function waitForUpload(http: Http, location: string): Promise<any> {
+    return http.get(location)
+        .toPromise()
+        .then(res => {
+            let upload = res.json();
+            if (upload.status === "done")
+                return upload;
+            if (upload.status === "failed")
+                return Promise.reject(upload.error);
+
+            return new Promise(resolve => setTimeout(resolve, UPLOAD_POLL_INTERVAL))
+                .then(() => waitForUpload(http, location));
+        });
+}
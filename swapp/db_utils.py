@@ -0,0 +1,49 @@
+from django.db import connection, transaction
+from django.db.models import Max
+
+
+def bulk_create_with_pks(model, objs):
+    """
+    Bulk inserts the given objects and sets their primary keys, even on backends that can't return them from a bulk
+    insert (sqlite).
+
+    Must be called inside a transaction: on such backends, the inserted rows are looked up as the rows following the
+    highest primary key that existed before the insert.
+
+    :param model: the model of the objects to insert.
+    :param objs: the unsaved objects to insert.
+    :return: the inserted objects.
+    """
+    if len(objs) == 0 or connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+
+    last_pk = model.objects.aggregate(Max("pk"))["pk__max"] or 0
+    model.objects.bulk_create(objs)
+
+    pks = model.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)
+    for obj, pk in zip(objs, pks):
+        obj.pk = pk
+
+    return objs
+
+
+def delete_in_chunks(queryset, chunk_size=1000):
+    """
+    Deletes the objects of the given queryset in chunks, each one in its own transaction, so that the tables are never
+    locked for long.
+
+    :param queryset: the objects to delete.
+    :param chunk_size: the maximum number of objects deleted per transaction.
+    :return: the number of objects deleted.
+    """
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.values_list("pk", flat=True)[:chunk_size])
+            if len(pks) == 0:
+                return deleted
+
+            queryset.model.objects.filter(pk__in=pks).delete()
+
+        deleted += len(pks)
@@ -0,0 +1,177 @@
+"""
+Processing of the uploaded images, and their resized derivatives.
+
+Each uploaded image (items images and profile pictures) is resized at upload time to the sizes of DERIVATIVE_SIZES,
+each one stored in WebP and in JPEG for the browsers not supporting WebP, next to the original file:
+"3f/3f2a...9c.png" has the derivatives "3f/3f2a...9c.png_thumbnail.webp", "3f/3f2a...9c.png_thumbnail.jpg", ... As
+their names are derived from the full name of the original file, their URLs are built without querying or checking the
+storage, the originals differing only by their extension don't share their derivatives, and they are shared with the
+original by the identical images (see swapp.storage).
+"""
+import os
+from collections import OrderedDict
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image as PILImage
+
+from swapp.storage import staging_storage
+
+# maximum width and height of each derivative, the images smaller than a size being kept at their size
+DERIVATIVE_SIZES = OrderedDict([("thumbnail", 200), ("medium", 600), ("large", 1200)])
+
+# file extension and Pillow format of the formats of the derivatives, the first one being preferred
+DERIVATIVE_FORMATS = (("webp", "WEBP"), ("jpg", "JPEG"))
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def derivative_name(name, size, extension):
+    return "%s_%s.%s" % (name, size, extension)
+
+
+def derivative_names(name):
+    return [derivative_name(name, size, extension) for size in DERIVATIVE_SIZES for extension, _ in DERIVATIVE_FORMATS]
+
+
+def derivatives_exist(name, storage=default_storage):
+    return all(storage.exists(derivative) for derivative in derivative_names(name))
+
+
+def derivative_urls(image):
+    """
+    Returns the URLs of the derivatives of an image file, by size then by format, or None if there is no image.
+
+    :param image: the image field file.
+    """
+    if not image:
+        return None
+
+    return OrderedDict(
+        (size, OrderedDict((extension, image.storage.url(derivative_name(image.name, size, extension)))
+                           for extension, _ in DERIVATIVE_FORMATS))
+        for size in DERIVATIVE_SIZES
+    )
+
+
+def to_rgb(image):
+    """
+    Converts an image to RGB, the transparent parts being made white, as JPEG has no transparency.
+    """
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = PILImage.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[3])
+        return background
+    return image.convert("RGB")
+
+
+def create_derivatives(name, storage=default_storage):
+    """
+    Creates the derivatives of a stored image, replacing the existing ones.
+
+    :param name: the name of the original image in the storage.
+    :return: the names of the derivatives.
+    """
+    with storage.open(name, "rb") as f:
+        return save_derivatives(PILImage.open(f), name, storage)
+
+
+def save_derivatives(image, name, storage=default_storage):
+    """
+    Saves the derivatives of a decoded image, as the derivatives of the stored image of the given name.
+    """
+    original = to_rgb(image)
+
+    names = []
+    for size, max_size in DERIVATIVE_SIZES.items():
+        resized = original.copy()
+        resized.thumbnail((max_size, max_size), PILImage.LANCZOS)
+
+        for extension, fmt in DERIVATIVE_FORMATS:
+            content = BytesIO()
+            resized.save(content, fmt, quality=WEBP_QUALITY if fmt == "WEBP" else JPEG_QUALITY)
+
+            names.append(storage.save_as(derivative_name(name, size, extension), ContentFile(content.getvalue())))
+
+    return names
+
+
+def delete_derivatives(name, storage=default_storage):
+    for derivative in derivative_names(name):
+        storage.delete(derivative)
+
+
+# transpositions applying the EXIF orientation of a photo, by orientation
+EXIF_ORIENTATION_TAG = 274
+EXIF_TRANSPOSITIONS = {
+    2: PILImage.FLIP_LEFT_RIGHT,
+    3: PILImage.ROTATE_180,
+    4: PILImage.FLIP_TOP_BOTTOM,
+    5: PILImage.TRANSPOSE,
+    6: PILImage.ROTATE_270,
+    7: PILImage.TRANSVERSE,
+    8: PILImage.ROTATE_90,
+}
+
+
+def apply_exif_orientation(image):
+    """
+    Returns the image rotated or flipped according to its EXIF orientation, as the EXIF data isn't kept when the image
+    is encoded again.
+    """
+    try:
+        orientation = image._getexif().get(EXIF_ORIENTATION_TAG)
+    except Exception:
+        orientation = None
+
+    if orientation in EXIF_TRANSPOSITIONS:
+        return image.transpose(EXIF_TRANSPOSITIONS[orientation])
+    return image
+
+
+def process_upload(staged_name, storage=default_storage, staging=staging_storage):
+    """
+    Decodes a staged upload, applies its EXIF orientation and encodes it again next to the other images, in PNG if
+    it has transparency and in JPEG otherwise, then creates its derivatives unless an identical image is already
+    stored. Doesn't use the database, so that it can run in worker processes.
+
+    :param staged_name: the name of the upload in the staging storage.
+    :return: the name of the stored image.
+    :raise IOError: if the upload is not a valid image.
+    """
+    with staging.open(staged_name, "rb") as f:
+        image = PILImage.open(f)
+        image.load()
+
+    transparent = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = apply_exif_orientation(image)
+
+    content = BytesIO()
+    if transparent:
+        image.convert("RGBA").save(content, "PNG", optimize=True)
+        extension = "png"
+    else:
+        image.convert("RGB").save(content, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        extension = "jpg"
+
+    content = ContentFile(content.getvalue())
+    name = "%s.%s" % (os.path.splitext(os.path.basename(staged_name))[0], extension)
+
+    # an identical image is already stored with its derivatives, and shared (see swapp.storage)
+    existing = storage.exists(storage.content_name(name, content))
+    name = storage.save(name, content)
+    if existing and derivatives_exist(name, storage):
+        return name
+
+    try:
+        save_derivatives(image, name, storage)
+    except Exception:
+        if not existing:
+            storage.delete(name)
+            delete_derivatives(name, storage)
+        raise
+
+    return name
@@ -0,0 +1,57 @@
+from rest_framework.pagination import CursorPagination
+
+
+def positive_int(value, cutoff):
+    """
+    Parses a strictly positive integer, capped at cutoff.
+
+    :raise ValueError: if the value isn't a strictly positive integer.
+    """
+    value = int(value)
+    if value <= 0:
+        raise ValueError("%d is not a positive integer" % value)
+    return min(value, cutoff)
+
+
+class DateCursorPagination(CursorPagination):
+    """
+    Cursor pagination on the date of the objects, most recent first, objects of a same date being ordered by id. Unlike
+    page numbers, a cursor stays valid when new objects are added and is resolved with an indexed range query instead
+    of an offset.
+    """
+    ordering = ("-date", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        # the cursor pagination of this version of rest framework ignores the page size parameter
+        try:
+            return positive_int(request.query_params[self.page_size_query_param], self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+
+class ActivityCursorPagination(DateCursorPagination):
+    """
+    Cursor pagination on the last activity of the objects, most recent first.
+    """
+    ordering = ("-last_activity", "-id")
+
+
+class CreationDateCursorPagination(DateCursorPagination):
+    """
+    Cursor pagination on the creation date of the objects, most recent first.
+    """
+    ordering = ("-creation_date", "-id")
+
+
+def embedded_page(pagination_class, queryset, request, url, absolute=True):
+    """
+    Paginates objects embedded in another response: returns their first page, and the link to the next page served
+    by the list endpoint at the given URL. The link is relative to the host when absolute is False.
+    """
+    paginator = pagination_class()
+    page = paginator.paginate_queryset(queryset, request)
+    paginator.base_url = request.build_absolute_uri(url) if absolute else url
+    return page, paginator.get_next_link()
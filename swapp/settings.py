@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
+    "rest_framework.authtoken",
 
     "private_messages",
     "comments",
@@ -49,6 +50,30 @@ INSTALLED_APPS = [
     "users",
 ]
 
+# Cache shared by the server processes and the dispatcher: the notification streams are woken up (see
+# notifications.pubsub) and the cached accounts are invalidated (see users.account) through it, so it mustn't be local
+# to a process. The files are shared by the processes of a host, memcached should be used across hosts. The tests use
+# their own cache (see swapp.test_runner).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+        },
+    }
+}
+
+# Sessions are read from the cache, and only from the database when missing from it
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# The user of a session is loaded with its profile, coordinates and location (see users.backends). The model backend
+# still loads the users of the sessions opened with it.
+AUTHENTICATION_BACKENDS = [
+    "users.backends.UserProfileBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -79,6 +104,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "swapp.wsgi.application"
 
+TEST_RUNNER = "swapp.test_runner.TestRunner"
+
 # Database
 # https://docs.djangoproject.com/en/1.10/ref/settings/#databases
 
@@ -140,11 +167,52 @@ STATIC_URL = "/static/"
 # Rest Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.BasicAuthentication",
+        "users.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
     )
 }
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "uploaded_media")
 MEDIA_URL = "/media/"
 MEDIA_TEST = os.path.join(BASE_DIR, "test_media")
+
+# The uploaded images wait to be processed in STAGING_ROOT, outside of MEDIA_ROOT so that they are never served (see
+# items.uploads), and are rejected above IMAGE_UPLOAD_MAX_SIZE bytes
+STAGING_ROOT = os.path.join(BASE_DIR, "staged_uploads")
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+# The uploaded images are stored under the hash of their content, identical files being shared (see swapp.storage)
+DEFAULT_FILE_STORAGE = "swapp.storage.ContentAddressedStorage"
+
+# Maximum age (in seconds) of the in-memory trade graph before it is reloaded from the database
+TRADE_GRAPH_MAX_AGE = 300
+
+# Broker waking up the notification streams when notifications are dispatched (see notifications.pubsub). The cache
+# broker works across processes when CACHES is shared between the server and the dispatcher.
+NOTIFICATIONS_BROKER = "notifications.pubsub.CacheBroker"
+NOTIFICATIONS_BROKER_POLL_INTERVAL = 1
+
+# Interval (in seconds) between two keepalive messages of a notification stream, and maximum duration of a stream
+# before the client has to reconnect
+NOTIFICATIONS_STREAM_KEEPALIVE = 15
+NOTIFICATIONS_STREAM_MAX_DURATION = 300
+
+# Duration (in seconds) during which the notifications of the same kind about the same target are coalesced into one
+NOTIFICATIONS_COALESCING_WINDOW = 3600
+
+# Retention of the history (see the compact_history command): number of days after which read notifications are
+# deleted, and number of most recent consultations kept for each user
+NOTIFICATIONS_RETENTION_DAYS = 90
+CONSULTATIONS_KEPT_PER_USER = 50
+
+# Number of seconds the account of an user is kept in the cache (see users.account)
+ACCOUNT_CACHE_TIMEOUT = 300
+
+# Number of API tokens whose user is kept in memory by each process, and number of seconds they are kept (see
+# users.authentication). A revoked token may still be accepted by other processes for that long.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TIMEOUT = 60
+
+# Number of worker processes of the process_image_uploads command processing the uploaded images (see items.uploads)
+IMAGE_UPLOAD_WORKERS = 2
@@ -0,0 +1,115 @@
+"""
+Content-addressed storage of the uploaded images.
+
+The images are stored under the SHA-256 of their content, so that identical files (the same photo reused across items,
+or the samples loaded again by populate.py) are stored once and shared by the Image and UserProfile rows referencing
+them: "photo.jpg" is stored as "3f/3f2a...9c.jpg". A shared file is deleted with its last reference (see
+items.models.delete_unreferenced_image, which locks the file against the creation of new references). The files are
+written under a temporary name then linked to their address, so that a file is never read while it is written, and
+that the concurrent saves of a same content store one file under its address instead of renamed copies. As the content
+of a name never changes, the files can be cached forever by the browsers (see serve_media).
+
+The derivatives of an image (see swapp.images) are named after its address, and saved under these names by save_as.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.cache import patch_cache_control
+from django.utils.deconstruct import deconstructible
+from django.views.static import serve
+
+# the content addresses, and the names derived from them ("3f/3f2a...9c.png_thumbnail.webp")
+CONTENT_ADDRESS_RE = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?(_\w+\.\w+)?$")
+
+# max-age of the immutable files: one year, the maximum supported by the HTTP caches
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def is_content_addressed(name):
+    return CONTENT_ADDRESS_RE.match(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        """
+        Returns the content address of a file: the SHA-256 of its content, with the extension of its name.
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+
+        return "%s/%s%s" % (digest[:2], digest, os.path.splitext(name)[1].lower())
+
+    def save(self, name, content, max_length=None):
+        """
+        Saves a file under its content address, unless a file with the same content is already stored.
+
+        :return: the content address of the file.
+        """
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        address = self.content_name(name, content)
+        if self.exists(address):
+            return address
+
+        temporary_name = self.save_temporary(address, content)
+        try:
+            os.link(self.path(temporary_name), self.path(address))
+        except FileExistsError:
+            # saved concurrently, with the same content
+            pass
+        finally:
+            self.delete(temporary_name)
+
+        return address
+
+    def save_as(self, name, content):
+        """
+        Saves a file under the given name, replacing the existing file, for the files named after a content address.
+        """
+        temporary_name = self.save_temporary(name, content)
+        os.replace(self.path(temporary_name), self.path(name))
+        return name
+
+    def save_temporary(self, name, content):
+        """
+        Saves a file under a unique temporary name next to the given name.
+        """
+        return super()._save("%s.%s.tmp" % (name, uuid.uuid4().hex), content)
+
+
+@deconstructible
+class StagingStorage(FileSystemStorage):
+    """
+    Storage of the uploads waiting to be processed (see items.uploads), in settings.STAGING_ROOT. The uploads are
+    stored under generated names, without the file names of the clients, and aren't shared even when identical as they
+    are deleted once processed.
+    """
+    def __init__(self):
+        super().__init__(location=settings.STAGING_ROOT)
+
+    def generate_filename(self, filename):
+        return uuid.uuid4().hex
+
+
+staging_storage = StagingStorage()
+
+
+def serve_media(request, path, document_root=None):
+    """
+    Serves an uploaded file in development, the content-addressed files being cached forever by the browsers. In
+    production, the web server serving MEDIA_ROOT should send the same headers.
+    """
+    response = serve(request, path, document_root=document_root)
+    if is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
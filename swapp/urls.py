@@ -3,9 +3,10 @@ swapp URL Configuration
 """
 from django.conf import settings
 from django.conf.urls import url, include
-from django.conf.urls.static import static
 from django.contrib import admin
 
+from swapp.storage import serve_media
+
 urlpatterns = [
     url(r"^admin/", admin.site.urls),
     url(r"", include("pages.home.urls")),
@@ -16,4 +17,9 @@ urlpatterns = [
     url(r"api/", include("offers.urls")),
     url(r"api/", include("notifications.urls"))
 
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+if settings.DEBUG:
+    urlpatterns += [
+        url(r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"), serve_media, {"document_root": settings.MEDIA_ROOT}),
+    ]
@@ -0,0 +1,202 @@
+"""
+Account snapshot of the current user, and public profile of an user.
+
+The account payload is requested on every page load, and the public profile from every item page: they are built
+with a few joined and aggregated queries and kept in the cache for settings.ACCOUNT_CACHE_TIMEOUT seconds. The
+receivers below invalidate them when the profile, location, categories, items, images, notes or offers of their user
+are saved or deleted; the statements updating several rows at once invalidate the accounts they change with
+invalidate_accounts.
+"""
+import hashlib
+import json
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from items.models import Image, Item
+from items.serializers import CategorySerializer, InventoryItemSerializer
+from offers.models import Offer
+from offers.serializers import RetrieveOfferSerializer
+from swapp.images import derivative_urls
+from swapp.pagination import CreationDateCursorPagination, embedded_page
+from users.models import Coordinates, Location, Note, UserProfile
+from users.serializers import CoordinatesSerializer, LocationSerializer
+
+ACCOUNT_CACHE_KEY = "account:%d"
+PUBLIC_ACCOUNT_CACHE_KEY = "public_account:%d"
+
+# the fields of an item which are shown neither in the account of its owner nor in its public profile: saving only
+# them keeps the cached payloads
+ITEM_FIELDS_NOT_IN_ACCOUNTS = frozenset(["views"])
+
+
+def pending_offers_of(user_id):
+    """
+    Returns the pending offers made or received by an user. The items of the user are matched in a subquery, so that
+    the offers are looked up with the indexes of their items instead of joining the items.
+    """
+    items = Item.objects.filter(owner_id=user_id).values("id")
+    return Offer.objects.filter(Q(item_given__in=items) | Q(item_received__in=items), answered=False)
+
+
+def build_account(user, request):
+    """
+    Builds the account payload of an user, loaded with its profile, location and coordinates (as by the
+    authentication backend): one query for each of the categories, the first page of items and the first page of
+    pending offers. The links to the next pages are relative, as the payload may be served to other hosts.
+    """
+    user_id = user.id
+    user_profile = user.userprofile
+
+    items, items_next = embedded_page(CreationDateCursorPagination,
+                                      Item.objects.filter(owner_id=user_id).only("id", "creation_date"), request,
+                                      reverse("users:account_items"), absolute=False)
+    pending_offers, pending_offers_next = embedded_page(CreationDateCursorPagination, pending_offers_of(user_id),
+                                                        request, reverse("users:account_pending_offers"),
+                                                        absolute=False)
+
+    return {
+        "id": user.id,
+        "profile_picture_url": None if user_profile.image.name == "" else user_profile.image.url,
+        "profile_picture_sizes": derivative_urls(user_profile.image),
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "location": LocationSerializer(user.location).data,
+        "last_modification_date": user_profile.last_modification_date,
+        "categories": CategorySerializer(user_profile.categories.all(), many=True).data,
+        "items": [i.id for i in items],
+        "items_next": items_next,
+        "notes": user_profile.note_count,
+        "note_avg": user_profile.note_avg,
+        "coordinates": CoordinatesSerializer(user.coordinates).data,
+        "pending_offers": RetrieveOfferSerializer(pending_offers, many=True).data,
+        "pending_offers_next": pending_offers_next
+    }
+
+
+def get_account(user, request):
+    """
+    Returns the account payload of an user, from the cache when the request doesn't ask for another page size.
+    """
+    if len(request.query_params) > 0:
+        return build_account(user, request)
+
+    key = ACCOUNT_CACHE_KEY % user.id
+    account = cache.get(key)
+    if account is None:
+        account = build_account(user, request)
+        cache.set(key, account, settings.ACCOUNT_CACHE_TIMEOUT)
+    return account
+
+
+def build_public_account(user_id, request):
+    """
+    Builds the public profile of an user, with the first page of its items. The link to the next page is relative.
+    """
+    user = User.objects.select_related("userprofile", "location", "coordinates").get(pk=user_id)
+    user_profile = user.userprofile
+
+    items, items_next = embedded_page(CreationDateCursorPagination,
+                                      Item.objects.filter(owner_id=user_id).select_related("primary_image"), request,
+                                      reverse("users:public_items", args=[user.username]), absolute=False)
+
+    return {
+        "id": user.id,
+        "profile_picture_url": None if user_profile.image.name == "" else user_profile.image.url,
+        "profile_picture_sizes": derivative_urls(user_profile.image),
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "location": "%s, %s, %s" % (user.location.city, user.location.region, user.location.country),
+        "items": InventoryItemSerializer(items, many=True).data,
+        "items_next": items_next,
+        "notes": user_profile.note_count,
+        "note_avg": user_profile.note_avg,
+        "interested_by": CategorySerializer(user_profile.categories.all(), many=True).data,
+        "coordinates": CoordinatesSerializer(user.coordinates).data
+    }
+
+
+def get_public_account(user_id, request):
+    """
+    Returns the public profile of an user and its ETag, from the cache when the request doesn't ask for another page
+    size. The ETag is a hash of the profile, computed when the profile is built.
+    """
+    key = PUBLIC_ACCOUNT_CACHE_KEY % user_id
+    cached = cache.get(key) if len(request.query_params) == 0 else None
+    if cached is not None:
+        return cached
+
+    account = build_public_account(user_id, request)
+    etag = hashlib.md5(json.dumps(account, sort_keys=True, cls=DjangoJSONEncoder).encode("utf-8")).hexdigest()
+    if len(request.query_params) == 0:
+        cache.set(key, (account, etag), settings.ACCOUNT_CACHE_TIMEOUT)
+    return account, etag
+
+
+def invalidate_accounts(user_ids):
+    """
+    Removes the cached accounts and public profiles of the given users, now and once the current transaction is
+    committed, so that an account built by a concurrent request before the commit isn't kept.
+    """
+    keys = [key % user_id for user_id in set(user_ids) if user_id is not None
+            for key in (ACCOUNT_CACHE_KEY, PUBLIC_ACCOUNT_CACHE_KEY)]
+    if len(keys) > 0:
+        cache.delete_many(keys)
+        transaction.on_commit(partial(cache.delete_many, keys))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_accounts([instance.id])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Coordinates)
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=Item)
+def user_related_changed(sender, instance, **kwargs):
+    invalidate_accounts([instance.owner_id if sender is Item else instance.user_id])
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or not update_fields <= ITEM_FIELDS_NOT_IN_ACCOUNTS:
+        invalidate_accounts([instance.owner_id])
+
+
+@receiver(m2m_changed, sender=UserProfile.categories.through)
+def categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+
+    if not reverse:
+        invalidate_accounts([instance.user_id])
+    elif pk_set:
+        invalidate_accounts(UserProfile.objects.filter(pk__in=pk_set).values_list("user_id", flat=True))
+
+
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+def offer_changed(sender, instance, **kwargs):
+    invalidate_accounts(Item.objects.filter(pk__in=[instance.item_given_id, instance.item_received_id])
+                        .values_list("owner_id", flat=True))
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def image_changed(sender, instance, **kwargs):
+    invalidate_accounts(Item.objects.filter(pk=instance.item_id).values_list("owner_id", flat=True))
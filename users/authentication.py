@@ -0,0 +1,105 @@
+"""
+Token authentication of the API clients.
+
+A token is issued at login and sent in the "Authorization: Token <key>" header, so that clients don't send their
+password, whose hash is slow to check on purpose, on every request. The users of the tokens are kept in a per-process
+LRU cache of settings.TOKEN_CACHE_SIZE tokens for settings.TOKEN_CACHE_TIMEOUT seconds. A deleted token (at logout)
+or a saved user is removed from the cache of the process handling the request at once, and from the caches of the
+other processes when their entry expires. Only the user rows are cached: their profile, coordinates and location are
+updated by other requests and processes (notes, uploaded pictures), and are loaded by each request using them.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns a copy of the user of a token, or None if the token isn't cached or has expired. The cached user is
+        never handed out, so that the related objects loaded by a request aren't shared with the other requests.
+        """
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is None:
+                return None
+
+            user, expires = entry
+            if expires < time.time():
+                del self._users[key]
+                return None
+
+            self._users.move_to_end(key)
+            return copy.deepcopy(user)
+
+    def set(self, key, user):
+        with self._lock:
+            self._users[key] = (copy.deepcopy(user), time.time() + self.timeout)
+            self._users.move_to_end(key)
+            while len(self._users) > self.size:
+                self._users.popitem(last=False)
+
+    def revoke(self, key):
+        with self._lock:
+            self._users.pop(key, None)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            for key in [k for k, (user, _) in self._users.items() if user.id == user_id]:
+                del self._users[key]
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TIMEOUT)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication looking up the tokens in the token cache before the database.
+    """
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is not None:
+            return user, key
+
+        try:
+            token = Token.objects.select_related("user").get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        token_cache.set(key, token.user)
+        return token.user, key
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.revoke(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        token_cache.revoke_user(instance.id)
@@ -0,0 +1,70 @@
+"""
+History of the users: the consultations of items, one per item and user counting the visits, of which only the most
+recent ones are kept, and the read notifications, deleted after some time.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from notifications.models import Notification
+from swapp.db_utils import delete_in_chunks
+from users.models import Consultation
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def record_consultation(user, item):
+    """
+    Records a visit of the item by the user, in the consultation of the item by the user. The consultation is updated
+    if it exists and created otherwise, updating it if it has been created concurrently in the meantime.
+    """
+    def update():
+        return Consultation.objects.filter(user=user, item=item).update(date=timezone.now(), visits=F("visits") + 1)
+
+    if update() == 0:
+        try:
+            with transaction.atomic():
+                Consultation.objects.create(user=user, item=item)
+        except IntegrityError:
+            update()
+
+
+def compact_user_consultations(user_id, keep, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Deletes the consultations of the user beyond its `keep` most recent ones.
+
+    :return: the number of consultations deleted.
+    """
+    consultations = Consultation.objects.filter(user_id=user_id)
+
+    if keep > 0:
+        last_kept = consultations.order_by("-date", "-id")[keep - 1:keep].first()
+        if last_kept is None:
+            return 0
+        consultations = consultations.filter(Q(date__lt=last_kept.date) | Q(date=last_kept.date, id__lt=last_kept.id))
+
+    return delete_in_chunks(consultations, chunk_size)
+
+
+def compact_consultations(keep, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Deletes the consultations of all the users beyond their `keep` most recent ones.
+
+    :return: the number of consultations deleted.
+    """
+    user_ids = Consultation.objects.values("user_id").annotate(count=Count("id")).filter(count__gt=keep) \
+        .values_list("user_id", flat=True)
+
+    return sum(compact_user_consultations(user_id, keep, chunk_size) for user_id in list(user_ids))
+
+
+def prune_notifications(max_age, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Deletes the read notifications older than the given number of days.
+
+    :return: the number of notifications deleted.
+    """
+    notifications = Notification.objects.filter(read=True, date__lt=timezone.now() - timedelta(days=max_age))
+    return delete_in_chunks(notifications, chunk_size)
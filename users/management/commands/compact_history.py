@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.history import DEFAULT_CHUNK_SIZE, compact_consultations, prune_notifications
+
+
+class Command(BaseCommand):
+    help = "Deletes the old read notifications and the old consultations of the users. Meant to be scheduled."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-consultations", type=int, default=settings.CONSULTATIONS_KEPT_PER_USER,
+                            help="The number of most recent consultations kept for each user.")
+        parser.add_argument("--notifications-max-age", type=int, default=settings.NOTIFICATIONS_RETENTION_DAYS,
+                            help="The number of days after which read notifications are deleted.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="The maximum number of rows deleted per transaction.")
+
+    def handle(self, *args, **options):
+        notifications = prune_notifications(options["notifications_max_age"], options["chunk_size"])
+        consultations = compact_consultations(options["keep_consultations"], options["chunk_size"])
+
+        self.stdout.write("%d notifications deleted, %d consultations deleted" % (notifications, consultations))
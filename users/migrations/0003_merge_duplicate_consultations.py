@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_consultations(apps, schema_editor):
+    """
+    Merges the consultations of a same item by a same user into the most recent one, before making them unique.
+    """
+    Consultation = apps.get_model("users", "Consultation")
+
+    duplicates = Consultation.objects.values("user_id", "item_id") \
+        .annotate(count=Count("id"), visits_sum=Sum("visits")).filter(count__gt=1)
+
+    for duplicate in list(duplicates):
+        consultations = Consultation.objects.filter(user_id=duplicate["user_id"], item_id=duplicate["item_id"])
+        last = consultations.order_by("-date", "-id").first()
+        consultations.filter(pk=last.pk).update(visits=duplicate["visits_sum"])
+        consultations.exclude(pk=last.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_consultation_visits'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_consultations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 04:20
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('items', '0004_auto_20261019_0603'),
+        ('users', '0003_merge_duplicate_consultations'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='consultation',
+            unique_together=set([('user', 'item')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='consultation',
+            index_together=set([('user', 'date')]),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def set_note_sums(apps, schema_editor):
+    """
+    Sets the sum and number of the notes of the users having notes.
+    """
+    Note = apps.get_model("users", "Note")
+    UserProfile = apps.get_model("users", "UserProfile")
+
+    for notes in list(Note.objects.values("user_id").annotate(note_sum=Sum("note"), note_count=Count("id"))):
+        UserProfile.objects.filter(user_id=notes["user_id"]) \
+            .update(note_sum=notes["note_sum"], note_count=notes["note_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_auto_20261019_0620'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='note_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='note_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(set_note_sums, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='note_avg',
+        ),
+    ]
@@ -1,7 +1,9 @@
+from decimal import Decimal
+
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Avg
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -14,20 +16,39 @@ class UserProfile(models.Model):
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     last_modification_date = models.DateTimeField(auto_now=True)
-    image = models.ImageField("Uploaded image", default=None)
-    note_avg = models.DecimalField(max_digits=2, decimal_places=1, null=True)
+    image = models.ImageField("Uploaded image", default=None, db_index=True)
+
+    # sum and number of the notes of the user, updated when notes are saved or deleted (see update_note_sum)
+    note_sum = models.IntegerField(default=0)
+    note_count = models.PositiveIntegerField(default=0)
 
     categories = models.ManyToManyField("items.Category")
 
     def __str__(self):
         return "User profile of " + self.user.username
 
+    @property
+    def note_avg(self):
+        """
+        The mean of the notes of the user rounded to one decimal, or None if the user has no notes.
+        """
+        if self.note_count == 0:
+            return None
+        return (Decimal(self.note_sum) / self.note_count).quantize(Decimal("0.1"))
+
 
 class Consultation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     item = models.ForeignKey("items.Item", on_delete=models.CASCADE)
     date = models.DateTimeField(auto_now=True)
 
+    # number of visits of the item by the user, the date being the one of the last visit (see users.history)
+    visits = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = [("user", "item")]
+        index_together = [("user", "date")]
+
     def __str__(self):
         return self.user.username
 
@@ -57,8 +78,9 @@ def create_user_related(sender, instance, signal, created, **kwargs):
         Coordinates.objects.create(user=instance)
     else:
         # When we make a modification on the User (fields), we change the field "last_modification_date"
-        # with the new datetime.
-        instance.userprofile.save()
+        # with the new datetime. The profile may have been loaded before notes were given to the user, so only the
+        # date is saved, not the note counters.
+        instance.userprofile.save(update_fields=["last_modification_date"])
 
 
 class Note(models.Model):
@@ -73,9 +95,48 @@ class Note(models.Model):
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        # the previous note is locked until the sum of the notes is updated (see keep_previous_note), so that the
+        # concurrent updates of a note apply their differences in turn
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+def add_to_note_sum(user_id, note, count):
+    UserProfile.objects.filter(user_id=user_id).update(note_sum=F("note_sum") + note,
+                                                       note_count=F("note_count") + count)
+
+
+@receiver(pre_save, sender=Note)
+def keep_previous_note(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance.previous_note = Note.objects.select_for_update().filter(pk=instance.pk) \
+            .values_list("note", flat=True).first()
+
+
+@receiver(pre_delete, sender=Note)
+def keep_deleted_note(sender, instance, **kwargs):
+    """
+    Reads the note being deleted from the database, in the transaction of the deletion, as the deleted instance may
+    hold a note updated since it was loaded.
+    """
+    deleted_note = Note.objects.select_for_update().filter(pk=instance.pk).values_list("note", flat=True).first()
+    if deleted_note is not None:
+        instance.note = deleted_note
+
 
 @receiver(post_save, sender=Note)
-def update_mean_notes(sender, instance, signal, created, **kwargs):
-    user = instance.user
-    user.userprofile.note_avg = user.note_set.aggregate(Avg("note"))["note__avg"]
-    user.userprofile.save()
+def update_note_sum(sender, instance, created, **kwargs):
+    """
+    Adds a new note to the sum of the notes of its user, or the difference with the previous note of an updated note.
+    The sum and number of notes are updated in the database, so that concurrent notes are all counted.
+    """
+    if created:
+        add_to_note_sum(instance.user_id, instance.note, 1)
+    elif instance.note != instance.previous_note:
+        add_to_note_sum(instance.user_id, instance.note - instance.previous_note, 0)
+
+
+@receiver(post_delete, sender=Note)
+def remove_from_note_sum(sender, instance, **kwargs):
+    add_to_note_sum(instance.user_id, -instance.note, -1)
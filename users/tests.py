@@ -1,12 +1,23 @@
 import json
 from unittest.mock import patch
 
+from django.conf import settings as django_settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.storage import default_storage
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 
 from items.models import *
+from items.uploads import process_image_uploads
+from notifications.models import Notification
 from swapp import settings
 from swapp.gmaps_api_utils import OverQueryLimitError
+from users.account import ACCOUNT_CACHE_KEY
+from users.authentication import TokenCache
+from users.history import compact_consultations, prune_notifications, record_consultation
 from users.models import *
 
 
@@ -144,6 +155,98 @@ class AccountConnectionAPITests(TestCase):
         r = self.client.get(self.logout_url)
         self.assertEqual(r.status_code, status.HTTP_200_OK)
 
+    def test_token_authentication(self):
+        token = self.login().data["token"]
+        client = Client(HTTP_AUTHORIZATION="Token %s" % token)
+
+        r = client.get("/api/account/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["username"], "username")
+
+        # the user of the token and the account are now cached
+        with self.assertNumQueries(0):
+            client.get("/api/account/")
+
+        r = Client(HTTP_AUTHORIZATION="Token invalid").get("/api/account/")
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_user_profile_loaded_per_request(self):
+        token = self.login().data["token"]
+        client = Client(HTTP_AUTHORIZATION="Token %s" % token)
+        self.assertEqual(client.get("/api/account/").data["notes"], 0)
+
+        user = User.objects.get(username="username")
+        c = Category.objects.create(name="category")
+        item = Item.objects.create(owner=user, category=c, price_min=1, price_max=2)
+        offer = Offer.objects.create(accepted=True, answered=True, item_given=item, item_received=item)
+        Note.objects.create(user=user, offer=offer, text="test", note=5)
+
+        r = client.get("/api/account/")
+        self.assertEqual(r.data["notes"], 1)
+        self.assertEqual(r.data["note_avg"], 5)
+
+        r = client.patch("/api/account/categories/", data=json.dumps({"interested_by": [c.id]}),
+                         content_type="application/json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual((profile.note_sum, profile.note_count), (5, 1))
+
+    def test_token_revoked_on_logout(self):
+        token = self.login().data["token"]
+        client = Client(HTTP_AUTHORIZATION="Token %s" % token)
+        client.get("/api/account/")
+
+        r = client.get(self.logout_url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+        r = client.get("/api/account/")
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_kept_on_session_logout(self):
+        token = self.login().data["token"]
+
+        r = self.client.get(self.logout_url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+        r = Client(HTTP_AUTHORIZATION="Token %s" % token).get("/api/account/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+    def test_token_cache_revoked_for_inactive_user(self):
+        token = self.login().data["token"]
+        client = Client(HTTP_AUTHORIZATION="Token %s" % token)
+        client.get("/api/account/")
+
+        user = User.objects.get(username="username")
+        user.is_active = False
+        user.save()
+
+        r = client.get("/api/account/")
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenCacheTests(TestCase):
+    def test_least_recently_used_tokens_evicted(self):
+        user = User.objects.create_user(username="username", password="password")
+        cache = TokenCache(size=2, timeout=60)
+
+        cache.set("a", user)
+        cache.set("b", user)
+        self.assertEqual(cache.get("a"), user)
+        cache.set("c", user)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertIsNot(cache.get("a"), cache.get("a"))
+
+    def test_expired_tokens(self):
+        user = User.objects.create_user(username="username", password="password")
+        cache = TokenCache(size=2, timeout=-1)
+
+        cache.set("a", user)
+        self.assertIsNone(cache.get("a"))
+
 
 class AccountAPITests(TestCase):
     login_url = "/api/login/"
@@ -158,7 +261,9 @@ class AccountAPITests(TestCase):
 
     def post_image(self, image_name="test.png"):
         with open("%s/%s" % (settings.MEDIA_TEST, image_name), "rb") as data:
-            return self.client.post("%s%s/" % (self.account_url, "image"), {"image": data}, format="multipart")
+            r = self.client.post("%s%s/" % (self.account_url, "image"), {"image": data}, format="multipart")
+        process_image_uploads()
+        return r
 
     def patch_interested_by_categories(self, interested_by=[]):
         return self.client.patch("%s%s/" % (self.account_url, "categories"), data=json.dumps({
@@ -337,6 +442,28 @@ class AccountAPITests(TestCase):
         r = self.login(password="newpassword")
         self.assertEqual(r.status_code, status.HTTP_200_OK)
 
+    def test_change_password_replaces_token(self):
+        old_token = Token.objects.get_or_create(user=self.user)[0].key
+        self.assertEqual(self.client.get(self.account_url, HTTP_AUTHORIZATION="Token %s" % old_token).status_code,
+                         status.HTTP_200_OK)
+
+        r = self.client.put("%s%s/" % (self.account_url, "password"), data=json.dumps({
+            "old_password": "password",
+            "new_password": "newpassword"
+        }), content_type="application/json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        new_token = r.data["token"]
+        self.assertNotEqual(new_token, old_token)
+
+        # the session used to change the password is kept
+        self.assertEqual(self.client.get(self.account_url).status_code, status.HTTP_200_OK)
+
+        self.client.logout()
+        r = self.client.get(self.account_url, HTTP_AUTHORIZATION="Token %s" % old_token)
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+        r = self.client.get(self.account_url, HTTP_AUTHORIZATION="Token %s" % new_token)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
     def test_change_password_with_false_old_password(self):
         r = self.client.put("%s%s/" % (self.account_url, "password"), data=json.dumps({
             "old_password": "passwor",
@@ -429,18 +556,18 @@ class AccountAPITests(TestCase):
         self.assertEqual(User.objects.get(pk=1).userprofile.image.name, "")
 
         r = self.post_image()
-        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
 
         r = self.client.get(self.account_url)
         self.assertNotEqual(r.data["profile_picture_url"], None)
 
     def test_post_account_image_already_existing_image(self):
         r = self.post_image()
-        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
         self.assertNotEqual(User.objects.get(pk=1).userprofile.image.name, "")
 
         r = self.post_image()
-        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
         self.assertNotEqual(User.objects.get(pk=1).userprofile.image.name, "")
 
     def test_patch_interested_by_categories(self):
@@ -467,6 +594,28 @@ class AccountAPITests(TestCase):
         self.assertEqual(r.status_code, status.HTTP_200_OK)
         self.assertEqual(r.data, [])
 
+    def test_patch_interested_by_invalid_categories(self):
+        c1 = Category.objects.create(name="category1")
+        c2 = Category.objects.create(name="category2")
+        self.patch_interested_by_categories([c1.id])
+
+        r = self.patch_interested_by_categories([c2.id, 100])
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(self.user.userprofile.categories.all()), [c1])
+
+    def test_patch_interested_by_categories_constant_queries(self):
+        categories = [Category.objects.create(name="category%d" % i) for i in range(30)]
+        self.patch_interested_by_categories([c.id for c in categories[:3]])
+
+        def count_queries(ids):
+            with CaptureQueriesContext(connection) as context:
+                r = self.patch_interested_by_categories(ids)
+            self.assertEqual(len(r.data), len(ids))
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries([c.id for c in categories[3:6]]),
+                         count_queries([c.id for c in categories[6:]]))
+
     def test_get_pending_offers(self):
         c1 = Category.objects.create(name="Test")
 
@@ -502,6 +651,133 @@ class AccountAPITests(TestCase):
         self.assertEqual(r.data["pending_offers"][1]["id"], o2.id)
         self.assertEqual(r.data["pending_offers"][2]["id"], o4.id)
 
+    def test_account_lists_paginated(self):
+        c = Category.objects.create(name="Test")
+        other_user = User.objects.create_user(username="user1", email="test@test.com", password="password")
+        other_item = Item.objects.create(name="other", description="test", price_min=50, price_max=60,
+                                         owner=other_user, category=c)
+
+        now = timezone.now()
+        items = [Item.objects.create(name="test%d" % i, description="test", price_min=50, price_max=60,
+                                     owner=self.user, category=c, creation_date=now + timezone.timedelta(seconds=i))
+                 for i in range(25)]
+        for item in items:
+            Offer.objects.create(comment="test", item_given=item, item_received=other_item)
+
+        r = self.client.get(self.account_url)
+        self.assertEqual(r.data["items"], [item.id for item in reversed(items[5:])])
+        self.assertEqual(len(r.data["pending_offers"]), 20)
+
+        r = self.client.get(r.data["items_next"])
+        self.assertEqual([item["id"] for item in r.data["results"]], [item.id for item in reversed(items[:5])])
+        self.assertIsNone(r.data["next"])
+
+        r = self.client.get("%spending_offers/" % self.account_url, {"page_size": 30})
+        self.assertEqual(len(r.data["results"]), 25)
+
+    def test_account_built_with_few_queries_and_cached(self):
+        c = Category.objects.create(name="Test")
+        other_user = User.objects.create_user(username="user1", email="test@test.com", password="password")
+        other_item = Item.objects.create(name="other", description="test", price_min=50, price_max=60,
+                                         owner=other_user, category=c)
+        for i in range(5):
+            item = Item.objects.create(name="test%d" % i, description="test", price_min=50, price_max=60,
+                                       owner=self.user, category=c)
+            Offer.objects.create(comment="test", item_given=item, item_received=other_item)
+        self.user.userprofile.categories.add(c)
+
+        # the user with its profile (the session is cached), the categories, the items and the pending offers
+        with self.assertNumQueries(4):
+            r = self.client.get(self.account_url)
+        self.assertEqual(len(r.data["items"]), 5)
+        self.assertEqual(len(r.data["pending_offers"]), 5)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.account_url)
+        self.assertEqual(cached.data, r.data)
+
+    def test_account_cache_kept_on_item_views(self):
+        c = Category.objects.create(name="Test")
+        item = Item.objects.create(name="test", description="test", price_min=50, price_max=60, owner=self.user,
+                                   category=c)
+        self.client.get(self.account_url)
+
+        self.client.get("/api/items/%d/" % item.id)
+        item.refresh_from_db()
+        item.views += 1
+        item.save(update_fields=["views"])
+        with self.assertNumQueries(1):
+            self.client.get(self.account_url)
+
+        item.name = "renamed"
+        item.save(update_fields=["name", "views"])
+        with self.assertNumQueries(4):
+            self.client.get(self.account_url)
+
+    def test_account_cache_shared_between_processes(self):
+        self.assertEqual(self.client.get(self.account_url).data["notes"], 0)
+        UserProfile.objects.filter(user=self.user).update(note_count=1)
+        self.assertEqual(self.client.get(self.account_url).data["notes"], 0)
+
+        # the account invalidated by another process, with its own instance of the cache
+        params = django_settings.CACHES["default"]
+        FileBasedCache(params["LOCATION"], params).delete(ACCOUNT_CACHE_KEY % self.user.id)
+        self.assertEqual(self.client.get(self.account_url).data["notes"], 1)
+
+    def test_account_cache_invalidated(self):
+        c = Category.objects.create(name="Test")
+        other_user = User.objects.create_user(username="user1", email="test@test.com", password="password")
+        other_item = Item.objects.create(name="other", description="test", price_min=50, price_max=60,
+                                         owner=other_user, category=c)
+        self.client.get(self.account_url)
+
+        item = Item.objects.create(name="test", description="test", price_min=50, price_max=60, owner=self.user,
+                                   category=c)
+        self.assertEqual(self.client.get(self.account_url).data["items"], [item.id])
+
+        offer = Offer.objects.create(comment="test", item_given=other_item, item_received=item)
+        self.assertEqual(len(self.client.get(self.account_url).data["pending_offers"]), 1)
+
+        offer.accepted = True
+        offer.answered = True
+        offer.save()
+        self.assertEqual(self.client.get(self.account_url).data["pending_offers"], [])
+
+        Note.objects.create(user=self.user, offer=offer, text="test", note=4)
+        self.assertEqual(self.client.get(self.account_url).data["notes"], 1)
+
+        self.patch_interested_by_categories([c.id])
+        self.assertEqual(self.client.get(self.account_url).data["categories"], [{"id": c.id, "name": "Test"}])
+
+        self.user.location.city = "Paris"
+        self.user.location.save()
+        self.assertEqual(self.client.get(self.account_url).data["location"]["city"], "Paris")
+
+        item.delete()
+        self.assertEqual(self.client.get(self.account_url).data["items"], [])
+
+    def test_account_cache_invalidated_on_refused_offers(self):
+        c = Category.objects.create(name="Test")
+        other_user = User.objects.create_user(username="user1", email="test@test.com", password="password")
+        other_item = Item.objects.create(name="other", description="test", price_min=50, price_max=60,
+                                         owner=other_user, category=c)
+        item = Item.objects.create(name="test", description="test", price_min=50, price_max=60, owner=self.user,
+                                   category=c)
+        third_user = User.objects.create_user(username="user2", email="test@test.com", password="password")
+        third_item = Item.objects.create(name="third", description="test", price_min=50, price_max=60,
+                                         owner=third_user, category=c)
+        accepted = Offer.objects.create(comment="test", item_given=other_item, item_received=item)
+        Offer.objects.create(comment="test", item_given=third_item, item_received=item)
+
+        third_client = Client()
+        third_client.login(username="user2", password="password")
+        self.assertEqual(len(third_client.get(self.account_url).data["pending_offers"]), 1)
+
+        r = self.client.patch("/api/offers/%d/" % accepted.id, data=json.dumps({"accepted": True}),
+                              content_type="application/json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(third_client.get(self.account_url).data["pending_offers"], [])
+
 
 class CSRFTests(TestCase):
     client = Client(enforce_csrf_checks=True)
@@ -618,11 +894,15 @@ class PublicAccountInfoTests(TestCase):
 
     def post_item_image(self, image_name="test.png", item_id=1):
         with open("%s/%s" % (settings.MEDIA_TEST, image_name), "rb") as data:
-            return self.client.post("/api/items/%d/images/" % item_id, {"image": data}, format="multipart")
+            r = self.client.post("/api/items/%d/images/" % item_id, {"image": data}, format="multipart")
+        process_image_uploads()
+        return r
 
     def post_user_image(self, image_name="test.png"):
         with open("%s/%s" % (settings.MEDIA_TEST, image_name), "rb") as data:
-            return self.client.post("/api/account/image/", {"image": data}, format="multipart")
+            r = self.client.post("/api/account/image/", {"image": data}, format="multipart")
+        process_image_uploads()
+        return r
 
     def setUp(self):
         self.user = User.objects.create_user(username="username", first_name="first_name", last_name="last_name",
@@ -664,6 +944,9 @@ class PublicAccountInfoTests(TestCase):
         self.assertEqual(r.status_code, status.HTTP_200_OK)
         self.assertEqual(r.data["id"], 1)
         self.assertIsNotNone(r.data["profile_picture_url"])
+        self.assertEqual(list(r.data["profile_picture_sizes"]), ["thumbnail", "medium", "large"])
+        medium_url = r.data["profile_picture_sizes"]["medium"]["webp"]
+        self.assertTrue(default_storage.exists(medium_url[len(settings.MEDIA_URL):]))
         self.assertEqual(r.data["first_name"], "first_name")
         self.assertEqual(r.data["last_name"], "last_name")
         self.assertEqual(r.data["username"], "username")
@@ -694,6 +977,70 @@ class PublicAccountInfoTests(TestCase):
         self.assertNotEqual(r.data["items"][0]["image_id"], None)
         self.assertNotEqual(r.data["items"][0]["image_url"], None)
 
+    def test_get_user_items(self):
+        r = self.client.get("%s%s/" % (self.users_url, self.user.username))
+        self.assertIsNone(r.data["items_next"])
+
+        r = self.client.get("%s%s/items/" % (self.users_url, self.user.username))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in r.data["results"]], [self.item.id])
+
+        r = self.client.get("%s%s/items/" % (self.users_url, "unknown"))
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_user_info_cached_with_etag(self):
+        url = "%s%s/" % (self.users_url, self.user.username)
+        r = self.client.get(url)
+        self.assertIn("ETag", r)
+
+        # the user is looked up by username, the profile comes from the cache
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+        self.assertEqual(cached.data, r.data)
+        self.assertEqual(cached["ETag"], r["ETag"])
+
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=r["ETag"])
+        self.assertEqual(r.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(r.content, b"")
+
+        r = self.client.get(url, HTTP_IF_NONE_MATCH="\"other\"")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+    def test_get_user_info_kept_on_item_view(self):
+        url = "%s%s/" % (self.users_url, self.user.username)
+        self.client.get(url)
+
+        r = self.client.get("/api/items/%d/" % self.item.id)
+        self.assertEqual(r.data["views"], 1)
+        self.assertEqual(Item.objects.get(pk=self.item.id).views, 1)
+
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_get_user_info_invalidated(self):
+        url = "%s%s/" % (self.users_url, self.user.username)
+        etag = self.client.get(url)["ETag"]
+
+        self.item.name = "renamed"
+        self.item.save()
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["items"][0]["name"], "renamed")
+        self.assertNotEqual(r["ETag"], etag)
+
+        self.user.location.city = "d"
+        self.user.location.save()
+        self.assertEqual(self.client.get(url).data["location"], "d, b, c")
+
+        other_user = User.objects.create_user(username="user1", email="test@test.com", password="password")
+        other_item = Item.objects.create(name="other", description="test", price_min=50, price_max=60,
+                                         owner=other_user, category=self.c1)
+        offer = Offer.objects.create(accepted=True, answered=True, item_given=other_item, item_received=self.item)
+        Note.objects.create(user=self.user, offer=offer, text="test", note=4)
+        r = self.client.get(url)
+        self.assertEqual(r.data["notes"], 1)
+        self.assertEqual(r.data["note_avg"], 4)
+
 
 class NoteAPITests(TestCase):
     notes_url = "/api/notes/"
@@ -868,6 +1215,44 @@ class NoteAPITests(TestCase):
         self.assertEqual(r.data["notes"], 2)
         self.assertEqual(r.data["note_avg"], 2.5)
 
+    def test_user_avg_note_updated_and_deleted_notes(self):
+        Offer.objects.create(accepted=1, answered=True, comment="test", item_given=self.myItem,
+                             item_received=self.hisItem)
+
+        self.login()
+        first = self.post_note(1, "test", 2).data["id"]
+        second = self.post_note(3, "test", 3).data["id"]
+        self.put_note(first, "test", 5)
+
+        profile = UserProfile.objects.get(user__username="user1")
+        self.assertEqual((profile.note_sum, profile.note_count), (8, 2))
+        self.assertEqual(profile.note_avg, 4)
+
+        self.delete_note(second)
+        profile.refresh_from_db()
+        self.assertEqual((profile.note_sum, profile.note_count), (5, 1))
+
+        # a note updated since it was loaded is removed with its current value
+        stale = Note.objects.get(pk=first)
+        self.put_note(first, "test", 1)
+        stale.delete()
+        profile.refresh_from_db()
+        self.assertEqual((profile.note_sum, profile.note_count), (0, 0))
+        self.assertIsNone(profile.note_avg)
+
+    def test_user_avg_note_kept_on_profile_save(self):
+        user = User.objects.select_related("userprofile").get(username="user1")
+
+        self.login()
+        self.post_note(1, "test", 4)
+
+        # the profile loaded before the note is saved with the user
+        user.first_name = "first_name"
+        user.save()
+
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual((profile.note_sum, profile.note_count), (4, 1))
+
 
 class ConsultationTests(TestCase):
     items_url = "/api/items/"
@@ -898,3 +1283,54 @@ class ConsultationTests(TestCase):
         self.assertEqual(r.status_code, status.HTTP_200_OK)
 
         self.assertEqual(len(Consultation.objects.all()), 1)
+
+    def test_logged_user_consultations_of_same_item(self):
+        self.login()
+        self.get_item()
+        self.get_item()
+
+        self.assertEqual(Consultation.objects.count(), 1)
+        self.assertEqual(Consultation.objects.get().visits, 2)
+
+
+class HistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="username", email="test@test.com", password="password")
+        self.other_user = User.objects.create_user(username="username2", email="test@test.com", password="password")
+
+        c = Category.objects.create(name="Test")
+        self.items = [Item.objects.create(name="Test%d" % i, description="Test", price_min=1, price_max=2,
+                                          category=c, owner=self.other_user) for i in range(3)]
+
+    def consult(self, user, *items):
+        for item in items:
+            record_consultation(user, item)
+
+    def test_record_consultation(self):
+        i1, i2, i3 = self.items
+        self.consult(self.user, i1, i2, i1, i1)
+
+        self.assertEqual(Consultation.objects.count(), 2)
+        self.assertEqual(Consultation.objects.get(item=i1).visits, 3)
+        self.assertEqual(Consultation.objects.get(item=i2).visits, 1)
+        self.assertGreater(Consultation.objects.get(item=i1).date, Consultation.objects.get(item=i2).date)
+
+    def test_compact_consultations(self):
+        i1, i2, i3 = self.items
+        self.consult(self.user, i1, i2, i3, i1)
+        self.consult(self.other_user, i1)
+
+        # the 2 most recent are kept
+        self.assertEqual(compact_consultations(keep=2, chunk_size=1), 1)
+        self.assertEqual(set(Consultation.objects.filter(user=self.user).values_list("item_id", flat=True)),
+                         {i1.id, i3.id})
+        self.assertEqual(Consultation.objects.filter(user=self.other_user).count(), 1)
+
+    def test_prune_notifications(self):
+        old = timezone.now() - timezone.timedelta(days=100)
+        Notification.objects.create(content="old read", read=True, date=old, user=self.user)
+        Notification.objects.create(content="old unread", read=False, date=old, user=self.user)
+        Notification.objects.create(content="recent read", read=True, user=self.user)
+
+        self.assertEqual(prune_notifications(max_age=90, chunk_size=1), 1)
+        self.assertEqual(set(Notification.objects.values_list("content", flat=True)), {"old unread", "recent read"})
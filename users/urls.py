@@ -13,10 +13,14 @@ urlpatterns = [
     url(r"login/$", views.login_user, name="login_user"),
     url(r"logout/$", views.logout_user, name="logout_user"),
     url(r"users/$", views.create_user, name="create_user"),
+    url(r"users/(?P<username>.+)/items/$", views.PublicItemsView.as_view(), name="public_items"),
     url(r"users/(?P<username>.+)/$", views.get_public_account_info, name="get_public_account_info"),
     url(r"account/$", views.UserAccount.as_view(), name="user_account"),
+    url(r"account/items/$", views.AccountItemsView.as_view(), name="account_items"),
+    url(r"account/pending_offers/$", views.AccountPendingOffersView.as_view(), name="account_pending_offers"),
     url(r"account/password/", views.change_password, name="change_password"),
     url(r"account/location/", views.LocationView.as_view(), name="location"),
     url(r"account/categories/", views.CategoriesView.as_view(), name="categories"),
-    url(r"account/image/", views.set_profile_image, name="profile_image")
+    url(r"account/image/", views.set_profile_image, name="profile_image"),
+    url(r"account/trade_cycles/$", views.get_trade_cycles, name="trade_cycles")
 ] + router.urls
@@ -1,22 +1,29 @@
-from django.contrib.auth import logout, authenticate, login
-from django.db.models import Q
+from django.contrib.auth import logout, authenticate, login, update_session_auth_hash
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import ensure_csrf_cookie
 from rest_framework import generics
 from rest_framework import mixins
 from rest_framework import permissions
 from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from items.models import Category
+from items.models import Item
 from items.serializers import InventoryItemSerializer, CategorySerializer, InterestedByCategorySerializer, \
-    CreateImageSerializer
-from offers.serializers import RetrieveOfferSerializer
+    CreateImageSerializer, ImageUploadSerializer
+from items.uploads import stage_upload
+from offers.serializers import RetrieveOfferSerializer, TradeCyclesSerializer
+from offers.trade_cycles import get_trade_graph
 from swapp.gmaps_api_utils import get_coordinates, OverQueryLimitError
+from swapp.pagination import CreationDateCursorPagination
+from users.account import get_account, get_public_account, pending_offers_of
 from users.serializers import *
 
 
@@ -40,7 +47,8 @@ def login_user(request):
     user = authenticate(**serializer.validated_data)
     if user is not None:
         login(request, user)
-        return Response()
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({"token": token.key})
     else:
         return Response(status=status.HTTP_401_UNAUTHORIZED, data={"error": "Invalid username/password combination"})
 
@@ -48,7 +56,10 @@ def login_user(request):
 @api_view(["GET"])
 @permission_classes((permissions.IsAuthenticated,))
 def logout_user(request):
-    """Logs out an user."""
+    """Logs out an user. Its API token is revoked when it's the one used by the request, the token being shared by the
+    clients of the user."""
+    if isinstance(request.successful_authenticator, TokenAuthentication):
+        Token.objects.filter(user=request.user).delete()
     logout(request)
     return Response(status=status.HTTP_200_OK)
 
@@ -113,27 +124,11 @@ class UserAccount(OwnUserAccountMixin, generics.RetrieveUpdateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        user_profile = request.user.userprofile
-
-        return Response({
-            "id": user.id,
-            "profile_picture_url": None if user.userprofile.image.name == "" else user.userprofile.image.url,
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "email": user.email,
-            "location": LocationSerializer(user.location).data,
-            "last_modification_date": user_profile.last_modification_date,
-            "categories": CategorySerializer(user_profile.categories.all(), many=True).data,
-            "items": [i.id for i in user.item_set.all()],
-            "notes": user.note_set.count(),
-            "note_avg": user.userprofile.note_avg,
-            "coordinates": CoordinatesSerializer(user.coordinates).data,
-            "pending_offers": RetrieveOfferSerializer(
-                Offer.objects.filter((Q(item_given__owner=user) | Q(item_received__owner=user)),
-                                     Q(answered=False)).order_by("-creation_date"), many=True).data
-        })
+        account = dict(get_account(request.user, request))
+        for link in ("items_next", "pending_offers_next"):
+            if account[link] is not None:
+                account[link] = request.build_absolute_uri(account[link])
+        return Response(account)
 
     def update(self, request, *args, **kwargs):
         new_username = request.data.get("username", None)
@@ -148,7 +143,8 @@ class UserAccount(OwnUserAccountMixin, generics.RetrieveUpdateAPIView):
 @permission_classes((permissions.IsAuthenticated,))
 def change_password(request):
     """
-    Changes the current user's password.
+    Changes the current user's password. The API token of the user is replaced, so that the clients authenticated with
+    the old password have to log in again, and the new token is returned; the current session is kept.
     """
     serializer = ChangePasswordSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -159,9 +155,14 @@ def change_password(request):
     if not request.user.check_password(old_password):
         return Response(status=status.HTTP_400_BAD_REQUEST, data={"old_password": "Wrong password"})
 
-    request.user.set_password(new_password)
-    request.user.save()
-    return Response(status=status.HTTP_200_OK)
+    with transaction.atomic():
+        request.user.set_password(new_password)
+        request.user.save()
+        Token.objects.filter(user=request.user).delete()
+        token = Token.objects.create(user=request.user)
+
+    update_session_auth_hash(request, request.user)
+    return Response(status=status.HTTP_200_OK, data={"token": token.key})
 
 
 class LocationView(generics.UpdateAPIView):
@@ -198,33 +199,94 @@ class CategoriesView(generics.UpdateAPIView):
         serializer.is_valid(raise_exception=True)
 
         userprofile = self.request.user.userprofile
-        userprofile.categories.clear()
-
-        for id in serializer.validated_data["interested_by"]:
-            userprofile.categories.add(Category.objects.get(pk=id))
-            userprofile.save()
+        with transaction.atomic():
+            userprofile.categories.set(serializer.validated_data["interested_by"])
+            userprofile.save(update_fields=["last_modification_date"])
 
         return Response(CategorySerializer(userprofile.categories.all(), many=True).data)
 
 
+@api_view(["GET"])
+@permission_classes((permissions.IsAuthenticated,))
+def get_trade_cycles(request):
+    """
+    Returns the trade cycles of 3 to 5 users in which the current user could take part.
+    """
+    serializer = TradeCyclesSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+
+    cycles = get_trade_graph().find_cycles(request.user.id, **serializer.validated_data)
+
+    users = {t[0] for cycle in cycles for t in cycle}
+    items = {t[1] for cycle in cycles for t in cycle}
+    usernames = dict(User.objects.filter(pk__in=users).values_list("id", "username"))
+    names = dict(Item.objects.filter(pk__in=items).values_list("id", "name"))
+
+    return Response([{
+        "length": len(cycle),
+        "trades": [{
+            "user": user,
+            "username": usernames.get(user),
+            "item_given": item_given,
+            "item_given_name": names.get(item_given),
+            "item_received": item_received,
+            "item_received_name": names.get(item_received)
+        } for user, item_given, item_received in cycle]
+    } for cycle in cycles])
+
+
 @api_view(["GET"])
 def get_public_account_info(request, username):
-    """Returns the user's public info."""
-    user = get_object_or_404(User, username=username)
-
-    return Response({
-        "id": user.id,
-        "profile_picture_url": None if user.userprofile.image.name == "" else user.userprofile.image.url,
-        "username": user.username,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "location": "%s, %s, %s" % (user.location.city, user.location.region, user.location.country),
-        "items": InventoryItemSerializer(user.item_set.all(), many=True).data,
-        "notes": user.note_set.count(),
-        "note_avg": user.userprofile.note_avg,
-        "interested_by": CategorySerializer(user.userprofile.categories, many=True).data,
-        "coordinates": CoordinatesSerializer(user.coordinates).data
-    })
+    """
+    Returns the user's public info. The response has an ETag, and is empty (304) when it matches the If-None-Match
+    header of the request.
+    """
+    user = get_object_or_404(User.objects.only("id"), username=username)
+    account, etag = get_public_account(user.id, request)
+
+    headers = {"ETag": quote_etag(etag)}
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    account = dict(account)
+    if account["items_next"] is not None:
+        account["items_next"] = request.build_absolute_uri(account["items_next"])
+    return Response(account, headers=headers)
+
+
+class AccountItemsView(generics.ListAPIView):
+    """
+    Lists the items of the current user, the most recent first.
+    """
+    serializer_class = InventoryItemSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = CreationDateCursorPagination
+
+    def get_queryset(self):
+        return self.request.user.item_set.select_related("primary_image")
+
+
+class AccountPendingOffersView(generics.ListAPIView):
+    """
+    Lists the pending offers made or received by the current user, the most recent first.
+    """
+    serializer_class = RetrieveOfferSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = CreationDateCursorPagination
+
+    def get_queryset(self):
+        return pending_offers_of(self.request.user.id)
+
+
+class PublicItemsView(generics.ListAPIView):
+    """
+    Lists the items of an user, the most recent first.
+    """
+    serializer_class = InventoryItemSerializer
+    pagination_class = CreationDateCursorPagination
+
+    def get_queryset(self):
+        return get_object_or_404(User, username=self.kwargs["username"]).item_set.select_related("primary_image")
 
 
 class NoteViewSet(mixins.CreateModelMixin,
@@ -240,6 +302,7 @@ class NoteViewSet(mixins.CreateModelMixin,
             return NoteUpdateSerializer
         return NoteSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.is_valid(raise_exception=True)
         offer = serializer.validated_data["offer"]
@@ -264,8 +327,7 @@ def set_profile_image(request):
     serializer = CreateImageSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
-    userprofile = request.user.userprofile
-    userprofile.image = serializer.validated_data["image"]
-    userprofile.save()
+    upload = stage_upload(request.user, serializer.validated_data["image"])
 
-    return Response(status=status.HTTP_201_CREATED, headers={"Location": userprofile.image.url})
+    return Response(status=status.HTTP_202_ACCEPTED, data=ImageUploadSerializer(upload).data,
+                    headers={"Location": "/api/uploads/%d/" % upload.id})